@@ -2,108 +2,152 @@
 Admin dashboard and management endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import func, desc, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+import asyncio
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.metrics import metrics
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_rank_cursor, keyset_filter, page_cursor
 from app.api.v1.auth import get_current_admin_user
 from app.models.user import User
-from app.models.incident import Incident, IncidentStatus
-from app.models.report import Report, ReportStatus
+from app.models.incident import Incident, IncidentStatus, SeverityLevel
+from app.models.report import Report, ReportStatus, ReportType
 from app.models.message import Message
+from app.services.analytics import analytics_service
+from app.services.archive import archive_service
 from app.services.evidence_logger import evidence_logger
+from app.services.search import search_service
+from app.services.principals import Principal, principal_service
+from app.services.stats import stats_service
 
 router = APIRouter()
 
 
 @router.get("/dashboard/stats")
 async def get_dashboard_stats(
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get dashboard statistics"""
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    blocked_users = db.query(User).filter(User.is_blocked == True).count()
-    red_tagged_users = db.query(User).filter(User.has_red_tag == True).count()
-    
-    total_incidents = db.query(Incident).count()
-    pending_incidents = db.query(Incident).filter(Incident.status == IncidentStatus.PENDING).count()
-    high_severity_incidents = db.query(Incident).filter(Incident.severity == "high").count()
-    
-    total_reports = db.query(Report).count()
-    pending_reports = db.query(Report).filter(Report.status == ReportStatus.PENDING).count()
+    # Precomputed counters, maintained on writes and reconciled periodically
+    counts = await stats_service.get_counts(db)
     
     return {
         "users": {
-            "total": total_users,
-            "active": active_users,
-            "blocked": blocked_users,
-            "red_tagged": red_tagged_users
+            "total": counts["users_total"],
+            "active": counts["users_active"],
+            "blocked": counts["users_blocked"],
+            "red_tagged": counts["users_red_tagged"]
         },
         "incidents": {
-            "total": total_incidents,
-            "pending": pending_incidents,
-            "high_severity": high_severity_incidents
+            "total": counts["incidents_total"],
+            "pending": counts["incidents_pending"],
+            "high_severity": counts["incidents_high_severity"]
         },
         "reports": {
-            "total": total_reports,
-            "pending": pending_reports
+            "total": counts["reports_total"],
+            "pending": counts["reports_pending"]
         }
     }
 
 
-@router.get("/incidents", response_model=List[dict])
+@router.get("/metrics")
+async def get_metrics(
+    admin_user: Principal = Depends(get_current_admin_user)
+):
+    """Get runtime metrics (open WebSocket connections, reaped sockets, ...)"""
+    return metrics.snapshot()
+
+
+def listing_page(result: list, cursor: Optional[str]) -> ORJSONResponse:
+    """List response; the cursor of the next page, if any, goes in a header"""
+    headers = {NEXT_CURSOR_HEADER: cursor} if cursor else None
+    return ORJSONResponse(result, headers=headers)
+
+
+async def fetch_page(db: AsyncSession, query, created_at, row_id, cursor: Optional[str], order: str, limit: int):
+    """Run a listing query as one keyset page; returns (rows, next_cursor)"""
+    try:
+        query = keyset_filter(query, created_at, row_id, cursor, descending=order == "desc")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    return rows[:limit], page_cursor(rows, limit)
+
+
+@router.get("/incidents", response_class=ORJSONResponse)
 async def get_all_incidents(
-    status_filter: Optional[str] = None,
-    severity_filter: Optional[str] = None,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    status_filter: Optional[IncidentStatus] = None,
+    severity_filter: Optional[SeverityLevel] = None,
+    user_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(settings.ADMIN_PAGE_SIZE, ge=1, le=settings.ADMIN_PAGE_MAX),
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all incidents with filters"""
-    query = db.query(Incident)
+    query = select(
+        Incident.id,
+        Incident.severity,
+        Incident.status,
+        Incident.detected_content,
+        Incident.ai_analysis,
+        Incident.screenshot_path,
+        Incident.created_at,
+        User.id.label("user_id"),
+        User.username,
+        User.has_red_tag
+    ).outerjoin(User, User.id == Incident.user_id)
     
     if status_filter:
-        query = query.filter(Incident.status == IncidentStatus(status_filter))
+        query = query.where(Incident.status == status_filter)
     
     if severity_filter:
-        query = query.filter(Incident.severity == severity_filter)
+        query = query.where(Incident.severity == severity_filter)
     
-    incidents = query.order_by(Incident.created_at.desc()).limit(100).all()
+    if user_id is not None:
+        query = query.where(Incident.user_id == user_id)
     
-    result = []
-    for incident in incidents:
-        user = db.query(User).filter(User.id == incident.user_id).first()
-        result.append({
-            "id": incident.id,
+    rows, next_cursor = await fetch_page(db, query, Incident.created_at, Incident.id, cursor, order, limit)
+    
+    result = [
+        {
+            "id": row.id,
             "user": {
-                "id": user.id if user else None,
-                "username": user.username if user else "Unknown",
-                "has_red_tag": user.has_red_tag if user else False
+                "id": row.user_id,
+                "username": row.username if row.user_id is not None else "Unknown",
+                "has_red_tag": row.has_red_tag if row.user_id is not None else False
             },
-            "severity": incident.severity,
-            "status": incident.status,
-            "detected_content": incident.detected_content,
-            "ai_analysis": incident.ai_analysis,
-            "screenshot_path": incident.screenshot_path,
-            "created_at": incident.created_at.isoformat()
-        })
+            "severity": row.severity,
+            "status": row.status,
+            "detected_content": row.detected_content,
+            "ai_analysis": row.ai_analysis,
+            "screenshot_path": row.screenshot_path,
+            "created_at": row.created_at
+        }
+        for row in rows
+    ]
     
-    return result
+    return listing_page(result, next_cursor)
 
 
 @router.put("/incidents/{incident_id}")
 async def update_incident_status(
     incident_id: int,
     status: str,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update incident status"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    incident = await db.scalar(select(Incident).where(Incident.id == incident_id))
     
     if not incident:
         raise HTTPException(
@@ -111,55 +155,85 @@ async def update_incident_status(
             detail="Incident not found"
         )
     
+    counted = stats_service.snapshot(incident)
+    rolled_up = analytics_service.dimensions(incident)
     incident.status = IncidentStatus(status)
+    await stats_service.changed(db, counted, incident)
+    await analytics_service.incident_changed(db, rolled_up, incident)
     incident.reviewed_at = datetime.utcnow()
     
     if status == "resolved":
         incident.resolved_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(incident)
+    await db.commit()
+    await db.refresh(incident)
     
     return {"message": "Incident status updated", "incident": incident}
 
 
-@router.get("/reports", response_model=List[dict])
+@router.get("/reports", response_class=ORJSONResponse)
 async def get_all_reports(
-    status_filter: Optional[str] = None,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    status_filter: Optional[ReportStatus] = None,
+    report_type: Optional[ReportType] = None,
+    is_urgent: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(settings.ADMIN_PAGE_SIZE, ge=1, le=settings.ADMIN_PAGE_MAX),
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all reports"""
-    query = db.query(Report)
+    reporter = aliased(User)
+    reported_user = aliased(User)
+    query = select(
+        Report.id,
+        Report.report_type,
+        Report.status,
+        Report.description,
+        Report.is_urgent,
+        Report.created_at,
+        reporter.id.label("reporter_id"),
+        reporter.username.label("reporter_username"),
+        reported_user.id.label("reported_user_id"),
+        reported_user.username.label("reported_username")
+    ).outerjoin(
+        reporter, reporter.id == Report.reporter_id
+    ).outerjoin(
+        reported_user, reported_user.id == Report.reported_user_id
+    )
     
     if status_filter:
-        query = query.filter(Report.status == ReportStatus(status_filter))
+        query = query.where(Report.status == status_filter)
     
-    reports = query.order_by(Report.created_at.desc()).limit(100).all()
+    if report_type:
+        query = query.where(Report.report_type == report_type)
     
-    result = []
-    for report in reports:
-        reporter = db.query(User).filter(User.id == report.reporter_id).first()
-        reported_user = db.query(User).filter(User.id == report.reported_user_id).first() if report.reported_user_id else None
-        
-        result.append({
-            "id": report.id,
+    if is_urgent is not None:
+        query = query.where(Report.is_urgent == is_urgent)
+    
+    rows, next_cursor = await fetch_page(db, query, Report.created_at, Report.id, cursor, order, limit)
+    
+    result = [
+        {
+            "id": row.id,
             "reporter": {
-                "id": reporter.id if reporter else None,
-                "username": reporter.username if reporter else "Unknown"
+                "id": row.reporter_id,
+                "username": row.reporter_username if row.reporter_id is not None else "Unknown"
             },
             "reported_user": {
-                "id": reported_user.id if reported_user else None,
-                "username": reported_user.username if reported_user else "Unknown"
-            } if reported_user else None,
-            "report_type": report.report_type,
-            "status": report.status,
-            "description": report.description,
-            "is_urgent": report.is_urgent,
-            "created_at": report.created_at.isoformat()
-        })
+                "id": row.reported_user_id,
+                "username": row.reported_username
+            } if row.reported_user_id is not None else None,
+            "report_type": row.report_type,
+            "status": row.status,
+            "description": row.description,
+            "is_urgent": row.is_urgent,
+            "created_at": row.created_at
+        }
+        for row in rows
+    ]
     
-    return result
+    return listing_page(result, next_cursor)
 
 
 @router.put("/reports/{report_id}")
@@ -167,11 +241,11 @@ async def update_report_status(
     report_id: int,
     status: str,
     admin_notes: Optional[str] = None,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update report status"""
-    report = db.query(Report).filter(Report.id == report_id).first()
+    report = await db.scalar(select(Report).where(Report.id == report_id))
     
     if not report:
         raise HTTPException(
@@ -179,7 +253,9 @@ async def update_report_status(
             detail="Report not found"
         )
     
+    counted = stats_service.snapshot(report)
     report.status = ReportStatus(status)
+    await stats_service.changed(db, counted, report)
     report.reviewed_at = datetime.utcnow()
     
     if admin_notes:
@@ -188,36 +264,70 @@ async def update_report_status(
     if status == "resolved":
         report.resolved_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(report)
+    await db.commit()
+    await db.refresh(report)
     
     return {"message": "Report status updated", "report": report}
 
 
-@router.get("/users", response_model=List[dict])
+@router.get("/users", response_class=ORJSONResponse)
 async def get_all_users(
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    search: Optional[str] = None,
+    is_blocked: Optional[bool] = None,
+    has_red_tag: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    limit: int = Query(settings.ADMIN_PAGE_SIZE, ge=1, le=settings.ADMIN_PAGE_MAX),
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all users"""
-    users = db.query(User).order_by(User.created_at.desc()).all()
+    # Incident counts of all users in one grouped subquery instead of a COUNT per user
+    incident_counts = select(
+        Incident.user_id,
+        func.count(Incident.id).label("incident_count")
+    ).group_by(Incident.user_id).subquery()
     
-    result = []
-    for user in users:
-        incident_count = db.query(Incident).filter(Incident.user_id == user.id).count()
-        result.append({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "has_red_tag": user.has_red_tag,
-            "warning_count": user.warning_count,
-            "is_blocked": user.is_blocked,
-            "is_active": user.is_active,
-            "incident_count": incident_count,
-            "created_at": user.created_at.isoformat()
-        })
-    
-    return result
+    query = select(
+        User.id,
+        User.username,
+        User.email,
+        User.has_red_tag,
+        User.warning_count,
+        User.is_blocked,
+        User.is_active,
+        User.created_at,
+        func.coalesce(incident_counts.c.incident_count, 0).label("incident_count")
+    ).outerjoin(incident_counts, incident_counts.c.user_id == User.id)
+    
+    if search:
+        pattern = f"%{search}%"
+        query = query.where(User.username.ilike(pattern) | User.email.ilike(pattern))
+    
+    if is_blocked is not None:
+        query = query.where(User.is_blocked == is_blocked)
+    
+    if has_red_tag is not None:
+        query = query.where(User.has_red_tag == has_red_tag)
+    
+    rows, next_cursor = await fetch_page(db, query, User.created_at, User.id, cursor, order, limit)
+    
+    result = [
+        {
+            "id": row.id,
+            "username": row.username,
+            "email": row.email,
+            "has_red_tag": row.has_red_tag,
+            "warning_count": row.warning_count,
+            "is_blocked": row.is_blocked,
+            "is_active": row.is_active,
+            "incident_count": row.incident_count,
+            "created_at": row.created_at
+        }
+        for row in rows
+    ]
+    
+    return listing_page(result, next_cursor)
 
 
 class UpdateTagRequest(BaseModel):
@@ -228,11 +338,11 @@ class UpdateTagRequest(BaseModel):
 async def update_user_tag(
     user_id: int,
     request_data: UpdateTagRequest,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user red tag status"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     
     if not user:
         raise HTTPException(
@@ -240,9 +350,12 @@ async def update_user_tag(
             detail="User not found"
         )
     
+    counted = stats_service.snapshot(user)
     user.has_red_tag = request_data.has_red_tag
-    db.commit()
-    db.refresh(user)
+    await stats_service.changed(db, counted, user)
+    await db.commit()
+    await principal_service.invalidate(user_id)
+    await db.refresh(user)
     
     return {"message": "User tag updated", "user": {"id": user.id, "has_red_tag": user.has_red_tag}}
 
@@ -255,11 +368,11 @@ class UpdateBlockRequest(BaseModel):
 async def block_unblock_user(
     user_id: int,
     request_data: UpdateBlockRequest,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Block or unblock a user"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.scalar(select(User).where(User.id == user_id))
     
     if not user:
         raise HTTPException(
@@ -267,76 +380,214 @@ async def block_unblock_user(
             detail="User not found"
         )
     
+    counted = stats_service.snapshot(user)
     user.is_blocked = request_data.is_blocked
-    db.commit()
-    db.refresh(user)
+    await stats_service.changed(db, counted, user)
+    await db.commit()
+    await principal_service.invalidate(user_id)
+    await db.refresh(user)
     
     return {"message": f"User {'blocked' if request_data.is_blocked else 'unblocked'}", "user": {"id": user.id, "is_blocked": user.is_blocked}}
 
 
+@router.get("/search", response_class=ORJSONResponse)
+async def search(
+    q: str = Query(..., min_length=1, description='Words, "exact phrases" and prefix* terms; all must match'),
+    scope: str = Query("messages", pattern="^(messages|incidents)$"),
+    user_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    order: str = Query("rank", pattern="^(rank|asc|desc)$"),
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.ADMIN_PAGE_SIZE, ge=1, le=settings.ADMIN_PAGE_MAX),
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Full-text search of message or incident content, best matches first (or by date).
+    
+    Covers text messages in the main table only; archived messages are not searched.
+    """
+    if scope == "messages":
+        model, text_column, author_id = Message, Message.content, Message.sender_id
+        query = select(
+            Message.id,
+            Message.content,
+            Message.receiver_id,
+            Message.conversation_id,
+            Message.is_flagged,
+            Message.created_at,
+            User.id.label("user_id"),
+            User.username
+        ).outerjoin(User, User.id == Message.sender_id).where(
+            # Only text messages are indexed (image and video content is a base64 payload)
+            Message.message_type == "text"
+        )
+    else:
+        model, text_column, author_id = Incident, Incident.detected_content, Incident.user_id
+        query = select(
+            Incident.id,
+            Incident.detected_content.label("content"),
+            Incident.severity,
+            Incident.status,
+            Incident.created_at,
+            User.id.label("user_id"),
+            User.username
+        ).outerjoin(User, User.id == Incident.user_id)
+    
+    try:
+        query, score = search_service.match(db, query, model, text_column, q)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    query = query.add_columns(score.label("score"))
+    
+    if user_id is not None:
+        query = query.where(author_id == user_id)
+    if date_from:
+        query = query.where(model.created_at >= date_from)
+    if date_to:
+        query = query.where(model.created_at < date_to)
+    
+    if order == "rank":
+        try:
+            query = search_service.rank_filter(query, score, model.id, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        next_cursor = encode_rank_cursor(rows[limit - 1].score, rows[limit - 1].id) if len(rows) > limit else None
+        rows = rows[:limit]
+    else:
+        rows, next_cursor = await fetch_page(db, query, model.created_at, model.id, cursor, order, limit)
+    
+    result = []
+    for row in rows:
+        item = {
+            "id": row.id,
+            "user": {
+                "id": row.user_id,
+                "username": row.username if row.user_id is not None else "Unknown"
+            },
+            "content": row.content,
+            "created_at": row.created_at,
+            "score": row.score
+        }
+        if scope == "messages":
+            item.update(receiver_id=row.receiver_id, conversation_id=row.conversation_id, is_flagged=row.is_flagged)
+        else:
+            item.update(severity=row.severity, status=row.status)
+        result.append(item)
+    
+    return listing_page(result, next_cursor)
+
+
 @router.get("/reports/generate")
 async def generate_report(
     user_id: Optional[int] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Generate evidence report"""
-    report_data = evidence_logger.generate_report(user_id, start_date, end_date)
+    try:
+        # Reads evidence segments from disk, so kept off the event loop
+        report_data = await asyncio.to_thread(evidence_logger.generate_report, user_id, start_date, end_date)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date and end_date must be ISO 8601 dates"
+        )
     return report_data
 
 
 @router.get("/incidents/{incident_id}/details")
 async def get_incident_details(
     incident_id: int,
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get detailed incident information including screenshots and user context"""
-    incident = db.query(Incident).filter(Incident.id == incident_id).first()
+    # Incident together with the user who triggered it
+    row = (await db.execute(
+        select(Incident, User).outerjoin(User, User.id == Incident.user_id).where(Incident.id == incident_id)
+    )).first()
     
-    if not incident:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Incident not found"
         )
-    
-    # Get user who triggered the incident
-    user = db.query(User).filter(User.id == incident.user_id).first()
-    
-    # Get the message that triggered the incident
-    message = db.query(Message).filter(Message.id == incident.message_id).first() if incident.message_id else None
-    
-    # Get sender and receiver info
-    sender = None
-    receiver = None
-    if message:
-        sender = db.query(User).filter(User.id == message.sender_id).first()
-        receiver = db.query(User).filter(User.id == message.receiver_id).first()
-    
-    # Get conversation context (5 messages before and after)
+    incident, user = row
+    
+    # Get the message that triggered the incident, with its sender and receiver
+    message = sender = receiver = None
+    if incident.message_id:
+        sender_user = aliased(User)
+        receiver_user = aliased(User)
+        row = (await db.execute(select(Message, sender_user, receiver_user).outerjoin(
+            sender_user, sender_user.id == Message.sender_id
+        ).outerjoin(
+            receiver_user, receiver_user.id == Message.receiver_id
+        ).where(Message.id == incident.message_id))).first()
+        if row:
+            message, sender, receiver = row
+    
+    # Get conversation context (5 messages before and after), senders joined in
     conversation_context = []
-    if message:
-        context_messages = db.query(Message).filter(
-            ((Message.sender_id == message.sender_id) & (Message.receiver_id == message.receiver_id)) |
-            ((Message.sender_id == message.receiver_id) & (Message.receiver_id == message.sender_id))
-        ).order_by(Message.created_at.desc()).limit(11).all()
+    if message and message.conversation_id is not None:
+        seq_from, seq_to = message.seq - 5, message.seq + 5
+        context_rows = (await db.execute(select(
+            Message.id,
+            Message.seq,
+            Message.content,
+            Message.content_filtered,
+            Message.is_flagged,
+            Message.created_at,
+            User.id.label("sender_id"),
+            User.username.label("sender_username"),
+            User.avatar_url.label("sender_avatar_url")
+        ).outerjoin(User, User.id == Message.sender_id).where(
+            Message.conversation_id == message.conversation_id,
+            Message.seq.between(seq_from, seq_to)
+        ).order_by(Message.seq.asc()))).mappings().all()
         
-        for msg in reversed(context_messages):
-            msg_sender = db.query(User).filter(User.id == msg.sender_id).first()
+        # Messages of the window missing from the main table may be archived; the
+        # incident's message stays hot, but its neighbours on either side can move
+        hot_seqs = {ctx["seq"] for ctx in context_rows}
+        missing = [seq for seq in range(max(seq_from, 1), seq_to + 1) if seq not in hot_seqs]
+        if missing and archive_service.covers():
+            archived = [
+                ctx for ctx in await archive_service.get_range(message.conversation_id, missing[0], missing[-1])
+                if ctx["seq"] not in hot_seqs
+            ]
+            senders = {row.id: row for row in (await db.execute(
+                select(User.id, User.username, User.avatar_url).where(
+                    User.id.in_({ctx["sender_id"] for ctx in archived})
+                )
+            )).all()} if archived else {}
+            archived_context = []
+            for ctx in archived:
+                sender_user = senders.get(ctx["sender_id"])
+                archived_context.append({
+                    **ctx,
+                    "sender_id": sender_user.id if sender_user else None,
+                    "sender_username": sender_user.username if sender_user else None,
+                    "sender_avatar_url": sender_user.avatar_url if sender_user else None
+                })
+            context_rows = sorted(archived_context + list(context_rows), key=lambda ctx: ctx["seq"])
+        
+        for ctx in context_rows:
             conversation_context.append({
-                "id": msg.id,
+                "id": ctx["id"],
                 "sender": {
-                    "id": msg_sender.id if msg_sender else None,
-                    "username": msg_sender.username if msg_sender else "Unknown",
-                    "avatar_url": msg_sender.avatar_url if msg_sender else None
+                    "id": ctx["sender_id"],
+                    "username": ctx["sender_username"] if ctx["sender_id"] is not None else "Unknown",
+                    "avatar_url": ctx["sender_avatar_url"]
                 },
-                "content": msg.content,
-                "content_filtered": msg.content_filtered,
-                "is_flagged": msg.is_flagged,
-                "created_at": msg.created_at.isoformat(),
-                "is_incident_message": msg.id == message.id
+                "content": ctx["content"],
+                "content_filtered": ctx["content_filtered"],
+                "is_flagged": ctx["is_flagged"],
+                "created_at": ctx["created_at"].isoformat(),
+                "is_incident_message": ctx["id"] == message.id
             })
     
     return {
@@ -387,50 +638,34 @@ async def get_incident_details(
 
 @router.get("/analytics")
 async def get_analytics(
-    admin_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    admin_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get analytics data for dashboard charts"""
-    from datetime import datetime, timedelta
-    from sqlalchemy import func
-    
-    # Get incidents by severity
-    severity_stats = db.query(
-        Incident.severity,
-        func.count(Incident.id).label('count')
-    ).group_by(Incident.severity).all()
-    
-    # Get incidents over last 7 days
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    daily_incidents = db.query(
-        func.date(Incident.created_at).label('date'),
-        func.count(Incident.id).label('count')
-    ).filter(Incident.created_at >= seven_days_ago).group_by(
-        func.date(Incident.created_at)
-    ).all()
-    
-    # Get top violators
-    top_violators = db.query(
-        User.id,
-        User.username,
-        User.has_red_tag,
-        func.count(Incident.id).label('incident_count')
-    ).join(Incident, User.id == Incident.user_id).group_by(
-        User.id
-    ).order_by(func.count(Incident.id).desc()).limit(10).all()
-    
-    # Get incident status distribution
-    status_stats = db.query(
-        Incident.status,
-        func.count(Incident.id).label('count')
-    ).group_by(Incident.status).all()
+    """Get analytics data for dashboard charts.
+    
+    Served from the incident rollups. Without a date range the distributions are all-time
+    and the daily series covers the last 7 days; ranges are widened to whole hours.
+    """
+    windows = analytics_service.windows(date_from, date_to)
+    if date_from or date_to:
+        daily_windows = windows
+    else:
+        daily_windows = analytics_service.windows(datetime.utcnow() - timedelta(days=7), None)
+    
+    severity_stats = await analytics_service.distribution(db, "severity", windows)
+    status_stats = await analytics_service.distribution(db, "status", windows)
+    detector_stats = await analytics_service.distribution(db, "detector", windows)
+    top_violators = await analytics_service.top_users(db, windows)
+    daily_incidents = await analytics_service.daily_counts(db, daily_windows)
     
     return {
         "severity_distribution": [
             {"severity": s[0], "count": s[1]} for s in severity_stats
         ],
         "daily_incidents": [
-            {"date": str(d[0]), "count": d[1]} for d in daily_incidents
+            {"date": str(day), "count": count} for day, count in daily_incidents.items()
         ],
         "top_violators": [
             {
@@ -442,5 +677,8 @@ async def get_analytics(
         ],
         "status_distribution": [
             {"status": s[0], "count": s[1]} for s in status_stats
+        ],
+        "detector_distribution": [
+            {"detector": s[0], "count": s[1]} for s in detector_stats
         ]
     }
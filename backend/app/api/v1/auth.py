@@ -3,24 +3,25 @@ Authentication endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token, decode_access_token
+from app.core.security import PasswordHasherBusy, password_hasher, create_access_token, decode_access_token
 from app.core.config import settings
 from app.models.user import User, UserRole
 from app.schemas.auth import UserSignup, UserLogin, Token, UserResponse
+from app.services.principals import Principal, principal_service
+from app.services.stats import stats_service
+from app.services.user_search import user_search_service
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
+def get_token_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    """User id of a valid access token"""
     payload = decode_access_token(token)
     if payload is None:
         raise HTTPException(
@@ -35,8 +36,29 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
-    
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    return int(user_id)
+
+
+async def get_current_principal(
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """Get the authorization fields of the current user, usually without a query"""
+    principal = await principal_service.get(db, user_id)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    return principal
+
+
+async def get_current_user(
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user as a full row, for endpoints that need more than the principal"""
+    user = await db.scalar(select(User).where(User.id == user_id))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,7 +68,7 @@ def get_current_user(
     return user
 
 
-def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin_user(current_user: Principal = Depends(get_current_principal)) -> Principal:
     """Get current user and verify admin role"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -56,13 +78,29 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)) -> Us
     return current_user
 
 
+def password_hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the hashing pool, or 503 when it is saturated"""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
+
+
 @router.post("/signup", response_model=UserResponse)
-async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(user_data: UserSignup, db: AsyncSession = Depends(get_db)):
     """User registration"""
     # Check if user exists
-    existing_user = db.query(User).filter(
+    existing_user = await db.scalar(select(User).where(
         (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    ))
     
     if existing_user:
         raise HTTPException(
@@ -71,7 +109,7 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     new_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -80,8 +118,10 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await stats_service.created(db, new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    user_search_service.add(new_user.id, new_user.username, new_user.email)
     
     return new_user
 
@@ -89,12 +129,19 @@ async def signup(user_data: UserSignup, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """User login"""
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(select(User).where(User.email == form_data.username))
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise password_hasher_busy()
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -107,6 +154,11 @@ async def login(
             detail="User account is inactive"
         )
     
+    # Stored hash uses outdated parameters (e.g. BCRYPT_ROUNDS was raised)
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     access_token = create_access_token(
         data={"sub": str(user.id), "email": user.email, "role": user.role}
     )
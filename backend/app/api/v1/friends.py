@@ -2,11 +2,14 @@
 Friend request endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 
 from app.core.database import get_db
-from app.api.v1.auth import get_current_user
+from app.api.v1.auth import get_current_principal
 from app.models.user import User
 from app.models.friend_request import FriendRequest, FriendRequestStatus
 from app.schemas.friend import (
@@ -16,6 +19,10 @@ from app.schemas.friend import (
     UserResponse,
     FriendRequestDetailResponse,
 )
+from app.services.friendships import friendship_service
+from app.services.presence import presence_service
+from app.services.principals import Principal
+from app.services.user_search import user_search_service
 
 router = APIRouter()
 
@@ -23,8 +30,8 @@ router = APIRouter()
 @router.post("/request", response_model=FriendRequestResponse)
 async def send_friend_request(
     request_data: FriendRequestCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Send a friend request"""
     if request_data.receiver_id == current_user.id:
@@ -34,18 +41,19 @@ async def send_friend_request(
         )
     
     # Check if receiver exists
-    receiver = db.query(User).filter(User.id == request_data.receiver_id).first()
+    receiver = await db.scalar(select(User).where(User.id == request_data.receiver_id))
     if not receiver:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Check if request already exists
-    existing_request = db.query(FriendRequest).filter(
-        ((FriendRequest.sender_id == current_user.id) & (FriendRequest.receiver_id == request_data.receiver_id)) |
-        ((FriendRequest.sender_id == request_data.receiver_id) & (FriendRequest.receiver_id == current_user.id))
-    ).first()
+    # Check if request already exists, in either direction
+    low, high = friendship_service.pair(current_user.id, request_data.receiver_id)
+    existing_request = await db.scalar(select(FriendRequest.id).where(
+        FriendRequest.user_low_id == low,
+        FriendRequest.user_high_id == high
+    ))
     
     if existing_request:
         raise HTTPException(
@@ -57,12 +65,22 @@ async def send_friend_request(
     friend_request = FriendRequest(
         sender_id=current_user.id,
         receiver_id=request_data.receiver_id,
+        user_low_id=low,
+        user_high_id=high,
         status=FriendRequestStatus.PENDING
     )
     
     db.add(friend_request)
-    db.commit()
-    db.refresh(friend_request)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent request for the same pair
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Friend request already exists"
+        )
+    await db.refresh(friend_request)
     
     return friend_request
 
@@ -79,28 +97,38 @@ def _serialize_friend_request(request: FriendRequest) -> FriendRequestDetailResp
 
 @router.get("/requests", response_model=List[FriendRequestDetailResponse])
 async def get_friend_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all friend requests (sent and received)"""
-    requests = db.query(FriendRequest).filter(
-        (FriendRequest.sender_id == current_user.id) |
-        (FriendRequest.receiver_id == current_user.id)
-    ).all()
+    requests = (await db.scalars(
+        select(FriendRequest).options(
+            selectinload(FriendRequest.sender),
+            selectinload(FriendRequest.receiver)
+        ).where(
+            (FriendRequest.sender_id == current_user.id) |
+            (FriendRequest.receiver_id == current_user.id)
+        )
+    )).all()
     
     return [_serialize_friend_request(req) for req in requests]
 
 
 @router.get("/requests/received", response_model=List[FriendRequestDetailResponse])
 async def get_received_friend_requests(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get received friend requests"""
-    requests = db.query(FriendRequest).filter(
-        FriendRequest.receiver_id == current_user.id,
-        FriendRequest.status == FriendRequestStatus.PENDING
-    ).all()
+    requests = (await db.scalars(
+        select(FriendRequest).options(
+            selectinload(FriendRequest.sender),
+            selectinload(FriendRequest.receiver)
+        ).where(
+            FriendRequest.receiver_id == current_user.id,
+            FriendRequest.status == FriendRequestStatus.PENDING
+        )
+    )).all()
     
     return [_serialize_friend_request(req) for req in requests]
 
@@ -109,14 +137,14 @@ async def get_received_friend_requests(
 async def respond_to_friend_request(
     request_id: int,
     update_data: FriendRequestUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Accept or reject a friend request"""
-    friend_request = db.query(FriendRequest).filter(
+    friend_request = await db.scalar(select(FriendRequest).where(
         FriendRequest.id == request_id,
         FriendRequest.receiver_id == current_user.id
-    ).first()
+    ))
     
     if not friend_request:
         raise HTTPException(
@@ -132,6 +160,7 @@ async def respond_to_friend_request(
     
     if update_data.status == "accepted":
         friend_request.status = FriendRequestStatus.ACCEPTED
+        await friendship_service.add_friendship(db, friend_request)
     elif update_data.status == "rejected":
         friend_request.status = FriendRequestStatus.REJECTED
     else:
@@ -140,51 +169,39 @@ async def respond_to_friend_request(
             detail="Invalid status. Use 'accepted' or 'rejected'"
         )
     
-    db.commit()
-    db.refresh(friend_request)
+    await db.commit()
+    await db.refresh(friend_request)
+    
+    # Friend sets cached on any worker are stale now
+    await friendship_service.invalidate(friend_request.sender_id, friend_request.receiver_id)
     
     return friend_request
 
 
 @router.get("/list", response_model=List[UserResponse])
 async def get_friends_list(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get list of friends (accepted friend requests)"""
-    # Get all accepted friend requests where user is sender or receiver
-    accepted_requests = db.query(FriendRequest).filter(
-        ((FriendRequest.sender_id == current_user.id) |
-         (FriendRequest.receiver_id == current_user.id)),
-        FriendRequest.status == FriendRequestStatus.ACCEPTED
-    ).all()
+    """Get list of friends (accepted friend requests) with their online status"""
+    friends = await friendship_service.get_friends(db, current_user.id)
     
-    # Extract friend IDs
-    friend_ids = []
-    for req in accepted_requests:
-        if req.sender_id == current_user.id:
-            friend_ids.append(req.receiver_id)
-        else:
-            friend_ids.append(req.sender_id)
+    # Presence lives in memory/Redis, so this is one bulk lookup and no extra queries
+    online_ids = await presence_service.get_online(friend.id for friend in friends)
     
-    # Get friend users
-    friends = db.query(User).filter(User.id.in_(friend_ids)).all()
-    
-    return friends
+    return [
+        UserResponse.model_validate(friend).model_copy(update={"is_online": friend.id in online_ids})
+        for friend in friends
+    ]
 
 
 @router.get("/search", response_model=List[UserResponse])
 async def search_users(
     query: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Search users by username or email"""
-    users = db.query(User).filter(
-        (User.username.ilike(f"%{query}%")) |
-        (User.email.ilike(f"%{query}%")),
-        User.id != current_user.id
-    ).limit(20).all()
-    
-    return users
+    # Ranked from the in-memory index; only the matching users are read from the database
+    return await user_search_service.search(db, query, limit=20, exclude=current_user.id)
 
@@ -1,20 +1,32 @@
 """
 Message endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import base64
 
+from app.core.config import settings
 from app.core.database import get_db
-from app.api.v1.auth import get_current_user
+from app.core.pagination import decode_cursor, encode_cursor
+from app.api.v1.auth import get_current_principal
 from app.models.user import User
 from app.models.message import Message
+from app.models.conversation import Conversation
 from app.models.incident import Incident, SeverityLevel, IncidentStatus
-from app.models.friend_request import FriendRequest, FriendRequestStatus
 from app.schemas.message import MessageCreate, MessageResponse
 from app.services.ai_detection import ai_detection_service
+from app.services.analytics import analytics_service
+from app.services.escalation import escalation_service
 from app.services.evidence_logger import evidence_logger
+from app.services.conversations import conversation_service
+from app.services.friendships import friendship_service
+from app.services.message_writer import message_writer
+from app.services.principals import Principal, principal_service
+from app.services.read_receipts import read_receipt_service
+from app.services.stats import stats_service
 
 router = APIRouter()
 
@@ -22,19 +34,13 @@ router = APIRouter()
 @router.post("/send", response_model=MessageResponse)
 async def send_message(
     message_data: MessageCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Send a message with AI detection"""
     # Check if users are friends
     if message_data.receiver_id != current_user.id:
-        friendship = db.query(FriendRequest).filter(
-            ((FriendRequest.sender_id == current_user.id) & (FriendRequest.receiver_id == message_data.receiver_id)) |
-            ((FriendRequest.sender_id == message_data.receiver_id) & (FriendRequest.receiver_id == current_user.id)),
-            FriendRequest.status == FriendRequestStatus.ACCEPTED
-        ).first()
-        
-        if not friendship:
+        if not await friendship_service.are_friends(db, current_user.id, message_data.receiver_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Users must be friends to send messages"
@@ -76,19 +82,15 @@ async def send_message(
             )
             
             db.add(incident)
+            await stats_service.created(db, incident)
+            await analytics_service.incident_created(db, incident)
             
-            # Update user warning count
-            current_user.warning_count += 1
-            
-            # Check thresholds
-            if current_user.warning_count >= 3:
-                current_user.has_red_tag = True
-            if current_user.warning_count >= 5:
-                current_user.is_blocked = True
-                is_blocked = True
+            # Update user warning count and thresholds atomically
+            escalation = await escalation_service.escalate(db, await db.get(User, current_user.id))
+            is_blocked = escalation["blocked"]
             
             # Log evidence
-            evidence_logger.log_incident(
+            await evidence_logger.log_incident(
                 user_id=current_user.id,
                 message_id=None,
                 severity=detection_result["severity"],
@@ -97,7 +99,9 @@ async def send_message(
                 context=f"Message to user {message_data.receiver_id}"
             )
             
-            db.commit()
+            await db.commit()
+            if is_blocked:
+                await principal_service.invalidate(current_user.id)
     
     # Create message
     message = Message(
@@ -112,18 +116,14 @@ async def send_message(
         is_blocked=is_blocked
     )
     
-    db.add(message)
-    db.commit()
-    db.refresh(message)
-    
-    return message
+    return await message_writer.write(message)
 
 
 @router.post("/upload-image")
 async def upload_image(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload and validate image"""
     # Read image data
@@ -144,14 +144,13 @@ async def upload_image(
         )
         
         db.add(incident)
-        current_user.warning_count += 1
-        
-        if current_user.warning_count >= 3:
-            current_user.has_red_tag = True
-        if current_user.warning_count >= 5:
-            current_user.is_blocked = True
+        await stats_service.created(db, incident)
+        await analytics_service.incident_created(db, incident)
+        escalation = await escalation_service.escalate(db, await db.get(User, current_user.id))
         
-        db.commit()
+        await db.commit()
+        if escalation["blocked"]:
+            await principal_service.invalidate(current_user.id)
         
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -177,82 +176,146 @@ async def upload_image(
 @router.get("/conversation/{user_id}", response_model=List[MessageResponse])
 async def get_conversation(
     user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get conversation between current user and another user"""
-    messages = db.query(Message).filter(
-        ((Message.sender_id == current_user.id) & (Message.receiver_id == user_id)) |
-        ((Message.sender_id == user_id) & (Message.receiver_id == current_user.id))
-    ).order_by(Message.created_at.asc()).all()
+    return await conversation_service.get_all_messages(db, current_user.id, user_id)
+
+
+# Fields returned by the paginated history, same as MessageResponse
+HISTORY_KEYS = (
+    "id",
+    "sender_id",
+    "receiver_id",
+    "content",
+    "content_filtered",
+    "message_type",
+    "file_url",
+    "is_flagged",
+    "severity_score",
+    "conversation_id",
+    "seq",
+    "created_at"
+)
+
+
+@router.get("/conversation/{user_id}/history", response_class=ORJSONResponse)
+async def get_conversation_history(
+    user_id: int,
+    before: Optional[str] = Query(None, description="Cursor: return messages older than this one"),
+    after: Optional[str] = Query(None, description="Cursor: return messages newer than this one"),
+    limit: int = Query(settings.MESSAGE_PAGE_SIZE, ge=1, le=settings.MESSAGE_PAGE_MAX),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Page through a conversation by (created_at, id); the latest page when no cursor is given"""
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either 'before' or 'after', not both"
+        )
     
-    return messages
+    try:
+        if after or before:
+            decode_cursor(after or before)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    descending = not after
+    
+    rows = []
+    conversation = await conversation_service.get_conversation(db, current_user.id, user_id)
+    if conversation is not None:
+        # One extra row tells whether more pages exist
+        rows = await conversation_service.get_messages_page(db, conversation.id, after or before, descending, limit + 1)
+    rows = [{key: row[key] for key in HISTORY_KEYS} for row in rows]
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not after:
+        rows = rows[::-1]
+    
+    return ORJSONResponse({
+        "messages": rows,
+        "has_more": has_more,
+        # Cursors for the next older and next newer page
+        "before": encode_cursor(rows[0]["created_at"], rows[0]["id"]) if rows else before,
+        "after": encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if rows else after
+    })
 
 
-@router.get("/conversations", response_model=List[dict])
+@router.get("/conversations", response_class=ORJSONResponse)
 async def get_conversations(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all conversations for current user"""
-    # Get all unique user IDs that current user has messaged with
-    sent_messages = db.query(Message.receiver_id).filter(Message.sender_id == current_user.id).distinct().all()
-    received_messages = db.query(Message.sender_id).filter(Message.receiver_id == current_user.id).distinct().all()
+    # One query over the denormalized conversation summaries, newest activity first
+    is_low = Conversation.user_low_id == current_user.id
+    partner_id = case((is_low, Conversation.user_high_id), else_=Conversation.user_low_id)
+    unread_count = case((is_low, Conversation.unread_low_count), else_=Conversation.unread_high_count)
     
-    user_ids = set()
-    for msg in sent_messages:
-        user_ids.add(msg[0])
-    for msg in received_messages:
-        user_ids.add(msg[0])
+    rows = (await db.execute(select(
+        partner_id.label("partner_id"),
+        unread_count.label("unread_count"),
+        Conversation.last_message_id,
+        Conversation.last_sender_id,
+        Conversation.last_message_preview,
+        Conversation.last_activity_at,
+        User.username,
+        User.avatar_url,
+        User.has_red_tag
+    ).select_from(Conversation).outerjoin(
+        User, User.id == partner_id
+    ).where(
+        (Conversation.user_low_id == current_user.id) | (Conversation.user_high_id == current_user.id),
+        Conversation.last_message_id.isnot(None)
+    ).order_by(Conversation.last_activity_at.desc()))).all()
     
-    # Get last message for each conversation
     conversations = []
-    for uid in user_ids:
-        last_message = db.query(Message).filter(
-            ((Message.sender_id == current_user.id) & (Message.receiver_id == uid)) |
-            ((Message.sender_id == uid) & (Message.receiver_id == current_user.id))
-        ).order_by(Message.created_at.desc()).first()
-        
-        if not last_message:
-            continue
-        
+    for row in rows:
         # Special handling for CyberBOT (user_id = 0)
-        if uid == 0:
-            conversations.append({
-                "user": {
-                    "id": 0,
-                    "username": "CyberBOT",
-                    "avatar_url": None,
-                    "has_red_tag": False
-                },
-                "last_message": {
-                    "id": last_message.id,
-                    "content": "🤖 Safety Alert - Click to view",
-                    "created_at": last_message.created_at,
-                    "sender_id": last_message.sender_id
-                }
-            })
+        if row.partner_id == 0:
+            user = {
+                "id": 0,
+                "username": "CyberBOT",
+                "avatar_url": None,
+                "has_red_tag": False
+            }
+            content = "🤖 Safety Alert - Click to view"
+        elif row.username is not None:
+            user = {
+                "id": row.partner_id,
+                "username": row.username,
+                "avatar_url": row.avatar_url,
+                "has_red_tag": row.has_red_tag
+            }
+            content = row.last_message_preview
         else:
-            other_user = db.query(User).filter(User.id == uid).first()
-            
-            if other_user:
-                conversations.append({
-                    "user": {
-                        "id": other_user.id,
-                        "username": other_user.username,
-                        "avatar_url": other_user.avatar_url,
-                        "has_red_tag": other_user.has_red_tag
-                    },
-                    "last_message": {
-                        "id": last_message.id,
-                        "content": last_message.content_filtered or last_message.content,
-                        "created_at": last_message.created_at,
-                        "sender_id": last_message.sender_id
-                    }
-                })
-    
-    # Sort by last message time
-    conversations.sort(key=lambda x: x["last_message"]["created_at"], reverse=True)
+            continue
+        
+        conversations.append({
+            "user": user,
+            "last_message": {
+                "id": row.last_message_id,
+                "content": content,
+                "created_at": row.last_activity_at,
+                "sender_id": row.last_sender_id
+            },
+            "unread_count": row.unread_count
+        })
     
-    return conversations
+    return ORJSONResponse(conversations)
 
+
+@router.get("/unread", response_class=ORJSONResponse)
+async def get_unread_counts(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get unread message counts for all conversations of the current user"""
+    # Persist buffered read marks first so the counts reflect the user's own receipts
+    if read_receipt_service.has_pending(current_user.id):
+        await read_receipt_service.flush()
+    
+    return ORJSONResponse(await read_receipt_service.get_unread_counts(db, current_user.id))
@@ -2,16 +2,19 @@
 Mental health support and reporting endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from datetime import datetime
 
 from app.core.database import get_db
-from app.api.v1.auth import get_current_user
+from app.api.v1.auth import get_current_principal
 from app.schemas.support import MentalHealthRequest, MentalHealthResponse
 from app.services.ai_detection import ai_detection_service
 from app.models.user import User
 from app.models.report import Report, ReportStatus
+from app.services.principals import Principal
+from app.services.stats import stats_service
 
 router = APIRouter()
 
@@ -26,7 +29,7 @@ class ReportCreate(BaseModel):
 @router.post("/chat", response_model=MentalHealthResponse)
 async def mental_health_chat(
     payload: MentalHealthRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
 ):
     """
     Generate an empathetic response from the mental health assistant.
@@ -41,12 +44,12 @@ async def mental_health_chat(
 @router.post("/report")
 async def create_report(
     report_data: ReportCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new user-initiated report"""
     # Verify reported user exists
-    reported_user = db.query(User).filter(User.id == report_data.reported_user_id).first()
+    reported_user = await db.scalar(select(User).where(User.id == report_data.reported_user_id))
     if not reported_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,8 +68,9 @@ async def create_report(
     )
     
     db.add(new_report)
-    db.commit()
-    db.refresh(new_report)
+    await stats_service.created(db, new_report)
+    await db.commit()
+    await db.refresh(new_report)
     
     return {
         "message": "Report submitted successfully",
@@ -2,20 +2,32 @@
 WebSocket endpoints for real-time chat
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, status
-from sqlalchemy.orm import Session
-from typing import Dict, List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional
+import asyncio
 import json
 import base64
-from datetime import datetime
+import time
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.serialization import dumps, loads
 from app.models.user import User
 from app.models.message import Message
 from app.models.incident import Incident, SeverityLevel
-from app.models.friend_request import FriendRequest, FriendRequestStatus
 from app.services.ai_detection import ai_detection_service
 from app.services.evidence_logger import evidence_logger
 from app.services.cyberbot import cyberbot_service
+from app.services.conversations import conversation_service
+from app.services.read_receipts import read_receipt_service
+from app.services.presence import presence_service, PRESENCE_CHANNEL
+from app.services.friendships import friendship_service
+from app.services.message_writer import message_writer
+from app.services.moderation import moderation_service
+from app.services.principals import Principal, principal_service
+from app.core.pubsub import event_bus
 from app.core.security import decode_access_token
 
 router = APIRouter()
@@ -23,39 +35,146 @@ router = APIRouter()
 # Active connections: {user_id: WebSocket}
 active_connections: Dict[int, WebSocket] = {}
 
+# Close code sent to sockets reaped by the heartbeat
+WS_CLOSE_HEARTBEAT_TIMEOUT = 4000
+
+PING_FRAME = dumps({"type": "ping"})
+
 
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}
+        # {user_id: [WebSocket, ...]} - one entry per connected device
+        self.active_connections: Dict[int, List[WebSocket]] = {}
+        # Monotonic time of the last frame (any type) and last non-pong frame per socket
+        self.last_seen: Dict[WebSocket, float] = {}
+        self.last_active: Dict[WebSocket, float] = {}
     
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
-        print(f"User {user_id} connected. Active connections: {len(self.active_connections)}")
+        self.active_connections.setdefault(user_id, []).append(websocket)
+        now = time.monotonic()
+        self.last_seen[websocket] = now
+        self.last_active[websocket] = now
+        metrics.incr("ws_connections_total")
+        presence_service.connected(user_id)
+        self._update_gauges()
+        print(f"User {user_id} connected. Active connections: {len(self.last_seen)}")
     
-    def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
+    def disconnect(self, user_id: int, websocket: Optional[WebSocket] = None):
+        """Forget one socket of a user, or all of them when no socket is given"""
+        sockets = self.active_connections.get(user_id)
+        if not sockets:
+            return
+        
+        targets = [websocket] if websocket is not None else list(sockets)
+        removed = [ws for ws in targets if ws in sockets]
+        if not removed:
+            return
+        
+        for ws in removed:
+            sockets.remove(ws)
+            presence_service.disconnected(user_id)
+            self.last_seen.pop(ws, None)
+            self.last_active.pop(ws, None)
+        
+        if not sockets:
             del self.active_connections[user_id]
-            print(f"User {user_id} disconnected. Active connections: {len(self.active_connections)}")
+        self._update_gauges()
+        print(f"User {user_id} disconnected. Active connections: {len(self.last_seen)}")
     
-    async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.active_connections:
+    def touch(self, websocket: WebSocket, active: bool = True) -> bool:
+        """Record that a frame arrived on the socket; False once it has been reaped"""
+        if websocket not in self.last_seen:
+            return False
+        now = time.monotonic()
+        self.last_seen[websocket] = now
+        if active:
+            self.last_active[websocket] = now
+        return True
+    
+    async def heartbeat(self, websocket: WebSocket, user_id: int):
+        """Ping the socket periodically and reap it once it stops answering"""
+        while websocket in self.last_seen:
+            await asyncio.sleep(settings.WS_PING_INTERVAL)
+            
+            if settings.WS_IDLE_TIMEOUT:
+                idle_for = time.monotonic() - self.last_active.get(websocket, 0.0)
+                if idle_for > settings.WS_IDLE_TIMEOUT:
+                    await self.reap(websocket, user_id, "idle timeout")
+                    return
+            
+            ping_sent_at = time.monotonic()
             try:
-                await self.active_connections[user_id].send_json(message)
-            except Exception as e:
-                print(f"Error sending message to user {user_id}: {e}")
-                self.disconnect(user_id)
+                await websocket.send_text(PING_FRAME)
+            except Exception:
+                await self.reap(websocket, user_id, "ping failed")
+                return
+            
+            await asyncio.sleep(settings.WS_PONG_TIMEOUT)
+            if self.last_seen.get(websocket, 0.0) < ping_sent_at:
+                await self.reap(websocket, user_id, "heartbeat timeout")
+                return
+    
+    async def reap(self, websocket: WebSocket, user_id: int, reason: str):
+        """Drop a dead or idle socket and close it"""
+        if websocket not in self.last_seen:
+            return
+        metrics.incr("ws_reaped_total")
+        print(f"Reaping connection of user {user_id}: {reason}")
+        self.disconnect(user_id, websocket)
+        try:
+            await websocket.close(code=WS_CLOSE_HEARTBEAT_TIMEOUT, reason=reason)
+        except Exception:
+            pass
+    
+    async def send_personal_message(self, message: dict, user_id: int):
+        await self.send_to_users(message, [user_id])
+    
+    async def send_to_users(self, message: dict, user_ids: Iterable[int]):
+        """Serialize a frame once and send the same text to every device of every user"""
+        text = dumps(message)
+        for user_id in user_ids:
+            for websocket in list(self.active_connections.get(user_id, [])):
+                try:
+                    await websocket.send_text(text)
+                except Exception as e:
+                    print(f"Error sending message to user {user_id}: {e}")
+                    self.disconnect(user_id, websocket)
     
     async def broadcast_to_user(self, message: dict, user_id: int):
         """Send message to a specific user if they're connected"""
         await self.send_personal_message(message, user_id)
+    
+    def _update_gauges(self):
+        metrics.set_gauge("ws_open_connections", len(self.last_seen))
+        metrics.set_gauge("ws_online_users", len(self.active_connections))
 
 
 manager = ConnectionManager()
 
 
-async def get_user_from_token(token: str, db: Session) -> User:
-    """Get user from WebSocket token"""
+async def handle_presence_event(payload: dict):
+    """Push a presence change to the friends of the user connected to this worker"""
+    if not manager.active_connections:
+        return
+    
+    user_id = payload["user_id"]
+    async with AsyncSessionLocal() as db:
+        friend_ids = await friendship_service.get_friend_ids(db, user_id)
+    local_friends = [fid for fid in friend_ids if fid in manager.active_connections]
+    if local_friends:
+        await manager.send_to_users({
+            "type": "presence",
+            "user_id": user_id,
+            "online": payload["online"]
+        }, local_friends)
+
+
+event_bus.subscribe(PRESENCE_CHANNEL, handle_presence_event)
+
+
+async def get_user_from_token(token: str, db: AsyncSession) -> Optional[Principal]:
+    """Get the principal of a WebSocket token's user"""
     try:
         payload = decode_access_token(token)
         if not payload:
@@ -67,8 +186,7 @@ async def get_user_from_token(token: str, db: Session) -> User:
             print("No user_id in token")
             return None
         
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        return user
+        return await principal_service.get(db, int(user_id))
     except Exception as e:
         print(f"Token validation error: {e}")
         return None
@@ -77,42 +195,52 @@ async def get_user_from_token(token: str, db: Session) -> User:
 @router.websocket("/chat/{token}")
 async def websocket_endpoint(websocket: WebSocket, token: str):
     """WebSocket endpoint for real-time chat"""
-    from app.core.database import SessionLocal
+    async with AsyncSessionLocal() as db:
+        user = await get_user_from_token(token, db)
+    
+    if not user:
+        print(f"WebSocket authentication failed for token: {token[:10]}...")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    user_id = user.id
+    await manager.connect(websocket, user_id)
+    heartbeat = asyncio.create_task(manager.heartbeat(websocket, user_id))
     
-    db = SessionLocal()
     try:
-        user = await get_user_from_token(token, db)
-        
-        if not user:
-            print(f"WebSocket authentication failed for token: {token[:10]}...")
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-        
-        await manager.connect(websocket, user.id)
-        
-        try:
-            while True:
-                data = await websocket.receive_json()
-                message_type = data.get("type")
-                
-                if message_type == "message":
-                    await handle_message(data, user, db)
-                elif message_type == "typing":
-                    await handle_typing(data, user)
-                elif message_type == "read":
-                    await handle_read(data, user, db)
-        
-        except WebSocketDisconnect:
-            manager.disconnect(user.id)
-        except Exception as e:
-            print(f"WebSocket error for user {user.id}: {e}")
-            manager.disconnect(user.id)
+        while True:
+            data = loads(await websocket.receive_text())
+            message_type = data.get("type")
+            if not manager.touch(websocket, active=message_type != "pong"):
+                # Reaped by the heartbeat while this frame was in flight
+                break
             
+            if message_type == "typing":
+                await handle_typing(data, user)
+            elif message_type in ("message", "read", "sync"):
+                # Sessions are opened per frame so idle sockets don't hold pool slots
+                async with AsyncSessionLocal() as db:
+                    current_user = await db.scalar(select(User).where(User.id == user_id))
+                    if not current_user:
+                        break
+                    
+                    if message_type == "message":
+                        await handle_message(data, current_user, db)
+                    elif message_type == "sync":
+                        await handle_sync(data, current_user, db, websocket)
+                    else:
+                        await handle_read(data, current_user, db)
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"WebSocket error for user {user_id}: {e}")
     finally:
-        db.close()
+        heartbeat.cancel()
+        manager.disconnect(user_id, websocket)
 
 
-async def handle_message(data: dict, sender: User, db: Session):
+async def handle_message(data: dict, sender: User, db: AsyncSession):
     """Handle incoming message"""
     receiver_id = data.get("receiver_id")
     content = data.get("content", "")
@@ -122,13 +250,7 @@ async def handle_message(data: dict, sender: User, db: Session):
         return
     
     # Check friendship
-    friendship = db.query(FriendRequest).filter(
-        ((FriendRequest.sender_id == sender.id) & (FriendRequest.receiver_id == receiver_id)) |
-        ((FriendRequest.sender_id == receiver_id) & (FriendRequest.receiver_id == sender.id)),
-        FriendRequest.status == FriendRequestStatus.ACCEPTED
-    ).first()
-    
-    if not friendship and receiver_id != sender.id:
+    if receiver_id != sender.id and not await friendship_service.are_friends(db, sender.id, receiver_id):
         await manager.send_personal_message({
             "type": "error",
             "message": "Users must be friends to send messages"
@@ -177,8 +299,18 @@ async def handle_message(data: dict, sender: User, db: Session):
             # Treat as text if decoding fails or just ignore
             pass
 
+    message = Message(
+        sender_id=sender.id,
+        receiver_id=receiver_id,
+        content=content,
+        content_filtered=content_filtered,
+        message_type=message_type,
+        is_flagged=is_flagged,
+        severity_score=severity_score,
+        is_blocked=is_blocked
+    )
+    
     if is_flagged:
-        # Create incident
         incident = Incident(
             user_id=sender.id,
             severity=SeverityLevel(detection_result.get("severity", "medium")),
@@ -187,71 +319,48 @@ async def handle_message(data: dict, sender: User, db: Session):
             detection_model="groq-llama" if message_type == "text" else "hf-nsfw",
             confidence_score=str(detection_result.get("confidence", 0.0))
         )
-        db.add(incident)
+        violation_type = detection_result.get("categories", ["default"])[0] if detection_result.get("categories") else "default"
         
-        # Log evidence
-        evidence_logger.log_incident(
-            user_id=sender.id,
-            message_id=None,
-            severity=detection_result.get("severity", "medium"),
-            detected_content=content if message_type == "text" else "[IMAGE]",
-            ai_analysis=detection_result.get("analysis", "")
+        # Message, incident, warning count and CyberBOT warning in one transaction
+        violation = await moderation_service.record_violation(
+            db,
+            sender,
+            message,
+            incident,
+            violation_type,
+            categories=detection_result.get("categories", [])
         )
+        is_blocked = message.is_blocked
         
-        # Send CyberBOT warning to violator
-        violation_type = detection_result.get("categories", ["default"])[0] if detection_result.get("categories") else "default"
-        print(f"[DEBUG] Sending CyberBOT warning to user {sender.id}, violation: {violation_type}")
-        
-        warning_result = await cyberbot_service.send_warning(
-            db=db,
+        # Side effects only once the violation is committed
+        await evidence_logger.log_incident(
             user_id=sender.id,
-            violation_type=violation_type,
+            message_id=message.id,
             severity=detection_result.get("severity", "medium"),
-            categories=detection_result.get("categories", [])
+            detected_content=content if message_type == "text" else "[IMAGE]",
+            ai_analysis=detection_result.get("analysis", "")
         )
         
-        print(f"[DEBUG] CyberBOT warning result: {warning_result}")
-        
-        # Send warning notification via WebSocket
-        if warning_result["success"]:
-            print(f"[DEBUG] Sending WebSocket notification to user {sender.id}")
-            await manager.send_personal_message({
-                "type": "cyberbot_warning",
-                "id": warning_result["message_id"],
-                "sender_id": cyberbot_service.CYBERBOT_USER_ID,
-                "sender_username": cyberbot_service.CYBERBOT_USERNAME,
-                "content": warning_result["message"],
-                "content_filtered": warning_result["message"],
-                "message_type": "system_warning",
-                "is_flagged": False,
-                "severity_score": "info",
-                "warning_count": warning_result["warning_count"],
-                "red_tagged": warning_result["red_tagged"],
-                "created_at": datetime.utcnow().isoformat()
-            }, sender.id)
-            print(f"[DEBUG] WebSocket notification sent successfully")
-        else:
-            print(f"[DEBUG] Warning failed: {warning_result.get('error')}")
-        
-        # Update sender status (already done in cyberbot_service, but refresh)
-        db.refresh(sender)
-        if sender.is_blocked:
-            is_blocked = True
-    
-    # Save message to database
-    message = Message(
-        sender_id=sender.id,
-        receiver_id=receiver_id,
-        content=content,
-        content_filtered=content_filtered,
-        message_type=message_type,
-        is_flagged=is_flagged,
-        severity_score=severity_score,
-        is_blocked=is_blocked
-    )
-    db.add(message)
-    db.commit()
-    db.refresh(message)
+        warning = violation["warning"]
+        await manager.send_personal_message({
+            "type": "cyberbot_warning",
+            "id": warning.id,
+            "sender_id": cyberbot_service.CYBERBOT_USER_ID,
+            "sender_username": cyberbot_service.CYBERBOT_USERNAME,
+            "content": warning.content,
+            "content_filtered": warning.content,
+            "message_type": "system_warning",
+            "is_flagged": False,
+            "severity_score": "info",
+            "warning_count": violation["warning_count"],
+            "red_tagged": violation["red_tagged"],
+            "conversation_id": warning.conversation_id,
+            "seq": warning.seq,
+            "created_at": warning.created_at
+        }, sender.id)
+    else:
+        # Committed together with other senders' messages; acknowledged once durable
+        message = await message_writer.write(message)
     
     # Send to receiver (only if not blocked)
     if not is_blocked:
@@ -266,7 +375,9 @@ async def handle_message(data: dict, sender: User, db: Session):
             "message_type": message_type,
             "is_flagged": is_flagged,
             "severity_score": severity_score,
-            "created_at": message.created_at.isoformat()
+            "conversation_id": message.conversation_id,
+            "seq": message.seq,
+            "created_at": message.created_at
         }, receiver_id)
     
     # Send confirmation to sender
@@ -275,10 +386,84 @@ async def handle_message(data: dict, sender: User, db: Session):
         "id": message.id,
         "receiver_id": receiver_id,
         "is_blocked": is_blocked,
-        "created_at": message.created_at.isoformat()
+        "conversation_id": message.conversation_id,
+        "seq": message.seq,
+        "created_at": message.created_at
     }, sender.id)
 
 
+def serialize_sync_message(message: Dict) -> dict:
+    """Shape a stored message like a live message frame"""
+    content_filtered = message["content_filtered"] or message["content"]
+    return {
+        "id": message["id"],
+        "sender_id": message["sender_id"],
+        "receiver_id": message["receiver_id"],
+        "content": content_filtered,
+        "content_filtered": content_filtered,
+        "content_original": message["content"] if not message["is_flagged"] else None,
+        "message_type": message["message_type"],
+        "is_flagged": message["is_flagged"],
+        "severity_score": message["severity_score"],
+        "is_blocked": message["is_blocked"],
+        "conversation_id": message["conversation_id"],
+        "seq": message["seq"],
+        "created_at": message["created_at"]
+    }
+
+
+async def handle_sync(data: dict, user: User, db: AsyncSession, websocket: WebSocket):
+    """Replay messages missed since the client's cursors, in bounded batches.
+    
+    The client sends {"type": "sync", "cursors": {partner_id: last_seen_seq}}.
+    Conversations with newer messages are streamed as sync_batch frames of at
+    most WS_SYNC_BATCH_SIZE messages, and at most WS_SYNC_MAX_MESSAGES are sent
+    per sync across all conversations. The final sync_complete frame carries the
+    new cursors and the partners whose conversations still have more; the
+    client resumes by sending another sync with those cursors.
+    """
+    cursors = conversation_service.parse_cursors(data.get("cursors"))
+    batch_size = settings.WS_SYNC_BATCH_SIZE
+    remaining = settings.WS_SYNC_MAX_MESSAGES
+    new_cursors = {}
+    has_more = []
+    
+    for conversation in await conversation_service.get_user_conversations(db, user.id):
+        partner_id = conversation.partner_of(user.id)
+        cursor = cursors.get(partner_id, 0)
+        
+        while cursor < conversation.last_seq and remaining > 0:
+            limit = min(batch_size, remaining)
+            missed = await conversation_service.get_missed_messages(db, conversation.id, cursor, limit)
+            if not missed:
+                break
+            
+            cursor = missed[-1]["seq"]
+            remaining -= len(missed)
+            # Blocked messages are never delivered to the receiver
+            visible = [
+                serialize_sync_message(msg) for msg in missed
+                if not msg["is_blocked"] or msg["sender_id"] == user.id
+            ]
+            await websocket.send_text(dumps({
+                "type": "sync_batch",
+                "partner_id": partner_id,
+                "conversation_id": conversation.id,
+                "messages": visible,
+                "cursor": cursor
+            }))
+        
+        new_cursors[partner_id] = cursor
+        if cursor < conversation.last_seq:
+            has_more.append(partner_id)
+    
+    await websocket.send_text(dumps({
+        "type": "sync_complete",
+        "cursors": new_cursors,
+        "has_more": has_more
+    }))
+
+
 async def handle_typing(data: dict, user: User):
     """Handle typing indicator"""
     receiver_id = data.get("receiver_id")
@@ -293,15 +478,44 @@ async def handle_typing(data: dict, user: User):
         }, receiver_id)
 
 
-async def handle_read(data: dict, user: User, db: Session):
-    """Handle read receipt"""
+async def handle_read(data: dict, user: User, db: AsyncSession):
+    """Handle read receipt.
+    
+    Accepts {"message_id": id} or {"partner_id": id, "seq": seq}. The read mark is
+    buffered for a batched write and the receipt is forwarded to the partner's
+    devices and echoed to the reader's other devices.
+    """
     message_id = data.get("message_id")
     
     if message_id:
-        # Update message read status if needed
-        await manager.send_personal_message({
-            "type": "read",
-            "message_id": message_id,
-            "user_id": user.id
-        }, user.id)
-
+        message = await db.scalar(select(Message).where(
+            Message.id == message_id,
+            (Message.sender_id == user.id) | (Message.receiver_id == user.id)
+        ))
+        if not message or message.seq is None:
+            return
+        conversation_id = message.conversation_id
+        seq = message.seq
+        partner_id = message.sender_id if message.receiver_id == user.id else message.receiver_id
+    else:
+        partner_id = data.get("partner_id")
+        seq = data.get("seq")
+        if partner_id is None or seq is None:
+            return
+        conversation = await conversation_service.get_conversation(db, user.id, int(partner_id))
+        if not conversation:
+            return
+        conversation_id = conversation.id
+        seq = min(int(seq), conversation.last_seq)
+    
+    read_receipt_service.mark_read(user.id, conversation_id, seq)
+    
+    receipt = {
+        "type": "read",
+        "message_id": message_id,
+        "user_id": user.id,
+        "conversation_id": conversation_id,
+        "seq": seq
+    }
+    recipients = {partner_id, user.id}
+    await manager.send_to_users(receipt, recipients)
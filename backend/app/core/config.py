@@ -3,7 +3,7 @@ Application configuration settings
 """
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
-from typing import List
+from typing import List, Literal
 import os
 
 
@@ -11,11 +11,28 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./cybershield.db"
     
+    # Connection pool (not used for in-memory SQLite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    
+    # SQLite tuning, applied to every new connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 65536
+    SQLITE_MMAP_SIZE: int = 268435456
+    
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     
+    # Password hashing: bcrypt cost (older hashes are upgraded on login), worker
+    # threads, and hashes queued or running before signups/logins get a 503
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    
     # Groq API
     GROQ_API_KEY: str = ""
     
@@ -36,6 +53,24 @@ class Settings(BaseSettings):
     SCREENSHOT_DIR: str = "./evidence/screenshots"
     LOGS_DIR: str = "./evidence/logs"
     
+    # Evidence log segments under LOGS_DIR: bytes per segment, and when appends are
+    # fsynced ("always", "interval": at most every EVIDENCE_FSYNC_INTERVAL seconds, "never")
+    EVIDENCE_SEGMENT_BYTES: int = 64 * 1024 * 1024
+    EVIDENCE_FSYNC: Literal["always", "interval", "never"] = "always"
+    EVIDENCE_FSYNC_INTERVAL: float = 1.0
+    
+    # Evidence writer thread: items queued before callers wait, seconds a caller waits
+    # for room before the item is dropped, and items written per batch
+    EVIDENCE_QUEUE_SIZE: int = 10000
+    EVIDENCE_QUEUE_TIMEOUT: float = 5.0
+    EVIDENCE_WRITE_BATCH_SIZE: int = 500
+    
+    # Message archive: monthly SQLite files for messages older than ARCHIVE_AFTER_DAYS (0 disables)
+    ARCHIVE_DIR: str = "./archive"
+    ARCHIVE_AFTER_DAYS: int = 180
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_INTERVAL: float = 3600.0
+    
     # AI Detection Settings
     DETECTION_SENSITIVITY_LOW: float = 0.7
     DETECTION_SENSITIVITY_MEDIUM: float = 0.5
@@ -45,6 +80,54 @@ class Settings(BaseSettings):
     WARNING_THRESHOLD: int = 3
     BLOCK_THRESHOLD: int = 5
     
+    # WebSocket heartbeat (seconds)
+    WS_PING_INTERVAL: float = 25.0
+    WS_PONG_TIMEOUT: float = 10.0
+    WS_IDLE_TIMEOUT: float = 0.0  # 0 disables idle reaping
+    
+    # WebSocket resync: messages per sync_batch frame, and in total per sync across conversations
+    WS_SYNC_BATCH_SIZE: int = 100
+    WS_SYNC_MAX_MESSAGES: int = 1000
+    
+    # Read receipts write-behind buffer
+    READ_RECEIPT_FLUSH_INTERVAL: float = 1.0
+    READ_RECEIPT_BATCH_SIZE: int = 500
+    
+    # Chat message group commit: max messages per transaction, and seconds a batch waits to fill
+    MESSAGE_WRITE_BATCH_SIZE: int = 100
+    MESSAGE_WRITE_FLUSH_INTERVAL: float = 0.005
+    
+    # Redis (optional) - enables cross-worker events and shared presence
+    REDIS_URL: str = ""
+    
+    # Conversation history pages
+    MESSAGE_PAGE_SIZE: int = 50
+    MESSAGE_PAGE_MAX: int = 200
+    
+    # Admin listings
+    ADMIN_PAGE_SIZE: int = 100
+    ADMIN_PAGE_MAX: int = 500
+    
+    # Dashboard counters: full recount interval (seconds)
+    STATS_RECONCILE_INTERVAL: float = 3600.0
+    
+    # Friendship adjacency cache: max users held, and seconds before an entry is reloaded
+    FRIEND_CACHE_SIZE: int = 10000
+    FRIEND_CACHE_TTL: float = 300.0
+    
+    # Authenticated principal cache: max users held, and seconds before an entry is reloaded
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 30.0
+    
+    # User search index: seconds between checks for users created by other workers or scripts,
+    # and max substring candidates ranked in full (larger sets return the first matches found)
+    USER_SEARCH_REFRESH_INTERVAL: float = 5.0
+    USER_SEARCH_RANK_CANDIDATES: int = 10000
+    
+    # Presence (seconds)
+    PRESENCE_TTL: int = 60
+    PRESENCE_DEBOUNCE: float = 2.0
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
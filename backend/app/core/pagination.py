@@ -0,0 +1,61 @@
+"""
+Keyset pagination helpers - opaque cursors over (created_at, id) or (score, id)
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import Select, tuple_
+
+# Response header carrying the cursor of the next page of list endpoints
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing at a row by its (created_at, id) sort key"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Parse a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_rank_cursor(score: float, row_id: int) -> str:
+    """Opaque cursor pointing at a ranked row by its (score, id) sort key"""
+    raw = f"{score!r}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    """Parse a cursor produced by encode_rank_cursor; raises ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return float(score), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_filter(query: Select, created_at, row_id, cursor: Optional[str], descending: bool) -> Select:
+    """Order a query by (created_at, id) and keep only the rows past the cursor"""
+    sort_key = tuple_(created_at, row_id)
+    if cursor:
+        boundary = tuple_(*decode_cursor(cursor))
+        query = query.where(sort_key < boundary if descending else sort_key > boundary)
+    if descending:
+        return query.order_by(created_at.desc(), row_id.desc())
+    return query.order_by(created_at.asc(), row_id.asc())
+
+
+def page_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    """Cursor of the page after rows (fetched with limit + 1), or None on the last page"""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.created_at, last.id)
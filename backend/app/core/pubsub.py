@@ -0,0 +1,79 @@
+"""
+Event bus for fan-out between API workers.
+
+Events are dispatched in-process by default. When REDIS_URL is set they go
+through Redis pub/sub, so every worker (including the publisher) receives them.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.serialization import dumps, loads
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+
+class EventBus:
+    def __init__(self):
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.redis = None
+
+    def subscribe(self, channel: str, handler: EventHandler):
+        """Register a handler; must be called before start()"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel: str, payload: dict):
+        """Deliver an event to the handlers of every worker"""
+        if self.redis is not None:
+            try:
+                await self.redis.publish(channel, dumps(payload))
+                return
+            except Exception as e:
+                print(f"Error publishing to {channel}, delivering locally: {e}")
+        await self._dispatch(channel, payload)
+
+    async def _dispatch(self, channel: str, payload: dict):
+        for handler in self._handlers.get(channel, []):
+            try:
+                await handler(payload)
+            except Exception as e:
+                print(f"Error handling {channel} event: {e}")
+
+    async def _listen(self, pubsub):
+        async for message in pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            await self._dispatch(channel, loads(message["data"]))
+
+    async def start(self):
+        """Connect to Redis when configured and start listening"""
+        if not settings.REDIS_URL:
+            return
+
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(settings.REDIS_URL)
+        pubsub = self.redis.pubsub()
+        if self._handlers:
+            await pubsub.subscribe(*self._handlers)
+            self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+
+# Global instance
+event_bus = EventBus()
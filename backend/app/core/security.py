@@ -1,13 +1,17 @@
 """
 Security utilities for authentication and password hashing
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import metrics
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with other rounds still verify, and are flagged for a rehash
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -20,6 +24,63 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING hashes are already queued or running"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small thread pool so request handlers never hash on the event loop.
+
+    bcrypt releases the GIL, so hashing threads don't stall WebSocket traffic.
+    At most PASSWORD_HASH_MAX_PENDING calls wait for or hold a worker; past
+    that, callers get PasswordHasherBusy right away instead of queueing behind
+    a login burst.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            metrics.incr("password_hash_rejected_total")
+            raise PasswordHasherBusy()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash"
+            )
+
+        self._pending += 1
+        metrics.set_gauge("password_hash_pending", self._pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            metrics.set_gauge("password_hash_pending", self._pending)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password off the event loop"""
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password off the event loop; also returns a new hash if the stored one is outdated"""
+        verified, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            metrics.incr("password_rehash_total")
+        return verified, new_hash
+
+    def shutdown(self):
+        """Wait for running hashes and stop the workers"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Global instance
+password_hasher = PasswordHasher()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
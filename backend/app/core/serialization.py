@@ -0,0 +1,16 @@
+"""
+Fast JSON serialization helpers backed by orjson
+"""
+from typing import Any
+import orjson
+
+
+def dumps(payload: Any) -> str:
+    """Serialize a payload (datetimes, enums, dicts, lists) to a JSON string"""
+    # Integer dict keys (e.g. sync cursors keyed by user id) become strings, as with json.dumps
+    return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def loads(data: str) -> Any:
+    """Parse a JSON string"""
+    return orjson.loads(data)
@@ -3,6 +3,11 @@ from app.models.friend_request import FriendRequest
 from app.models.message import Message
 from app.models.incident import Incident
 from app.models.report import Report
+from app.models.conversation import Conversation
+from app.models.read_state import ReadState
+from app.models.stat_counter import StatCounter
+from app.models.friendship import Friendship
+from app.models.incident_rollup import IncidentRollup
 
-__all__ = ["User", "FriendRequest", "Message", "Incident", "Report"]
+__all__ = ["User", "FriendRequest", "Message", "Incident", "Report", "Conversation", "ReadState", "StatCounter", "Friendship", "IncidentRollup"]
 
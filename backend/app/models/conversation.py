@@ -0,0 +1,45 @@
+"""
+Conversation model - one row per pair of users who exchanged messages
+"""
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, UniqueConstraint, Index
+from datetime import datetime
+from app.core.database import Base
+
+
+class Conversation(Base):
+    __tablename__ = "conversations"
+    __table_args__ = (
+        UniqueConstraint("user_low_id", "user_high_id", name="uq_conversations_pair"),
+        # Inbox of either participant, most recent activity first
+        Index("ix_conversations_low_activity", "user_low_id", "last_activity_at"),
+        Index("ix_conversations_high_activity", "user_high_id", "last_activity_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Pair stored canonically: user_low_id <= user_high_id
+    user_low_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_high_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Sequence number of the latest message in the conversation
+    last_seq = Column(Integer, default=0, nullable=False)
+    
+    # Denormalized summary of the latest message, maintained on every insert.
+    # No foreign key on last_message_id: messages and conversations reference each other.
+    last_message_id = Column(Integer, nullable=True)
+    last_sender_id = Column(Integer, nullable=True)
+    last_message_preview = Column(Text, nullable=True)
+    last_activity_at = Column(DateTime, nullable=True)
+    
+    # Unread messages of each participant
+    unread_low_count = Column(Integer, default=0, nullable=False)
+    unread_high_count = Column(Integer, default=0, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def partner_of(self, user_id: int) -> int:
+        """Return the other participant of the conversation"""
+        return self.user_high_id if self.user_low_id == user_id else self.user_low_id
+    
+    def unread_count_of(self, user_id: int) -> int:
+        """Unread messages of the given participant"""
+        return self.unread_low_count if self.user_low_id == user_id else self.unread_high_count
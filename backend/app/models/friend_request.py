@@ -1,7 +1,7 @@
 """
 Friend Request model
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Enum as SQLEnum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -16,10 +16,19 @@ class FriendRequestStatus(str, enum.Enum):
 
 class FriendRequest(Base):
     __tablename__ = "friend_requests"
+    __table_args__ = (
+        # At most one request per pair of users, whichever direction it was sent in
+        UniqueConstraint("user_low_id", "user_high_id", name="uq_friend_requests_pair"),
+        Index("ix_friend_requests_sender_receiver_status", "sender_id", "receiver_id", "status"),
+        Index("ix_friend_requests_receiver_status", "receiver_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Sender and receiver ordered canonically: user_low_id < user_high_id
+    user_low_id = Column(Integer, nullable=False)
+    user_high_id = Column(Integer, nullable=False)
     status = Column(SQLEnum(FriendRequestStatus), default=FriendRequestStatus.PENDING)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,26 @@
+"""
+Friendship model - one row per pair of friends, stored canonically
+"""
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint, Index
+from datetime import datetime
+from app.core.database import Base
+
+
+class Friendship(Base):
+    __tablename__ = "friendships"
+    __table_args__ = (
+        # Covers lookups from the low side and the pair check
+        UniqueConstraint("user_low_id", "user_high_id", name="uq_friendships_pair"),
+        # Covers lookups from the high side
+        Index("ix_friendships_high_low", "user_high_id", "user_low_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Pair stored canonically: user_low_id < user_high_id
+    user_low_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_high_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Friend request whose acceptance created the friendship
+    friend_request_id = Column(Integer, ForeignKey("friend_requests.id"), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,7 +1,7 @@
 """
 Incident model for tracking abusive behavior
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -24,6 +24,12 @@ class IncidentStatus(str, enum.Enum):
 
 class Incident(Base):
     __tablename__ = "incidents"
+    __table_args__ = (
+        Index("ix_incidents_user_created", "user_id", "created_at"),
+        Index("ix_incidents_status_created", "status", "created_at"),
+        Index("ix_incidents_severity_created", "severity", "created_at"),
+        Index("ix_incidents_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -0,0 +1,17 @@
+"""
+Incident rollup model - incident counts per time bucket, kept up to date incrementally
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.database import Base
+
+
+class IncidentRollup(Base):
+    __tablename__ = "incident_rollups"
+    
+    # Primary key order serves "one dimension over a time range" scans
+    period = Column(String, primary_key=True)  # hour, day, total
+    dimension = Column(String, primary_key=True)  # severity, status, detector (detection model), user
+    bucket_start = Column(DateTime, primary_key=True)
+    value = Column(String, primary_key=True)
+    
+    count = Column(Integer, default=0, nullable=False)
@@ -1,7 +1,7 @@
 """
 Message model
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -9,10 +9,23 @@ from app.core.database import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_seq", "conversation_id", "seq"),
+        # Keyset pagination of a conversation's history
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+        Index("ix_messages_sender_receiver_created", "sender_id", "receiver_id", "created_at"),
+        Index("ix_messages_receiver_sender", "receiver_id", "sender_id"),
+        # Archival picks the oldest messages first
+        Index("ix_messages_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Per-conversation ordering, used by clients as a resync cursor
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=True)
+    seq = Column(Integer, nullable=True)
     content = Column(Text, nullable=False)
     content_filtered = Column(Text, nullable=True)  # Filtered/blurred content
     message_type = Column(String, default="text")  # text, image, video
@@ -0,0 +1,22 @@
+"""
+Read state model - per-user read high-water mark of a conversation
+"""
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, UniqueConstraint
+from datetime import datetime
+from app.core.database import Base
+
+
+class ReadState(Base):
+    __tablename__ = "read_states"
+    __table_args__ = (
+        UniqueConstraint("user_id", "conversation_id", name="uq_read_states_user_conversation"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
+    # Highest message seq the user has read in the conversation
+    last_read_seq = Column(Integer, default=0, nullable=False)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
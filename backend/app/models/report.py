@@ -1,7 +1,7 @@
 """
 Report model for user-generated reports
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Enum as SQLEnum, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -25,6 +25,10 @@ class ReportStatus(str, enum.Enum):
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_status_created", "status", "created_at"),
+        Index("ix_reports_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     reporter_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -34,6 +34,7 @@ class UserResponse(BaseModel):
     has_red_tag: bool = False
     warning_count: int = 0
     is_blocked: bool = False
+    is_online: bool = False
     
     class Config:
         from_attributes = True
@@ -23,6 +23,8 @@ class MessageResponse(BaseModel):
     file_url: Optional[str]
     is_flagged: bool
     severity_score: Optional[str]
+    conversation_id: Optional[int] = None
+    seq: Optional[int] = None
     created_at: datetime
     
     class Config:
@@ -0,0 +1,147 @@
+"""
+Analytics service - incident rollups by hour, day and all time for the admin charts
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Integer, and_, cast, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.models.incident import Incident
+from app.models.incident_rollup import IncidentRollup
+from app.models.user import User
+
+# Bucket of the all-time rollup rows
+TOTAL_BUCKET = datetime(1970, 1, 1)
+
+
+class AnalyticsService:
+    """Keeps incident counts per (period, dimension, bucket, value) in incident_rollups.
+
+    Every incident write applies +/-1 deltas to its hour, day and all-time buckets
+    for each dimension, in the writer's transaction. Charts over any date range
+    then read whole days from the daily rows and the partial days at either end
+    from the hourly rows, instead of scanning incidents.
+    """
+
+    @staticmethod
+    def dimensions(incident: Incident) -> Dict[str, str]:
+        """Dimension values an incident is counted under"""
+        return {
+            "severity": incident.severity.value,
+            "status": incident.status.value,
+            "detector": incident.detection_model or "unknown",
+            "user": str(incident.user_id),
+        }
+
+    async def incident_created(self, db: AsyncSession, incident: Incident):
+        """Count a newly added incident; flushes first so column defaults are applied"""
+        await db.flush()
+        await self.apply(db, incident.created_at, {
+            (dimension, value): 1 for dimension, value in self.dimensions(incident).items()
+        })
+
+    async def incident_changed(self, db: AsyncSession, before: Dict[str, str], incident: Incident):
+        """Move an incident between values, given its dimensions() from before the change"""
+        deltas = {}
+        for dimension, value in self.dimensions(incident).items():
+            if before[dimension] != value:
+                deltas[(dimension, before[dimension])] = -1
+                deltas[(dimension, value)] = 1
+        await self.apply(db, incident.created_at, deltas)
+
+    async def apply(self, db: AsyncSession, created_at: datetime, deltas: Dict[Tuple[str, str], int]):
+        """Add deltas to the rollup rows of created_at, in the caller's transaction, in one statement"""
+        if not deltas:
+            return
+        buckets = {
+            "hour": created_at.replace(minute=0, second=0, microsecond=0),
+            "day": datetime(created_at.year, created_at.month, created_at.day),
+            "total": TOTAL_BUCKET,
+        }
+        insert_stmt = dialect_insert(db, IncidentRollup).values([
+            {"period": period, "dimension": dimension, "bucket_start": bucket, "value": value, "count": delta}
+            for period, bucket in buckets.items()
+            for (dimension, value), delta in deltas.items()
+        ])
+        await db.execute(insert_stmt.on_conflict_do_update(
+            index_elements=["period", "dimension", "bucket_start", "value"],
+            set_={"count": IncidentRollup.count + insert_stmt.excluded.count}
+        ))
+
+    @staticmethod
+    def windows(date_from: Optional[datetime], date_to: Optional[datetime]) -> List[Tuple[str, datetime, datetime]]:
+        """Cover [date_from, date_to) with (period, start, end) windows; bounds widen to whole hours"""
+        if date_from is None and date_to is None:
+            return [("total", TOTAL_BUCKET, TOTAL_BUCKET + timedelta(seconds=1))]
+
+        start = (date_from or TOTAL_BUCKET).replace(minute=0, second=0, microsecond=0)
+        end = date_to or datetime.utcnow()
+        if end != end.replace(minute=0, second=0, microsecond=0):
+            end = end.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+        first_day = datetime(start.year, start.month, start.day)
+        if first_day < start:
+            first_day += timedelta(days=1)
+        last_day = datetime(end.year, end.month, end.day)
+        if first_day >= last_day:
+            return [("hour", start, end)]
+        return [
+            window for window in (
+                ("hour", start, first_day),
+                ("day", first_day, last_day),
+                ("hour", last_day, end),
+            ) if window[1] < window[2]
+        ]
+
+    @staticmethod
+    def _in_windows(windows) -> object:
+        return or_(*(
+            and_(
+                IncidentRollup.period == period,
+                IncidentRollup.bucket_start >= start,
+                IncidentRollup.bucket_start < end
+            ) for period, start, end in windows
+        ))
+
+    async def distribution(self, db: AsyncSession, dimension: str, windows) -> List[Tuple[str, int]]:
+        """Incident count per value of a dimension, most frequent first"""
+        total = func.sum(IncidentRollup.count)
+        return (await db.execute(select(IncidentRollup.value, total.label("count")).where(
+            IncidentRollup.dimension == dimension,
+            self._in_windows(windows)
+        ).group_by(IncidentRollup.value).having(total > 0).order_by(total.desc()))).all()
+
+    async def top_users(self, db: AsyncSession, windows, limit: int = 10):
+        """Users with the most incidents, with their usernames and red tags"""
+        total = func.sum(IncidentRollup.count)
+        top = select(IncidentRollup.value, total.label("incident_count")).where(
+            IncidentRollup.dimension == "user",
+            self._in_windows(windows)
+        ).group_by(IncidentRollup.value).having(total > 0).order_by(total.desc()).limit(limit).subquery()
+        return (await db.execute(select(
+            User.id,
+            User.username,
+            User.has_red_tag,
+            top.c.incident_count
+        ).join(top, User.id == cast(top.c.value, Integer)).order_by(top.c.incident_count.desc()))).all()
+
+    async def daily_counts(self, db: AsyncSession, windows) -> Dict[date, int]:
+        """Incidents per calendar day (summed over severities, so each incident counts once)"""
+        rows = (await db.execute(select(
+            IncidentRollup.bucket_start,
+            func.sum(IncidentRollup.count)
+        ).where(
+            IncidentRollup.dimension == "severity",
+            self._in_windows(windows)
+        ).group_by(IncidentRollup.bucket_start))).all()
+
+        days: Dict[date, int] = {}
+        for bucket_start, count in rows:
+            if count:
+                days[bucket_start.date()] = days.get(bucket_start.date(), 0) + count
+        return dict(sorted(days.items()))
+
+
+# Global instance
+analytics_service = AnalyticsService()
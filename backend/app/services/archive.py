@@ -0,0 +1,254 @@
+"""
+Message archive - moves old messages into compressed monthly SQLite files and reads them back
+"""
+import asyncio
+import json
+import sqlite3
+import zlib
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, exists, func, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.incident import Incident
+from app.models.message import Message
+from app.models.report import Report
+
+# Columns stored as plain values for lookups; the rest of a message is stored compressed
+KEY_COLUMNS = ("id", "conversation_id", "seq", "sender_id", "receiver_id", "created_at")
+PAYLOAD_COLUMNS = (
+    "content", "content_filtered", "message_type", "file_url", "is_flagged", "severity_score", "is_blocked"
+)
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        conversation_id INTEGER,
+        seq INTEGER,
+        sender_id INTEGER NOT NULL,
+        receiver_id INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        payload BLOB NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_messages_conversation_created_id ON messages (conversation_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_conversation_seq ON messages (conversation_id, seq)",
+)
+
+# Fixed width, so text order is time order
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class MessageArchive:
+    """Cold storage for messages older than ARCHIVE_AFTER_DAYS.
+
+    Each calendar month is a separate SQLite file in ARCHIVE_DIR, with the message
+    text zlib-compressed. Messages linked to an incident or a report stay in the
+    main table as evidence, so a conversation's hot and archived messages can
+    interleave in time: readers (conversation_service) merge both on every page
+    that could reach back to the newest archived message.
+    """
+
+    def __init__(self):
+        self.archive_dir = Path(settings.ARCHIVE_DIR)
+        self._task: Optional[asyncio.Task] = None
+        # Newest created_at moved to the archive, None while it is empty
+        self._watermark: Optional[datetime] = self._load_watermark()
+
+    def _partitions(self) -> List[Path]:
+        """Archive files, oldest month first"""
+        return sorted(self.archive_dir.glob("messages_*.db"))
+
+    @staticmethod
+    def _partition_name(created_at: datetime) -> str:
+        return f"messages_{created_at:%Y_%m}.db"
+
+    def _load_watermark(self) -> Optional[datetime]:
+        partitions = self._partitions()
+        if not partitions:
+            return None
+        with closing(sqlite3.connect(partitions[-1])) as conn:
+            newest = conn.execute("SELECT max(created_at) FROM messages").fetchone()[0]
+        return datetime.strptime(newest, TIMESTAMP_FORMAT) if newest else None
+
+    @staticmethod
+    def _encode(row) -> Tuple:
+        payload = json.dumps({column: row[column] for column in PAYLOAD_COLUMNS})
+        return (
+            row["id"], row["conversation_id"], row["seq"], row["sender_id"], row["receiver_id"],
+            row["created_at"].strftime(TIMESTAMP_FORMAT), zlib.compress(payload.encode())
+        )
+
+    @staticmethod
+    def _decode(record: Sequence) -> Dict:
+        message = dict(zip(KEY_COLUMNS, record[:-1]))
+        message["created_at"] = datetime.strptime(message["created_at"], TIMESTAMP_FORMAT)
+        message.update(json.loads(zlib.decompress(record[-1])))
+        return message
+
+    def _write(self, rows: Sequence):
+        """Store rows in their monthly files; rows already archived are skipped"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        by_partition: Dict[str, List[Tuple]] = {}
+        for row in rows:
+            by_partition.setdefault(self._partition_name(row["created_at"]), []).append(self._encode(row))
+
+        for name, records in by_partition.items():
+            with closing(sqlite3.connect(self.archive_dir / name)) as conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+                conn.executemany("INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+                conn.commit()
+
+    async def archive_batch(self) -> int:
+        """Move up to ARCHIVE_BATCH_SIZE of the oldest eligible messages; returns how many were moved"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+        eligible = (
+            Message.created_at < cutoff,
+            ~exists().where(Incident.message_id == Message.id),
+            ~exists().where(Report.message_id == Message.id),
+            # SQLite hands out max(id) + 1, so deleting the newest row would let a new
+            # message reuse an archived id; that row stays hot
+            Message.id < select(func.max(Message.id)).scalar_subquery(),
+        )
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(*(getattr(Message, column) for column in KEY_COLUMNS + PAYLOAD_COLUMNS))
+                .where(*eligible)
+                .order_by(Message.created_at, Message.id)
+                .limit(settings.ARCHIVE_BATCH_SIZE)
+            )).mappings().all()
+        if not rows:
+            return 0
+
+        # Archive copy first and in separate short transactions: a crash in between
+        # leaves a message in both places, never in neither
+        await asyncio.to_thread(self._write, rows)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(Message)
+                .where(Message.id.in_([row["id"] for row in rows]), *eligible)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+        newest = rows[-1]["created_at"]
+        if self._watermark is None or newest > self._watermark:
+            self._watermark = newest
+        metrics.incr("messages_archived_total", len(rows))
+        return len(rows)
+
+    def covers(self, created_at: Optional[datetime] = None) -> bool:
+        """Whether archived messages exist (at or before created_at, if given)"""
+        if self._watermark is None:
+            return False
+        return created_at is None or created_at <= self._watermark
+
+    async def get_page(
+        self,
+        conversation_id: int,
+        cursor: Optional[Tuple[datetime, int]],
+        descending: bool,
+        limit: int
+    ) -> List[Dict]:
+        """Archived messages of a conversation past a (created_at, id) cursor, in page order"""
+        if not self.covers():
+            return []
+        return await asyncio.to_thread(self._page, conversation_id, cursor, descending, limit)
+
+    def _page(self, conversation_id, cursor, descending, limit) -> List[Dict]:
+        partitions = self._partitions()
+        if descending:
+            partitions.reverse()
+        cursor_partition = self._partition_name(cursor[0]) if cursor else None
+        direction = "DESC" if descending else "ASC"
+
+        messages = []
+        for path in partitions:
+            # Months entirely on the wrong side of the cursor
+            if cursor_partition and (path.name > cursor_partition if descending else path.name < cursor_partition):
+                continue
+            query = "SELECT * FROM messages WHERE conversation_id = ?"
+            params = [conversation_id]
+            if cursor:
+                query += f" AND (created_at, id) {'<' if descending else '>'} (?, ?)"
+                params += [cursor[0].strftime(TIMESTAMP_FORMAT), cursor[1]]
+            query += f" ORDER BY created_at {direction}, id {direction} LIMIT ?"
+            params.append(limit - len(messages))
+
+            with closing(sqlite3.connect(path)) as conn:
+                messages.extend(self._decode(record) for record in conn.execute(query, params))
+            if len(messages) >= limit:
+                break
+        return messages
+
+    async def get_range(
+        self,
+        conversation_id: int,
+        seq_from: int,
+        seq_to: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Archived messages of a conversation with seq from seq_from (to seq_to), by seq"""
+        if not self.covers():
+            return []
+        return await asyncio.to_thread(self._range, conversation_id, seq_from, seq_to, limit)
+
+    def _range(self, conversation_id, seq_from, seq_to, limit) -> List[Dict]:
+        query = "SELECT * FROM messages WHERE conversation_id = ? AND seq >= ?"
+        params = [conversation_id, seq_from]
+        if seq_to is not None:
+            query += " AND seq <= ?"
+            params.append(seq_to)
+        query += " ORDER BY seq"
+
+        # Sequence numbers grow with time, so months are read oldest first
+        messages = []
+        for path in self._partitions():
+            with closing(sqlite3.connect(path)) as conn:
+                if limit is None:
+                    messages.extend(self._decode(record) for record in conn.execute(query, params))
+                    continue
+                messages.extend(self._decode(record) for record in conn.execute(
+                    query + " LIMIT ?", params + [limit - len(messages)]
+                ))
+            if len(messages) >= limit:
+                break
+        return messages
+
+    async def run(self):
+        """Every ARCHIVE_INTERVAL seconds, archive batch by batch until nothing is eligible"""
+        while True:
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL)
+            try:
+                moved = 0
+                while True:
+                    count = await self.archive_batch()
+                    if not count:
+                        break
+                    moved += count
+                if moved:
+                    print(f"Archived {moved} messages")
+            except Exception as e:
+                print(f"Error archiving messages: {e}")
+
+    def start(self):
+        if self._task is None and settings.ARCHIVE_AFTER_DAYS > 0:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+archive_service = MessageArchive()
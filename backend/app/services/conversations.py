@@ -0,0 +1,200 @@
+"""
+Conversation service - per-conversation sequence numbers and resync
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import dialect_insert
+from app.core.pagination import decode_cursor, keyset_filter
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.archive import KEY_COLUMNS, PAYLOAD_COLUMNS, archive_service
+
+# Message fields returned by the readers below; archived messages keep all of them
+MESSAGE_COLUMNS = tuple(getattr(Message, column) for column in KEY_COLUMNS + PAYLOAD_COLUMNS)
+
+
+class ConversationService:
+    """Assigns monotonic sequence numbers to messages and reads them back.
+
+    Readers return plain dicts and merge the main table with the archive, since
+    messages kept hot as evidence can be older than archived ones.
+    """
+    
+    # Characters of the last message kept in the conversation summary
+    PREVIEW_LENGTH = 200
+    
+    @staticmethod
+    def pair(user_a: int, user_b: int) -> Tuple[int, int]:
+        """Canonical (low, high) ordering of a user pair"""
+        return (user_a, user_b) if user_a <= user_b else (user_b, user_a)
+    
+    async def record_message(self, db: AsyncSession, message: Message) -> Message:
+        """Add a new message, give it the next sequence number and update the conversation summary.
+
+        Runs inside the caller's transaction, so the message and its summary commit together.
+        """
+        await self.record_messages(db, [message])
+        return message
+    
+    async def record_messages(self, db: AsyncSession, messages: List[Message]) -> List[Message]:
+        """record_message for a batch, in three statements whatever its size.
+
+        Messages of the same conversation get consecutive sequence numbers in list order.
+        """
+        by_pair: Dict[Tuple[int, int], List[Message]] = {}
+        for message in messages:
+            if message.created_at is None:
+                message.created_at = datetime.utcnow()
+            by_pair.setdefault(self.pair(message.sender_id, message.receiver_id), []).append(message)
+    
+        rows = []
+        for (low, high), pair_messages in by_pair.items():
+            last = pair_messages[-1]
+            # Unread counters of each side; blocked messages are never delivered
+            unread = {"unread_low_count": 0, "unread_high_count": 0}
+            for message in pair_messages:
+                if message.sender_id != message.receiver_id and not message.is_blocked:
+                    unread["unread_low_count" if message.receiver_id == low else "unread_high_count"] += 1
+            rows.append({
+                "user_low_id": low,
+                "user_high_id": high,
+                "last_seq": len(pair_messages),
+                "last_sender_id": last.sender_id,
+                "last_message_preview": (last.content_filtered or last.content or "")[:self.PREVIEW_LENGTH],
+                "last_activity_at": last.created_at,
+                **unread
+            })
+    
+        # Single upsert: creates conversations on their first message, advances last_seq otherwise
+        insert_stmt = dialect_insert(db, Conversation).values(rows)
+        excluded = insert_stmt.excluded
+        upsert = insert_stmt.on_conflict_do_update(
+            index_elements=["user_low_id", "user_high_id"],
+            set_={
+                "last_seq": Conversation.last_seq + excluded.last_seq,
+                "unread_low_count": Conversation.unread_low_count + excluded.unread_low_count,
+                "unread_high_count": Conversation.unread_high_count + excluded.unread_high_count,
+                "last_sender_id": excluded.last_sender_id,
+                "last_message_preview": excluded.last_message_preview,
+                "last_activity_at": excluded.last_activity_at
+            }
+        ).returning(Conversation.id, Conversation.user_low_id, Conversation.user_high_id, Conversation.last_seq)
+    
+        for row in (await db.execute(upsert)).all():
+            pair_messages = by_pair[(row.user_low_id, row.user_high_id)]
+            first_seq = row.last_seq - len(pair_messages) + 1
+            for offset, message in enumerate(pair_messages):
+                message.conversation_id = row.id
+                message.seq = first_seq + offset
+    
+        db.add_all(messages)
+        await db.flush()
+        await db.execute(
+            update(Conversation.__table__).where(Conversation.__table__.c.id == bindparam("conversation_id")),
+            [
+                {"conversation_id": pair_messages[-1].conversation_id, "last_message_id": pair_messages[-1].id}
+                for pair_messages in by_pair.values()
+            ]
+        )
+        return messages
+    
+    async def get_conversation(self, db: AsyncSession, user_a: int, user_b: int) -> Optional[Conversation]:
+        """Conversation between two users, if they ever exchanged messages"""
+        low, high = self.pair(user_a, user_b)
+        return await db.scalar(select(Conversation).where(
+            Conversation.user_low_id == low,
+            Conversation.user_high_id == high
+        ))
+    
+    async def get_user_conversations(self, db: AsyncSession, user_id: int) -> List[Conversation]:
+        """All conversations the user takes part in"""
+        return (await db.scalars(select(Conversation).where(
+            (Conversation.user_low_id == user_id) | (Conversation.user_high_id == user_id)
+        ))).all()
+    
+    async def get_missed_messages(
+        self,
+        db: AsyncSession,
+        conversation_id: int,
+        after_seq: int,
+        limit: int
+    ) -> List[Dict]:
+        """Up to limit messages of a conversation with a sequence number above the cursor, by seq"""
+        rows = [dict(row) for row in (await db.execute(select(*MESSAGE_COLUMNS).where(
+            Message.conversation_id == conversation_id,
+            Message.seq > after_seq
+        ).order_by(Message.seq.asc()).limit(limit))).mappings().all()]
+        
+        # A full page of consecutive sequence numbers leaves no gap for archived messages
+        if len(rows) == limit and rows[-1]["seq"] == after_seq + limit:
+            return rows
+        archived = await archive_service.get_range(conversation_id, after_seq + 1, limit=limit)
+        return self._merge(rows, archived, lambda message: message["seq"])[:limit]
+    
+    async def get_messages_page(
+        self,
+        db: AsyncSession,
+        conversation_id: int,
+        cursor: Optional[str],
+        descending: bool,
+        limit: int
+    ) -> List[Dict]:
+        """Up to limit messages of a conversation past a (created_at, id) cursor, in page order"""
+        query = select(*MESSAGE_COLUMNS).where(Message.conversation_id == conversation_id)
+        query = keyset_filter(query, Message.created_at, Message.id, cursor, descending=descending)
+        rows = [dict(row) for row in (await db.execute(query.limit(limit))).mappings().all()]
+        
+        # Everything archived is at or before the archive's newest message, so pages
+        # lying entirely after it need no archive lookup
+        boundary = decode_cursor(cursor) if cursor else None
+        if descending:
+            reaches_archive = archive_service.covers() and (
+                len(rows) < limit or archive_service.covers(rows[-1]["created_at"])
+            )
+        else:
+            reaches_archive = archive_service.covers(boundary[0] if boundary else None)
+        if not reaches_archive:
+            return rows
+        
+        archived = await archive_service.get_page(conversation_id, boundary, descending, limit)
+        return self._merge(rows, archived, lambda message: (message["created_at"], message["id"]), descending)[:limit]
+    
+    async def get_all_messages(self, db: AsyncSession, user_a: int, user_b: int) -> List[Dict]:
+        """Every message between two users, oldest first"""
+        rows = [dict(row) for row in (await db.execute(select(*MESSAGE_COLUMNS).where(
+            ((Message.sender_id == user_a) & (Message.receiver_id == user_b)) |
+            ((Message.sender_id == user_b) & (Message.receiver_id == user_a))
+        ).order_by(Message.created_at.asc(), Message.id.asc()))).mappings().all()]
+        
+        if not archive_service.covers():
+            return rows
+        conversation = await self.get_conversation(db, user_a, user_b)
+        if conversation is None:
+            return rows
+        archived = await archive_service.get_range(conversation.id, 1)
+        return self._merge(rows, archived, lambda message: (message["created_at"], message["id"]))
+    
+    @staticmethod
+    def _merge(hot: List[Dict], archived: List[Dict], key, descending: bool = False) -> List[Dict]:
+        # A message copied to the archive but not yet deleted from the main table is in both
+        hot_ids = {message["id"] for message in hot}
+        merged = hot + [message for message in archived if message["id"] not in hot_ids]
+        return sorted(merged, key=key, reverse=descending)
+    
+    @staticmethod
+    def parse_cursors(raw: Dict) -> Dict[int, int]:
+        """Parse client cursors {partner_id: last_seen_seq}, ignoring malformed entries"""
+        cursors = {}
+        for partner_id, seq in (raw or {}).items():
+            try:
+                cursors[int(partner_id)] = int(seq)
+            except (TypeError, ValueError):
+                continue
+        return cursors
+
+
+# Global instance
+conversation_service = ConversationService()
@@ -1,11 +1,9 @@
 """
 CyberBOT Service - Automated warning system for policy violations
 """
-from typing import Dict, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
 
-from app.models.user import User
+from app.core.config import settings
 from app.models.message import Message
 
 
@@ -14,7 +12,6 @@ class CyberBOTService:
     
     CYBERBOT_USER_ID = 0  # System user ID for CyberBOT
     CYBERBOT_USERNAME = "CyberBOT"
-    RED_TAG_THRESHOLD = 3  # Number of warnings before auto red-tag
     
     def __init__(self):
         self.warning_templates = {
@@ -77,12 +74,17 @@ class CyberBOTService:
         ])
         
         # Add escalation warnings
-        if warning_count >= self.RED_TAG_THRESHOLD:
+        if warning_count >= settings.BLOCK_THRESHOLD:
+            message_parts.extend([
+                "🚫 Your account has been BLOCKED due to repeated violations.",
+                "Your messages will no longer be delivered.",
+            ])
+        elif warning_count >= settings.WARNING_THRESHOLD:
             message_parts.extend([
                 "🔴 Your account has been RED TAGGED due to repeated violations.",
                 "Further violations may result in account suspension.",
             ])
-        elif warning_count == self.RED_TAG_THRESHOLD - 1:
+        elif warning_count == settings.WARNING_THRESHOLD - 1:
             message_parts.extend([
                 f"⚠️ WARNING: One more violation will result in a RED TAG on your account.",
             ])
@@ -101,40 +103,22 @@ class CyberBOTService:
         
         return "\n".join(message_parts)
     
-    async def send_warning(
+    def build_warning(
         self,
-        db: Session,
         user_id: int,
         violation_type: str,
         severity: str,
+        warning_count: int,
         categories: list = None
-    ) -> Dict:
-        """Send warning message to user and update warning count"""
-        
-        # Get user
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            return {"success": False, "error": "User not found"}
-        
-        # Increment warning count
-        if not hasattr(user, 'warning_count') or user.warning_count is None:
-            user.warning_count = 0
-        user.warning_count += 1
-        
-        # Auto red-tag if threshold reached
-        if user.warning_count >= self.RED_TAG_THRESHOLD:
-            user.has_red_tag = True
-        
-        # Generate warning message
+    ) -> Message:
+        """Warning message for a user's violation, to be recorded in the caller's transaction"""
         warning_text = self.generate_warning_message(
             violation_type,
             severity,
-            user.warning_count,
+            warning_count,
             categories
         )
-        
-        # Create warning message in database
-        warning_message = Message(
+        return Message(
             sender_id=self.CYBERBOT_USER_ID,
             receiver_id=user_id,
             content=warning_text,
@@ -144,19 +128,6 @@ class CyberBOTService:
             severity_score="info",
             created_at=datetime.utcnow()
         )
-        
-        db.add(warning_message)
-        db.commit()
-        db.refresh(warning_message)
-        db.refresh(user)
-        
-        return {
-            "success": True,
-            "warning_count": user.warning_count,
-            "red_tagged": user.has_red_tag,
-            "message_id": warning_message.id,
-            "message": warning_text
-        }
 
 
 # Global instance
@@ -0,0 +1,62 @@
+"""
+Escalation service - atomic warning counts with red-tag and block thresholds
+"""
+from typing import Dict
+from sqlalchemy import case, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.stats import stats_service
+
+
+class EscalationService:
+    """Counts a violation against a user and applies the WARNING_THRESHOLD (red tag)
+    and BLOCK_THRESHOLD (block) settings in a single UPDATE ... RETURNING.
+
+    The increment and the threshold checks run in the database against the
+    row's current value, so concurrent violations from the same user are all
+    counted and the user is tagged/blocked exactly when the count crosses a
+    threshold, whichever request gets there.
+    """
+
+    async def escalate(self, db: AsyncSession, user: User) -> Dict:
+        """Count one violation in the caller's transaction; the loaded user gets the new values"""
+        counted = stats_service.snapshot(user)
+        loaded_count = user.warning_count or 0
+        warning_count = func.coalesce(User.warning_count, 0) + 1
+        row = (await db.execute(
+            update(User.__table__).where(User.id == user.id).values(
+                warning_count=warning_count,
+                has_red_tag=case(
+                    (warning_count >= settings.WARNING_THRESHOLD, True),
+                    else_=User.has_red_tag
+                ),
+                is_blocked=case(
+                    (warning_count >= settings.BLOCK_THRESHOLD, True),
+                    else_=User.is_blocked
+                )
+            ).returning(User.warning_count, User.has_red_tag, User.is_blocked)
+        )).one()
+
+        if loaded_count != row.warning_count - 1:
+            # Violations committed since the user was loaded crossed the thresholds below this count
+            previous = row.warning_count - 1
+            counted["users_red_tagged"] |= int(previous >= settings.WARNING_THRESHOLD)
+            counted["users_blocked"] |= int(previous >= settings.BLOCK_THRESHOLD)
+
+        # Reflect the new values on the loaded user without marking it dirty
+        for name in ("warning_count", "has_red_tag", "is_blocked"):
+            set_committed_value(user, name, getattr(row, name))
+        await stats_service.changed(db, counted, user)
+
+        return {
+            "warning_count": row.warning_count,
+            "red_tagged": row.has_red_tag,
+            "blocked": row.is_blocked
+        }
+
+
+# Global instance
+escalation_service = EscalationService()
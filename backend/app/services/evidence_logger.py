@@ -1,12 +1,13 @@
 """
 Evidence logging service for screenshots and incident tracking
 """
-import os
-import json
+import asyncio
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional
 from app.core.config import settings
+from app.services.evidence_store import EvidenceStore
+from app.services.evidence_writer import EvidenceWriter
 
 
 class EvidenceLogger:
@@ -19,19 +20,30 @@ class EvidenceLogger:
         self.evidence_dir.mkdir(parents=True, exist_ok=True)
         self.screenshot_dir.mkdir(parents=True, exist_ok=True)
         self.logs_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Incident records, appended to indexed segments under logs_dir by the writer thread
+        self.store = EvidenceStore(self.logs_dir)
+        self.writer = EvidenceWriter(self.store)
+    
+    def start(self):
+        self.writer.start()
+    
+    async def stop(self):
+        """Write all queued evidence before shutdown"""
+        await self.writer.stop()
     
-    def save_screenshot(self, screenshot_data: bytes, incident_id: int) -> str:
-        """Save screenshot and return path"""
+    async def save_screenshot(self, screenshot_data: bytes, incident_id: int) -> str:
+        """Write a screenshot (off the event loop) and return its path"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"incident_{incident_id}_{timestamp}.png"
         filepath = self.screenshot_dir / filename
         
-        with open(filepath, "wb") as f:
-            f.write(screenshot_data)
+        # Written before returning, so the path put in an incident record always exists
+        await asyncio.to_thread(filepath.write_bytes, screenshot_data)
         
         return str(filepath)
     
-    def log_incident(
+    async def log_incident(
         self,
         user_id: int,
         message_id: Optional[int],
@@ -41,7 +53,7 @@ class EvidenceLogger:
         screenshot_path: Optional[str] = None,
         context: Optional[str] = None
     ) -> Dict:
-        """Log an incident to JSON file"""
+        """Queue an incident for the evidence log"""
         timestamp = datetime.now()
         incident_data = {
             "timestamp": timestamp.isoformat(),
@@ -54,40 +66,18 @@ class EvidenceLogger:
             "context": context
         }
         
-        # Save to log file
-        log_filename = f"incident_{user_id}_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
-        log_filepath = self.logs_dir / log_filename
-        
-        with open(log_filepath, "w") as f:
-            json.dump(incident_data, f, indent=2)
+        await self.writer.submit(("record", incident_data))
         
         return incident_data
     
     def generate_report(self, user_id: Optional[int] = None, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
         """Generate a report from logged incidents"""
-        reports = []
-        
-        # Read all log files
-        for log_file in self.logs_dir.glob("incident_*.json"):
-            try:
-                with open(log_file, "r") as f:
-                    incident = json.load(f)
-                    
-                    # Filter by user_id if provided
-                    if user_id and incident.get("user_id") != user_id:
-                        continue
-                    
-                    # Filter by date range if provided
-                    if start_date or end_date:
-                        incident_date = datetime.fromisoformat(incident["timestamp"])
-                        if start_date and incident_date < datetime.fromisoformat(start_date):
-                            continue
-                        if end_date and incident_date > datetime.fromisoformat(end_date):
-                            continue
-                    
-                    reports.append(incident)
-            except Exception as e:
-                print(f"Error reading log file {log_file}: {e}")
+        # Matching records are located through the segment indexes
+        reports = self.store.find(
+            user_id=user_id or None,
+            start=datetime.fromisoformat(start_date).timestamp() if start_date else None,
+            end=datetime.fromisoformat(end_date).timestamp() if end_date else None
+        )
         
         # Sort by timestamp
         reports.sort(key=lambda x: x["timestamp"], reverse=True)
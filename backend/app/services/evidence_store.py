@@ -0,0 +1,218 @@
+"""
+Evidence store - segmented append-only JSONL log with a sidecar index by user and time
+"""
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.serialization import dumps, loads
+
+# Index entry per record: user_id, timestamp (epoch seconds), byte offset and length of its line
+INDEX_ENTRY = struct.Struct("<qdQI")
+
+
+def record_time(record: dict) -> float:
+    return datetime.fromisoformat(record["timestamp"]).timestamp()
+
+
+class EvidenceStore:
+    """Evidence records appended to evidence_NNNNNN.jsonl segments, one JSON object per line.
+
+    Each segment has an .idx sidecar of fixed-size (user_id, timestamp, offset,
+    length) entries, so reports read the small index and seek straight to the
+    matching lines. A segment is closed once it reaches EVIDENCE_SEGMENT_BYTES.
+    Data is fsynced according to EVIDENCE_FSYNC ("always", "interval" or
+    "never"); the index is not, since it is rebuilt from the data on startup.
+    Legacy incident_*.json files found in the directory are imported once and
+    moved to legacy/.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._opened = False
+        # {segment number: (earliest, latest) record time}, in segment order
+        self._segments: Dict[int, Tuple[float, float]] = {}
+        self._number = 0
+        self._size = 0
+        self._data = None
+        self._index = None
+        self._synced_at = 0.0
+
+    def _paths(self, number: int) -> Tuple[Path, Path]:
+        stem = self.directory / f"evidence_{number:06d}"
+        return stem.with_suffix(".jsonl"), stem.with_suffix(".idx")
+
+    def _open(self):
+        if self._opened:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        numbers = sorted(int(path.stem.split("_")[1]) for path in self.directory.glob("evidence_*.jsonl"))
+        for number in numbers:
+            if number == numbers[-1]:
+                entries = self._recover(number)
+            else:
+                entries = list(INDEX_ENTRY.iter_unpack(self._paths(number)[1].read_bytes()))
+            self._track(number, entries)
+
+        self._number = numbers[-1] if numbers else 1
+        self._open_segment()
+        self._opened = True
+        self._import_legacy()
+
+    def _recover(self, number: int) -> List[tuple]:
+        """Make the last segment's index match its data after an unclean shutdown"""
+        data_path, index_path = self._paths(number)
+        size = data_path.stat().st_size
+        raw = index_path.read_bytes() if index_path.exists() else b""
+        entries = list(INDEX_ENTRY.iter_unpack(raw[:len(raw) - len(raw) % INDEX_ENTRY.size]))
+        original = len(entries)
+
+        # Entries of records that never reached the disk
+        while entries and entries[-1][2] + entries[-1][3] > size:
+            entries.pop()
+        covered = entries[-1][2] + entries[-1][3] if entries else 0
+
+        if covered < size:
+            with open(data_path, "rb") as f:
+                f.seek(covered)
+                tail = f.read()
+            # A torn final line is dropped
+            complete = tail.rfind(b"\n") + 1
+            if complete < len(tail):
+                os.truncate(data_path, covered + complete)
+            offset = covered
+            for line in tail[:complete].splitlines(keepends=True):
+                try:
+                    record = loads(line)
+                    entries.append((record.get("user_id") or 0, record_time(record), offset, len(line)))
+                except Exception as e:
+                    print(f"Skipping unreadable evidence record at {data_path}:{offset}: {e}")
+                offset += len(line)
+
+        if len(entries) != original or len(raw) % INDEX_ENTRY.size:
+            index_path.write_bytes(b"".join(INDEX_ENTRY.pack(*entry) for entry in entries))
+            print(f"Recovered evidence index {index_path.name}: {len(entries)} records")
+        return entries
+
+    def _track(self, number: int, entries):
+        times = [entry[1] for entry in entries]
+        self._segments[number] = (min(times), max(times)) if times else (float("inf"), float("-inf"))
+
+    def _open_segment(self):
+        data_path, index_path = self._paths(self._number)
+        self._data = open(data_path, "ab")
+        self._index = open(index_path, "ab")
+        self._size = self._data.tell()
+        self._segments.setdefault(self._number, (float("inf"), float("-inf")))
+        metrics.set_gauge("evidence_segments", len(self._segments))
+
+    def _rotate(self):
+        self._sync(force=True)
+        self._data.close()
+        self._index.close()
+        self._number += 1
+        self._open_segment()
+
+    def _sync(self, force: bool = False):
+        policy = settings.EVIDENCE_FSYNC
+        if policy == "never" and not force:
+            return
+        if policy == "interval" and not force and time.monotonic() - self._synced_at < settings.EVIDENCE_FSYNC_INTERVAL:
+            return
+        os.fsync(self._data.fileno())
+        self._synced_at = time.monotonic()
+
+    def _write(self, lines: List[bytes], entries: List[bytes]):
+        if not lines:
+            return
+        # Data first, so an index entry never points past the data
+        self._data.write(b"".join(lines))
+        self._data.flush()
+        self._sync()
+        self._index.write(b"".join(entries))
+        self._index.flush()
+        self._size = self._data.tell()
+
+    def append(self, records: List[dict]):
+        """Append records (each with user_id and an ISO timestamp) as one write per segment"""
+        with self._lock:
+            self._open()
+            self._append(records)
+        metrics.incr("evidence_records_total", len(records))
+
+    def _append(self, records: List[dict]):
+        lines: List[bytes] = []
+        entries: List[bytes] = []
+        offset = self._size
+        for record in records:
+            line = (dumps(record) + "\n").encode()
+            if offset > 0 and offset + len(line) > settings.EVIDENCE_SEGMENT_BYTES:
+                self._write(lines, entries)
+                self._rotate()
+                lines, entries, offset = [], [], 0
+
+            timestamp = record_time(record)
+            earliest, latest = self._segments[self._number]
+            self._segments[self._number] = (min(earliest, timestamp), max(latest, timestamp))
+            lines.append(line)
+            entries.append(INDEX_ENTRY.pack(record.get("user_id") or 0, timestamp, offset, len(line)))
+            offset += len(line)
+        self._write(lines, entries)
+
+    def find(self, user_id: Optional[int] = None, start: Optional[float] = None, end: Optional[float] = None) -> List[dict]:
+        """Records of the user (or everyone) with start <= timestamp <= end, oldest segment first"""
+        with self._lock:
+            self._open()
+            # Files only grow, so the index read below stays within flushed data
+            segments = [
+                (number, self._paths(number), self._index.tell() if number == self._number else None)
+                for number, (earliest, latest) in self._segments.items()
+                if (start is None or latest >= start) and (end is None or earliest <= end)
+            ]
+
+        records = []
+        for number, (data_path, index_path), index_size in segments:
+            with open(index_path, "rb") as f:
+                raw = f.read() if index_size is None else f.read(index_size)
+            matches = [
+                (offset, length)
+                for entry_user, timestamp, offset, length in INDEX_ENTRY.iter_unpack(raw)
+                if (user_id is None or entry_user == user_id)
+                and (start is None or timestamp >= start)
+                and (end is None or timestamp <= end)
+            ]
+            if not matches:
+                continue
+            with open(data_path, "rb") as f:
+                for offset, length in matches:
+                    f.seek(offset)
+                    records.append(loads(f.read(length)))
+        return records
+
+    def _import_legacy(self):
+        legacy = sorted(self.directory.glob("incident_*.json"))
+        if not legacy:
+            return
+        records = []
+        for path in legacy:
+            try:
+                records.append(loads(path.read_bytes()))
+            except Exception as e:
+                print(f"Error reading log file {path}: {e}")
+        records.sort(key=lambda record: record["timestamp"])
+
+        self._append(records)
+        self._sync(force=True)
+
+        moved = self.directory / "legacy"
+        moved.mkdir(exist_ok=True)
+        for path in legacy:
+            path.rename(moved / path.name)
+        print(f"Imported {len(records)} legacy evidence files into {self._paths(self._number)[0].name}")
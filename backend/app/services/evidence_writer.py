@@ -0,0 +1,124 @@
+"""
+Evidence writer - dedicated thread for evidence disk writes
+"""
+import asyncio
+import queue
+import threading
+from typing import List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.evidence_store import EvidenceStore
+
+# Queued item: ("record", incident record)
+EvidenceItem = Tuple
+
+
+class EvidenceWriter:
+    """Writes incident records on a dedicated thread, so handlers never wait on
+    the disk.
+
+    Items go through a bounded queue of EVIDENCE_QUEUE_SIZE. Each pass of the
+    thread takes everything queued (up to EVIDENCE_WRITE_BATCH_SIZE) and appends
+    the records to the store in one write and one fsync. When the queue is full,
+    callers wait off the event loop for up to EVIDENCE_QUEUE_TIMEOUT seconds
+    (evidence_writer_backpressure_total). Only then is the item dropped
+    (evidence_writer_dropped_total) and printed to the server log. stop() writes
+    everything still queued.
+    """
+
+    def __init__(self, store: EvidenceStore):
+        self.store = store
+        self._queue: "queue.Queue[Optional[EvidenceItem]]" = queue.Queue(maxsize=settings.EVIDENCE_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        # Submits waiting for room in a full queue
+        self._puts: Set[asyncio.Future] = set()
+
+    async def submit(self, item: EvidenceItem):
+        """Queue an item for the writer thread; waits only when the queue is full"""
+        if self._thread is None:
+            # Not running (e.g. scripts): write it now, still off the event loop
+            await asyncio.to_thread(self._flush, [item])
+            return
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            metrics.incr("evidence_writer_backpressure_total")
+            # Tracked so stop() can collect items that land after it drained the queue
+            put = asyncio.ensure_future(asyncio.to_thread(self._queue.put, item, True, settings.EVIDENCE_QUEUE_TIMEOUT))
+            self._puts.add(put)
+            try:
+                await put
+            except queue.Full:
+                metrics.incr("evidence_writer_dropped_total")
+                print(f"Evidence queue full, dropped {item[0]}: {item[1]}")
+                return
+            finally:
+                self._puts.discard(put)
+        metrics.set_gauge("evidence_writer_queued", self._queue.qsize())
+
+    def _flush(self, batch: List[EvidenceItem]):
+        records = [item[1] for item in batch]
+        if records:
+            try:
+                self.store.append(records)
+            except Exception as e:
+                metrics.incr("evidence_writer_errors_total")
+                print(f"Error appending {len(records)} evidence records: {e}; records: {records}")
+        metrics.incr("evidence_writer_batches_total")
+        metrics.incr("evidence_writer_items_total", len(batch))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            while len(batch) < settings.EVIDENCE_WRITE_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            metrics.set_gauge("evidence_writer_queued", self._queue.qsize())
+            self._flush(batch)
+            if stopping:
+                return
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="evidence-writer", daemon=True)
+            self._thread.start()
+
+    async def stop(self):
+        """Write everything still queued and stop the thread"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        # Items submitted from now on are written directly
+        await asyncio.to_thread(self._queue.put, None)
+        await asyncio.to_thread(thread.join)
+
+        # Items that raced with the stop. Submits waiting for room put theirs once
+        # the queue is drained, so drain again until none was waiting before a drain
+        pending = []
+        while True:
+            waiting = [put for put in self._puts if not put.done()]
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    pending.append(item)
+            if not waiting:
+                break
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        if pending:
+            await asyncio.to_thread(self._flush, pending)
+        metrics.set_gauge("evidence_writer_queued", 0)
@@ -0,0 +1,115 @@
+"""
+Friendship service - lookups over the friendships table, with an adjacency cache
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import FrozenSet, Iterable, List, Tuple
+from sqlalchemy import case, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.metrics import metrics
+from app.core.pubsub import event_bus
+from app.models.friend_request import FriendRequest
+from app.models.friendship import Friendship
+from app.models.user import User
+
+FRIENDSHIP_CHANNEL = "friendships"
+
+
+class FriendshipService:
+    """Answers "who are the friends of X" from a bounded LRU of adjacency sets.
+
+    Sets are loaded lazily per user and dropped when a friend request of the
+    user is answered, on every worker via the event bus. Entries also expire
+    after FRIEND_CACHE_TTL seconds in case an invalidation event is lost.
+    """
+
+    def __init__(self):
+        # {user_id: (expires_at, friend ids)}, least recently used first
+        self._cache: "OrderedDict[int, Tuple[float, FrozenSet[int]]]" = OrderedDict()
+        # Bumped on every invalidation so loads that raced with one are not cached
+        self._version = 0
+
+    @staticmethod
+    def pair(user_a: int, user_b: int) -> Tuple[int, int]:
+        """Canonical (low, high) ordering of a user pair"""
+        return (user_a, user_b) if user_a <= user_b else (user_b, user_a)
+
+    async def get_friend_ids(self, db: AsyncSession, user_id: int) -> FrozenSet[int]:
+        """Ids of all friends of the user"""
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(user_id)
+            metrics.incr("friend_cache_hits_total")
+            return entry[1]
+
+        metrics.incr("friend_cache_misses_total")
+        version = self._version
+        friend_ids = await self._load(db, user_id)
+        if version == self._version:
+            self._store(user_id, friend_ids)
+        return friend_ids
+
+    async def are_friends(self, db: AsyncSession, user_a: int, user_b: int) -> bool:
+        """Whether the two users are friends; no query once user_a's friends are cached"""
+        return user_b in await self.get_friend_ids(db, user_a)
+
+    async def _load(self, db: AsyncSession, user_id: int) -> FrozenSet[int]:
+        # Two covering index probes: (low, high) and (high, low)
+        friend_id = case(
+            (Friendship.user_low_id == user_id, Friendship.user_high_id),
+            else_=Friendship.user_low_id
+        )
+        return frozenset((await db.scalars(select(friend_id).where(
+            (Friendship.user_low_id == user_id) | (Friendship.user_high_id == user_id)
+        ))).all())
+
+    async def get_friends(self, db: AsyncSession, user_id: int) -> List[User]:
+        """Friends of the user as User rows, in one join"""
+        return (await db.scalars(select(User).join(
+            Friendship,
+            ((Friendship.user_low_id == user_id) & (Friendship.user_high_id == User.id)) |
+            ((Friendship.user_high_id == user_id) & (Friendship.user_low_id == User.id))
+        ))).all()
+
+    async def add_friendship(self, db: AsyncSession, friend_request: FriendRequest):
+        """Record the friendship created by accepting a request, in the caller's transaction"""
+        insert_stmt = dialect_insert(db, Friendship).values(
+            user_low_id=friend_request.user_low_id,
+            user_high_id=friend_request.user_high_id,
+            friend_request_id=friend_request.id,
+            created_at=datetime.utcnow()
+        )
+        await db.execute(insert_stmt.on_conflict_do_nothing(
+            index_elements=["user_low_id", "user_high_id"]
+        ))
+
+    def _store(self, user_id: int, friend_ids: FrozenSet[int]):
+        self._cache[user_id] = (time.monotonic() + settings.FRIEND_CACHE_TTL, friend_ids)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > settings.FRIEND_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        metrics.set_gauge("friend_cache_size", len(self._cache))
+
+    def _evict(self, user_ids: Iterable[int]):
+        self._version += 1
+        for user_id in user_ids:
+            self._cache.pop(user_id, None)
+        metrics.set_gauge("friend_cache_size", len(self._cache))
+
+    async def invalidate(self, *user_ids: int):
+        """Drop the cached friends of the users here and on every other worker; call after commit"""
+        self._evict(user_ids)
+        await event_bus.publish(FRIENDSHIP_CHANNEL, {"user_ids": list(user_ids)})
+
+    async def handle_invalidation(self, payload: dict):
+        self._evict(payload["user_ids"])
+
+
+# Global instance
+friendship_service = FriendshipService()
+
+event_bus.subscribe(FRIENDSHIP_CHANNEL, friendship_service.handle_invalidation)
@@ -0,0 +1,125 @@
+"""
+Message writer - group commit of chat messages from concurrent handlers
+"""
+import asyncio
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.message import Message
+from app.services.conversations import conversation_service
+
+
+class MessageWriter:
+    """Persists messages in small batched transactions.
+
+    Handlers await write(), which resolves once the transaction holding the
+    message has committed. A batch is closed after MESSAGE_WRITE_BATCH_SIZE
+    messages or MESSAGE_WRITE_FLUSH_INTERVAL seconds after its first message,
+    so many concurrent senders share one commit instead of one each. stop()
+    lets the current batch commit and drains the queue before returning.
+    """
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[Optional[Tuple[Message, asyncio.Future]]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def write(self, message: Message) -> Message:
+        """Store a new message (sequence number and conversation summary included) durably"""
+        if self._task is None:
+            # Not running (e.g. scripts): write it in its own transaction
+            await self._commit_batch([message])
+            return message
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((message, future))
+        metrics.set_gauge("message_writer_queued", self._queue.qsize())
+        return await future
+
+    async def _next_batch(self) -> Tuple[List[Tuple[Message, asyncio.Future]], bool]:
+        """Next batch to commit, and whether stop() was requested behind it"""
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.MESSAGE_WRITE_FLUSH_INTERVAL
+        while len(batch) < settings.MESSAGE_WRITE_BATCH_SIZE:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _commit_batch(self, messages: List[Message]):
+        async with AsyncSessionLocal() as db:
+            await conversation_service.record_messages(db, messages)
+            await db.commit()
+
+    async def _flush(self, batch: List[Tuple[Message, asyncio.Future]]):
+        try:
+            await self._commit_batch([message for message, _ in batch])
+        except Exception as e:
+            print(f"Error committing batch of {len(batch)} messages, retrying one by one: {e}")
+            # Isolate the failing message so the rest of the batch is still stored
+            for message, future in batch:
+                message.id = None
+                try:
+                    await self._commit_batch([message])
+                except Exception as single_error:
+                    future.set_exception(single_error)
+                else:
+                    future.set_result(message)
+            return
+
+        for message, future in batch:
+            if not future.done():
+                future.set_result(message)
+        metrics.incr("message_writer_batches_total")
+        metrics.incr("message_writer_messages_total", len(batch))
+
+    async def run(self):
+        while True:
+            batch, stopping = await self._next_batch()
+            metrics.set_gauge("message_writer_queued", self._queue.qsize())
+            if batch:
+                await self._flush(batch)
+            if stopping:
+                return
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Commit everything queued so far, then stop the batching task"""
+        task, self._task = self._task, None
+        if task is not None:
+            # Messages written from now on are committed directly; the sentinel
+            # lets the task finish its current batch and everything queued before it
+            await self._queue.put(None)
+            await task
+
+        # Messages that raced with the stop
+        pending = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                pending.append(item)
+        if pending:
+            await self._flush(pending)
+        metrics.set_gauge("message_writer_queued", 0)
+
+
+# Global instance
+message_writer = MessageWriter()
@@ -0,0 +1,68 @@
+"""
+Moderation service - records a flagged message and its consequences as one unit of work
+"""
+from typing import Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+from app.models.message import Message
+from app.models.incident import Incident
+from app.services.analytics import analytics_service
+from app.services.conversations import conversation_service
+from app.services.cyberbot import cyberbot_service
+from app.services.escalation import escalation_service
+from app.services.principals import principal_service
+from app.services.stats import stats_service
+
+
+class ModerationService:
+    """Commits a flagged message, its incident, the sender's new warning count and the
+    CyberBOT warning together, so a failure leaves none of them behind.
+
+    The warning count and thresholds go through escalation_service. Nothing
+    outside the database (evidence files, WebSocket frames) is touched here; the
+    caller does that once record_violation has returned.
+    """
+
+    async def record_violation(
+        self,
+        db: AsyncSession,
+        sender: User,
+        message: Message,
+        incident: Incident,
+        violation_type: str,
+        categories: Optional[List[str]] = None
+    ) -> Dict:
+        """Store a flagged message with its incident and warning, and commit once"""
+        escalation = await escalation_service.escalate(db, sender)
+        if escalation["blocked"]:
+            message.is_blocked = True
+
+        warning = cyberbot_service.build_warning(
+            sender.id,
+            violation_type,
+            incident.severity.value,
+            escalation["warning_count"],
+            categories
+        )
+        await conversation_service.record_messages(db, [message, warning])
+
+        incident.message_id = message.id
+        db.add(incident)
+        await stats_service.created(db, incident)
+        await analytics_service.incident_created(db, incident)
+        await db.commit()
+        if escalation["blocked"]:
+            await principal_service.invalidate(sender.id)
+
+        return {
+            "message": message,
+            "incident": incident,
+            "warning": warning,
+            "warning_count": escalation["warning_count"],
+            "red_tagged": escalation["red_tagged"]
+        }
+
+
+# Global instance
+moderation_service = ModerationService()
@@ -0,0 +1,140 @@
+"""
+Presence service - tracks which users are online across API workers
+"""
+import asyncio
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.pubsub import event_bus
+
+PRESENCE_CHANNEL = "presence"
+
+
+class PresenceService:
+    """Counts open sockets per user and announces online/offline changes.
+
+    Without Redis the local socket counts are authoritative. With Redis each
+    socket increments a per-user counter key whose TTL is refreshed while the
+    user stays connected, so counts left behind by a crashed worker expire.
+    Changes are coalesced over PRESENCE_DEBOUNCE seconds, so a quick reconnect
+    produces no offline/online announcement at all.
+    """
+
+    KEY_PREFIX = "presence:"
+
+    def __init__(self):
+        # Open sockets per user on this worker
+        self._local: Dict[int, int] = {}
+        # {user_id: online state before the first change of the pending window}
+        self._pending: Dict[int, bool] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def _redis(self):
+        return event_bus.redis
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.KEY_PREFIX}{user_id}"
+
+    def connected(self, user_id: int):
+        """Record a newly opened socket of the user"""
+        self._track(user_id, 1)
+
+    def disconnected(self, user_id: int):
+        """Record a closed socket of the user"""
+        self._track(user_id, -1)
+
+    def _track(self, user_id: int, delta: int):
+        local_count = self._local.get(user_id, 0) + delta
+        if local_count > 0:
+            self._local[user_id] = local_count
+        else:
+            self._local.pop(user_id, None)
+        metrics.set_gauge("presence_local_users", len(self._local))
+
+        if self._redis is None:
+            self._schedule_announce(user_id, local_count - delta > 0)
+        else:
+            asyncio.create_task(self._apply_remote(user_id, delta))
+
+    async def _apply_remote(self, user_id: int, delta: int):
+        key = self._key(user_id)
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.incrby(key, delta)
+                pipe.expire(key, settings.PRESENCE_TTL)
+                count, _ = await pipe.execute()
+            if count <= 0:
+                await self._redis.delete(key)
+        except Exception as e:
+            print(f"Error updating presence of user {user_id}: {e}")
+            return
+        self._schedule_announce(user_id, count - delta > 0)
+
+    def _schedule_announce(self, user_id: int, was_online: bool):
+        # Keep the state from before the first change of the window
+        if user_id in self._pending:
+            return
+        self._pending[user_id] = was_online
+        asyncio.create_task(self._announce_later(user_id))
+
+    async def _announce_later(self, user_id: int):
+        await asyncio.sleep(settings.PRESENCE_DEBOUNCE)
+        was_online = self._pending.pop(user_id, False)
+        online = user_id in await self.get_online([user_id])
+        if online == was_online:
+            return
+
+        metrics.incr("presence_deltas_total")
+        await event_bus.publish(PRESENCE_CHANNEL, {"user_id": user_id, "online": online})
+
+    async def get_online(self, user_ids: Iterable[int]) -> Set[int]:
+        """Subset of the given users that are online, without touching the database"""
+        ids = list(user_ids)
+        if not ids:
+            return set()
+
+        if self._redis is None:
+            return {user_id for user_id in ids if user_id in self._local}
+
+        try:
+            values = await self._redis.mget([self._key(user_id) for user_id in ids])
+        except Exception as e:
+            print(f"Error reading presence: {e}")
+            return {user_id for user_id in ids if user_id in self._local}
+        return {
+            user_id for user_id, value in zip(ids, values)
+            if value is not None and int(value) > 0
+        }
+
+    async def _refresh(self):
+        """Keep the Redis counters of locally connected users alive"""
+        while True:
+            await asyncio.sleep(settings.PRESENCE_TTL / 3)
+            if self._redis is None or not self._local:
+                continue
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for user_id in list(self._local):
+                        pipe.expire(self._key(user_id), settings.PRESENCE_TTL)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"Error refreshing presence: {e}")
+
+    def start(self):
+        if self._refresh_task is None and self._redis is not None:
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+# Global instance
+presence_service = PresenceService()
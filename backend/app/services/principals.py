@@ -0,0 +1,92 @@
+"""
+Principal service - cached authorization fields of authenticated users
+"""
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.pubsub import event_bus
+from app.models.user import User, UserRole, SensitivityLevel
+
+PRINCIPAL_CHANNEL = "principals"
+
+
+class Principal(NamedTuple):
+    """The fields of a user that authorization needs, plus the (immutable) username"""
+    id: int
+    username: str
+    role: UserRole
+    is_active: bool
+    is_blocked: bool
+    sensitivity_level: SensitivityLevel
+
+
+class PrincipalService:
+    """Resolves token user ids to Principals from a bounded LRU, so authenticated
+    requests do not select the user row every time.
+
+    Entries expire after PRINCIPAL_CACHE_TTL seconds and are dropped on every
+    worker (via the event bus) when a user is blocked, unblocked or re-tagged.
+    """
+
+    def __init__(self):
+        # {user_id: (expires_at, principal)}, least recently used first
+        self._cache: "OrderedDict[int, Tuple[float, Principal]]" = OrderedDict()
+        # Bumped on every invalidation so loads that raced with one are not cached
+        self._version = 0
+
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[Principal]:
+        """Principal of the user, or None if the user does not exist"""
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._cache.move_to_end(user_id)
+            metrics.incr("principal_cache_hits_total")
+            return entry[1]
+
+        metrics.incr("principal_cache_misses_total")
+        version = self._version
+        row = (await db.execute(select(
+            User.id,
+            User.username,
+            User.role,
+            User.is_active,
+            User.is_blocked,
+            User.sensitivity_level
+        ).where(User.id == user_id))).first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        if version == self._version:
+            self._store(principal)
+        return principal
+
+    def _store(self, principal: Principal):
+        self._cache[principal.id] = (time.monotonic() + settings.PRINCIPAL_CACHE_TTL, principal)
+        self._cache.move_to_end(principal.id)
+        while len(self._cache) > settings.PRINCIPAL_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        metrics.set_gauge("principal_cache_size", len(self._cache))
+
+    def _evict(self, user_ids):
+        self._version += 1
+        for user_id in user_ids:
+            self._cache.pop(user_id, None)
+        metrics.set_gauge("principal_cache_size", len(self._cache))
+
+    async def invalidate(self, *user_ids: int):
+        """Drop the cached principals here and on every other worker; call after commit"""
+        self._evict(user_ids)
+        await event_bus.publish(PRINCIPAL_CHANNEL, {"user_ids": list(user_ids)})
+
+    async def handle_invalidation(self, payload: dict):
+        self._evict(payload["user_ids"])
+
+
+# Global instance
+principal_service = PrincipalService()
+
+event_bus.subscribe(PRINCIPAL_CHANNEL, principal_service.handle_invalidation)
@@ -0,0 +1,180 @@
+"""
+Read receipt service - write-behind buffer of per-conversation read marks
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.core.metrics import metrics
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.read_state import ReadState
+
+
+class ReadReceiptService:
+    """Buffers read high-water marks in memory and flushes them to the DB in batches"""
+
+    def __init__(self):
+        # {(user_id, conversation_id): last_read_seq}
+        self._pending: Dict[Tuple[int, int], int] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_read(self, user_id: int, conversation_id: int, seq: int):
+        """Record that the user has read the conversation up to seq"""
+        key = (user_id, conversation_id)
+        if seq <= self._pending.get(key, 0):
+            return
+
+        self._pending[key] = seq
+        metrics.set_gauge("read_receipts_buffered", len(self._pending))
+        if len(self._pending) >= settings.READ_RECEIPT_BATCH_SIZE:
+            self._flush_requested.set()
+
+    def has_pending(self, user_id: int) -> bool:
+        """Whether the user has read marks that are not yet persisted"""
+        return any(key[0] == user_id for key in self._pending)
+
+    async def flush(self):
+        """Persist all buffered read marks in one batched upsert"""
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        metrics.set_gauge("read_receipts_buffered", 0)
+        try:
+            await self._write_batch(batch)
+        except Exception as e:
+            print(f"Error flushing read receipts: {e}")
+            # Put the marks back so they are retried on the next flush
+            for (user_id, conversation_id), seq in batch.items():
+                self.mark_read(user_id, conversation_id, seq)
+            return
+        metrics.incr("read_receipts_flushed_total", len(batch))
+
+    async def _write_batch(self, batch: Dict[Tuple[int, int], int]):
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user_id,
+                "conversation_id": conversation_id,
+                "last_read_seq": seq,
+                "updated_at": now
+            }
+            for (user_id, conversation_id), seq in batch.items()
+        ]
+
+        async with AsyncSessionLocal() as db:
+            insert_stmt = dialect_insert(db, ReadState).values(rows)
+            excluded = insert_stmt.excluded
+            # High-water mark: never move a read mark backwards
+            await db.execute(insert_stmt.on_conflict_do_update(
+                index_elements=["user_id", "conversation_id"],
+                set_={
+                    "last_read_seq": case(
+                        (excluded.last_read_seq > ReadState.last_read_seq, excluded.last_read_seq),
+                        else_=ReadState.last_read_seq
+                    ),
+                    "updated_at": excluded.updated_at
+                }
+            ))
+            await self._recount_unread(db, batch)
+            await db.commit()
+
+    async def _recount_unread(self, db: AsyncSession, batch: Dict[Tuple[int, int], int]):
+        """Refresh the conversations' unread counters of the readers in the batch"""
+        last_read_seq = select(ReadState.last_read_seq).where(
+            ReadState.conversation_id == Conversation.id,
+            ReadState.user_id == bindparam("reader_id")
+        ).scalar_subquery()
+        unread = select(func.count(Message.id)).where(
+            Message.conversation_id == Conversation.id,
+            Message.sender_id != bindparam("reader_id"),
+            Message.seq > func.coalesce(last_read_seq, 0),
+            Message.is_blocked == False
+        ).scalar_subquery()
+        
+        rows = [
+            {"reader_id": user_id, "conversation_key": conversation_id}
+            for user_id, conversation_id in batch
+        ]
+        for reader_column, unread_column in (
+            (Conversation.user_low_id, "unread_low_count"),
+            (Conversation.user_high_id, "unread_high_count")
+        ):
+            # Core statement on the table: one executemany, no ORM bulk-by-primary-key
+            await db.execute(
+                update(Conversation.__table__)
+                .where(
+                    Conversation.id == bindparam("conversation_key"),
+                    reader_column == bindparam("reader_id")
+                )
+                .values({unread_column: unread}),
+                rows
+            )
+
+    async def run(self):
+        """Flush periodically, or early once the batch size is reached"""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(),
+                    timeout=settings.READ_RECEIPT_FLUSH_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the flusher and persist whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def get_unread_counts(self, db: AsyncSession, user_id: int) -> List[dict]:
+        """Unread message counts for every conversation of the user, from the conversation summaries"""
+        is_low = Conversation.user_low_id == user_id
+        partner_id = case((is_low, Conversation.user_high_id), else_=Conversation.user_low_id)
+        unread_count = case((is_low, Conversation.unread_low_count), else_=Conversation.unread_high_count)
+        
+        rows = (await db.execute(select(
+            Conversation.id,
+            partner_id.label("partner_id"),
+            Conversation.last_seq,
+            func.coalesce(ReadState.last_read_seq, 0).label("last_read_seq"),
+            unread_count.label("unread_count")
+        ).outerjoin(
+            ReadState,
+            (ReadState.conversation_id == Conversation.id) & (ReadState.user_id == user_id)
+        ).where(
+            (Conversation.user_low_id == user_id) | (Conversation.user_high_id == user_id)
+        ))).all()
+        
+        return [
+            {
+                "conversation_id": row.id,
+                "user_id": row.partner_id,
+                "last_seq": row.last_seq,
+                "last_read_seq": row.last_read_seq,
+                "unread_count": row.unread_count
+            }
+            for row in rows
+        ]
+
+
+# Global instance
+read_receipt_service = ReadReceiptService()
@@ -0,0 +1,80 @@
+"""
+Search service - ranked full-text queries over messages and incidents
+"""
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import Select, literal_column, table, column, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import decode_rank_cursor
+
+# Quoted phrases or bare words, a trailing * making either a prefix query
+TERM_PATTERN = re.compile(r'"([^"]*)"(\*?)|(\S+)')
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class SearchService:
+    """Builds full-text match criteria for the indexes created by migration 0010.
+
+    SQLite uses the <table>_fts FTS5 tables (bm25 ranking), Postgres the GIN
+    indexes on to_tsvector('simple', column) (ts_rank). Every query term must
+    match; the score is lower for better matches on both backends. Only text
+    messages are indexed, so message queries must also filter on
+    message_type = 'text'; archived messages are not indexed at all.
+    """
+
+    @staticmethod
+    def parse(q: str) -> List[Tuple[Tuple[str, ...], bool]]:
+        """Split a query into (words, is_prefix) terms; a term with several words is a phrase"""
+        terms = []
+        for phrase, phrase_prefix, bare in TERM_PATTERN.findall(q):
+            text = phrase if phrase or phrase_prefix else bare
+            is_prefix = bool(phrase_prefix) or text.endswith("*")
+            words = tuple(WORD_PATTERN.findall(text))
+            if words:
+                terms.append((words, is_prefix))
+        return terms
+
+    @staticmethod
+    def _fts5_query(terms) -> str:
+        return " AND ".join(
+            '"' + " ".join(words) + '"' + ("*" if is_prefix else "") for words, is_prefix in terms
+        )
+
+    @staticmethod
+    def _tsquery(terms) -> str:
+        return " & ".join(
+            "(" + " <-> ".join(words) + (":*" if is_prefix else "") + ")" for words, is_prefix in terms
+        )
+
+    def match(self, db: AsyncSession, query: Select, model, text_column, q: str) -> Tuple[Select, object]:
+        """Restrict query to rows of model whose text_column matches q.
+
+        Returns the query and its relevance score expression; raises ValueError
+        if q contains no searchable words.
+        """
+        terms = self.parse(q)
+        if not terms:
+            raise ValueError("Search query has no words")
+
+        if db.bind.dialect.name == "postgresql":
+            # Same expression as the GIN index, with the config inlined so the index applies
+            vector = func.to_tsvector(literal_column("'simple'"), text_column)
+            tsquery = func.to_tsquery(literal_column("'simple'"), self._tsquery(terms))
+            return query.where(vector.op("@@")(tsquery)), -func.ts_rank(vector, tsquery)
+
+        fts = table(f"{model.__tablename__}_fts", column("rowid"))
+        fts_name = literal_column(fts.name)
+        query = query.join(fts, fts.c.rowid == model.id).where(fts_name.op("MATCH")(self._fts5_query(terms)))
+        return query, func.bm25(fts_name)
+
+    @staticmethod
+    def rank_filter(query: Select, score, row_id, cursor: Optional[str]) -> Select:
+        """Order a matched query by relevance and keep only the rows past the (score, id) cursor"""
+        if cursor:
+            query = query.where(tuple_(score, row_id) > tuple_(*decode_rank_cursor(cursor)))
+        return query.order_by(score.asc(), row_id.asc())
+
+
+# Global instance
+search_service = SearchService()
@@ -0,0 +1,162 @@
+"""
+Stats service - incrementally maintained dashboard counters with periodic reconciliation
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, dialect_insert
+from app.core.metrics import metrics
+from app.models.incident import Incident, IncidentStatus, SeverityLevel
+from app.models.report import Report, ReportStatus
+from app.models.stat_counter import StatCounter
+from app.models.user import User
+
+
+# Counter name -> (model, criteria) used for the full recount
+COUNTERS = {
+    "users_total": (User, ()),
+    "users_active": (User, (User.is_active == True,)),
+    "users_blocked": (User, (User.is_blocked == True,)),
+    "users_red_tagged": (User, (User.has_red_tag == True,)),
+    "incidents_total": (Incident, ()),
+    "incidents_pending": (Incident, (Incident.status == IncidentStatus.PENDING,)),
+    "incidents_high_severity": (Incident, (Incident.severity == SeverityLevel.HIGH,)),
+    "reports_total": (Report, ()),
+    "reports_pending": (Report, (Report.status == ReportStatus.PENDING,)),
+}
+
+
+class StatsService:
+    """Keeps the dashboard counts in the stat_counters table.
+
+    Code paths that create users, incidents or reports, or change the fields the
+    counts depend on, apply +/-1 deltas in their own transaction. A periodic
+    full recount corrects any drift (e.g. rows changed by scripts).
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def snapshot(obj) -> Dict[str, int]:
+        """Counters a user, incident or report row currently contributes to"""
+        if isinstance(obj, User):
+            return {
+                "users_total": 1,
+                "users_active": int(obj.is_active is True),
+                "users_blocked": int(obj.is_blocked is True),
+                "users_red_tagged": int(obj.has_red_tag is True),
+            }
+        if isinstance(obj, Incident):
+            return {
+                "incidents_total": 1,
+                "incidents_pending": int(obj.status == IncidentStatus.PENDING),
+                "incidents_high_severity": int(obj.severity == SeverityLevel.HIGH),
+            }
+        if isinstance(obj, Report):
+            return {
+                "reports_total": 1,
+                "reports_pending": int(obj.status == ReportStatus.PENDING),
+            }
+        raise TypeError(f"No counters for {type(obj).__name__}")
+
+    async def created(self, db: AsyncSession, obj):
+        """Count a newly added row; flushes first so column defaults are applied"""
+        await db.flush()
+        await self.apply(db, self.snapshot(obj))
+
+    async def changed(self, db: AsyncSession, before: Dict[str, int], obj):
+        """Apply the difference between a snapshot taken before a change and the row now"""
+        after = self.snapshot(obj)
+        await self.apply(db, {name: after[name] - before.get(name, 0) for name in after})
+
+    async def apply(self, db: AsyncSession, deltas: Dict[str, int]):
+        """Add deltas to the counters in the caller's transaction, in one statement"""
+        rows = [
+            {"name": name, "value": delta, "updated_at": datetime.utcnow()}
+            for name, delta in deltas.items() if delta
+        ]
+        if not rows:
+            return
+
+        insert_stmt = dialect_insert(db, StatCounter).values(rows)
+        await db.execute(insert_stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={
+                "value": StatCounter.value + insert_stmt.excluded.value,
+                "updated_at": insert_stmt.excluded.updated_at
+            }
+        ))
+
+    async def get_counts(self, db: AsyncSession) -> Dict[str, int]:
+        """All counters, read from the precomputed table"""
+        rows = (await db.execute(select(StatCounter.name, StatCounter.value))).all()
+        counts = dict.fromkeys(COUNTERS, 0)
+        counts.update({row.name: row.value for row in rows})
+        return counts
+
+    async def recount(self, db: AsyncSession) -> Dict[str, int]:
+        """Compute every counter from the source tables, in one query"""
+        row = (await db.execute(select(*(
+            select(func.count()).select_from(model).where(*criteria).scalar_subquery().label(name)
+            for name, (model, criteria) in COUNTERS.items()
+        )))).one()
+        return dict(row._mapping)
+
+    async def reconcile(self) -> Dict[str, int]:
+        """Overwrite the counters with a full recount; returns the drift that was corrected"""
+        async with AsyncSessionLocal() as db:
+            stored = await self.get_counts(db)
+            actual = await self.recount(db)
+
+            now = datetime.utcnow()
+            insert_stmt = dialect_insert(db, StatCounter).values([
+                {"name": name, "value": value, "updated_at": now}
+                for name, value in actual.items()
+            ])
+            await db.execute(insert_stmt.on_conflict_do_update(
+                index_elements=["name"],
+                set_={"value": insert_stmt.excluded.value, "updated_at": insert_stmt.excluded.updated_at}
+            ))
+            await db.commit()
+
+        drift = {name: actual[name] - stored[name] for name in actual if actual[name] != stored[name]}
+        if drift:
+            print(f"Stat counters reconciled, drift: {drift}")
+            metrics.incr("stats_reconcile_drift_total", sum(abs(delta) for delta in drift.values()))
+        metrics.incr("stats_reconcile_total")
+        return drift
+
+    async def run(self):
+        """Reconcile every STATS_RECONCILE_INTERVAL seconds.
+
+        Deltas committed between the recount and the overwrite are lost until the
+        next pass, so the interval bounds how long the dashboard can be off.
+        """
+        while True:
+            await asyncio.sleep(settings.STATS_RECONCILE_INTERVAL)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                print(f"Error reconciling stat counters: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+stats_service = StatsService()
@@ -0,0 +1,191 @@
+"""
+User search service - in-memory prefix and trigram index for username/email autocomplete
+"""
+import time
+from datetime import datetime, timedelta
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.user import User
+
+
+def trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SortedKeys:
+    """Sorted strings and the user id of each, as parallel lists (no tuple per entry)"""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.ids = array("i")
+
+    def insert(self, key: str, user_id: int):
+        index = bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.ids.insert(index, user_id)
+
+    def extend(self, entries: Iterable[Tuple[str, int]]):
+        merged = sorted(chain(zip(self.keys, self.ids), entries))
+        self.keys = [key for key, _ in merged]
+        self.ids = array("i", (user_id for _, user_id in merged))
+
+    def prefixed(self, prefix: str):
+        """Ids of the keys starting with prefix, in key order"""
+        index = bisect_left(self.keys, prefix)
+        while index < len(self.keys) and self.keys[index].startswith(prefix):
+            yield self.ids[index]
+            index += 1
+
+
+class UserSearchService:
+    """Ranks users matching a search box query without scanning the users table.
+
+    Usernames and emails are kept lowercased in sorted lists for prefix lookups,
+    and the trigrams of usernames and whole emails map to user ids for
+    substring lookups, so any substring matches as it did with ILIKE '%q%'
+    (queries too short to have a trigram check every indexed user). Results rank exact username, then username prefix, then email
+    prefix, then substring matches (earlier and shorter first).
+
+    Users signing up on this worker are added immediately; users created
+    elsewhere (other workers, scripts) are picked up by a created_at range query
+    at most every USER_SEARCH_REFRESH_INTERVAL seconds.
+    """
+
+    # How far back each refresh looks before the previous one
+    REFRESH_OVERLAP = timedelta(minutes=1)
+
+    def __init__(self):
+        # {user_id: (username, email)}, lowercased
+        self._users: Dict[int, Tuple[str, str]] = {}
+        # Sorted keys with the matching user ids at the same positions
+        self._usernames = SortedKeys()
+        self._emails = SortedKeys()
+        # {trigram: ids}; users.id is a 32-bit INTEGER column
+        self._grams: Dict[str, array] = {}
+        # Start of the last read from the database (None before the initial load)
+        self._loaded_at: Optional[datetime] = None
+        self._refreshed_at = 0.0
+
+    def _index(self, user_id: int, username: str, email: str) -> Optional[Tuple[str, str]]:
+        if user_id in self._users:
+            return None
+        keys = self._users[user_id] = (username.lower(), email.lower())
+        for gram in trigrams(keys[0]) | trigrams(keys[1]):
+            postings = self._grams.get(gram)
+            if postings is None:
+                postings = self._grams[gram] = array("i")
+            postings.append(user_id)
+        return keys
+
+    def add(self, user_id: int, username: str, email: str):
+        """Index a new user; ids already present are ignored"""
+        keys = self._index(user_id, username, email)
+        if keys is not None:
+            self._usernames.insert(keys[0], user_id)
+            self._emails.insert(keys[1], user_id)
+            metrics.set_gauge("user_search_index_size", len(self._users))
+
+    async def refresh(self, db: AsyncSession):
+        """Index users created since the last refresh"""
+        self._refreshed_at = time.monotonic()
+        query = select(User.id, User.username, User.email).execution_options(yield_per=10000)
+        if self._loaded_at is not None:
+            # Overlap, so users committed after a later-created one are not missed
+            query = query.where(User.created_at >= self._loaded_at - self.REFRESH_OVERLAP)
+        loaded_at = datetime.utcnow()
+        rows = [row async for row in await db.stream(query)]
+        self._loaded_at = loaded_at
+        if not rows:
+            return
+
+        # Indexed without awaiting, so searches never see the sorted keys half-built
+        new_users = []
+        for row in rows:
+            keys = self._index(row.id, row.username, row.email)
+            if keys is not None:
+                new_users.append((row.id, keys))
+        self._usernames.extend((keys[0], user_id) for user_id, keys in new_users)
+        self._emails.extend((keys[1], user_id) for user_id, keys in new_users)
+        metrics.set_gauge("user_search_index_size", len(self._users))
+
+    async def load(self):
+        """Index all existing users; called on startup"""
+        async with AsyncSessionLocal() as db:
+            await self.refresh(db)
+
+    def rank(self, query: str, limit: int, exclude: Optional[int] = None) -> List[int]:
+        """Ids of the best matching users, best first"""
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        ranked: List[int] = []
+        seen = {exclude}
+        for entries in (self._usernames, self._emails):
+            for user_id in entries.prefixed(query):
+                if len(ranked) == limit:
+                    return ranked
+                if user_id not in seen:
+                    seen.add(user_id)
+                    ranked.append(user_id)
+
+        if len(ranked) == limit:
+            return ranked
+
+        # Substring matches; candidates come from the rarest trigram of the query,
+        # or are every indexed user for 1-2 character queries
+        grams = trigrams(query)
+        if not grams:
+            candidates = self._users
+        elif all(gram in self._grams for gram in grams):
+            candidates = min((self._grams[gram] for gram in grams), key=len)
+        else:
+            return ranked
+
+        wanted = limit - len(ranked)
+        # Past USER_SEARCH_RANK_CANDIDATES (short queries, email domains) most candidates
+        # match, so take the first matches found instead of ranking them all
+        exhaustive = len(candidates) <= settings.USER_SEARCH_RANK_CANDIDATES
+        matches = []
+        for user_id in candidates:
+            if user_id in seen:
+                continue
+            username, email = self._users[user_id]
+            position = username.find(query)
+            if position >= 0:
+                matches.append((0, position, len(username), username, user_id))
+            else:
+                position = email.find(query)
+                if position >= 0:
+                    matches.append((1, position, len(email), email, user_id))
+            if not exhaustive and len(matches) == wanted:
+                break
+        matches.sort()
+        ranked += [match[-1] for match in matches[:wanted]]
+        return ranked
+
+    async def search(self, db: AsyncSession, query: str, limit: int, exclude: Optional[int] = None) -> List[User]:
+        """Best matching users, loaded by primary key"""
+        if time.monotonic() - self._refreshed_at > settings.USER_SEARCH_REFRESH_INTERVAL:
+            await self.refresh(db)
+
+        started = time.perf_counter()
+        user_ids = self.rank(query, limit, exclude)
+        metrics.set_gauge("user_search_rank_ms", (time.perf_counter() - started) * 1000)
+        if not user_ids:
+            return []
+
+        users = {user.id: user for user in (await db.scalars(select(User).where(User.id.in_(user_ids)))).all()}
+        return [users[user_id] for user_id in user_ids if user_id in users]
+
+
+# Global instance
+user_search_service = UserSearchService()
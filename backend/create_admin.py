@@ -11,7 +11,8 @@ from getpass import getpass
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal, engine, Base
+from app.core.database import SessionLocal
+from app.core.migrations import run_migrations
 from app.models.user import User, UserRole
 from app.core.security import get_password_hash
 
@@ -45,8 +46,8 @@ def create_admin_user():
         print("❌ Password must be at least 6 characters")
         return
     
-    # Create database tables if they don't exist
-    Base.metadata.create_all(bind=engine)
+    # Create or upgrade database tables
+    run_migrations()
     
     # Create database session
     db: Session = SessionLocal()
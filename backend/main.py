@@ -4,12 +4,24 @@ Main FastAPI application entry point
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import os
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.database import async_engine
+from app.core.migrations import run_migrations
 from app.api.v1 import api_router
+from app.core.pubsub import event_bus
+from app.core.security import password_hasher
+from app.services.read_receipts import read_receipt_service
+from app.services.message_writer import message_writer
+from app.services.evidence_logger import evidence_logger
+from app.services.presence import presence_service
+from app.services.stats import stats_service
+from app.services.archive import archive_service
+from app.services.user_search import user_search_service
 
 
 @asynccontextmanager
@@ -19,8 +31,8 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.EVIDENCE_DIR, exist_ok=True)
     os.makedirs(settings.SCREENSHOT_DIR, exist_ok=True)
     
-    # Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Create or upgrade database tables
+    run_migrations()
     
     # Initialize admin user
     from app.core.database import SessionLocal
@@ -54,16 +66,37 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
     
+    await event_bus.start()
+    presence_service.start()
+    message_writer.start()
+    evidence_logger.start()
+    read_receipt_service.start()
+    # Counters must be exact before the first request; later passes run in the background
+    await stats_service.reconcile()
+    stats_service.start()
+    archive_service.start()
+    await user_search_service.load()
+    
     yield
     
     # Shutdown
-    pass
+    await archive_service.stop()
+    await stats_service.stop()
+    await read_receipt_service.stop()
+    await message_writer.stop()
+    await evidence_logger.stop()
+    await presence_service.stop()
+    await event_bus.stop()
+    password_hasher.shutdown()
+    # Close pooled connections (aiosqlite keeps a thread per connection)
+    await async_engine.dispose()
 
 
 app = FastAPI(
     title="CyberShield API",
     description="Real-time AI-driven cyberbullying detection and mitigation system",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -74,6 +107,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include API router
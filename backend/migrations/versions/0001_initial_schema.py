@@ -0,0 +1,129 @@
+"""Initial schema: users, friend requests, messages, incidents, reports
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("bio", sa.String(), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("google_id", sa.String(), nullable=True, unique=True),
+        sa.Column("github_id", sa.String(), nullable=True, unique=True),
+        sa.Column("facebook_id", sa.String(), nullable=True, unique=True),
+        sa.Column("sensitivity_level", sa.Enum("LOW", "MEDIUM", "HIGH", name="sensitivitylevel"), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_verified", sa.Boolean(), nullable=True),
+        sa.Column("role", sa.Enum("USER", "ADMIN", name="userrole"), nullable=True),
+        sa.Column("has_red_tag", sa.Boolean(), nullable=True),
+        sa.Column("warning_count", sa.Integer(), nullable=True),
+        sa.Column("is_blocked", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "friend_requests",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sender_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("receiver_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("status", sa.Enum("PENDING", "ACCEPTED", "REJECTED", name="friendrequeststatus"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_friend_requests_id", "friend_requests", ["id"])
+
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sender_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("receiver_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("content_filtered", sa.Text(), nullable=True),
+        sa.Column("message_type", sa.String(), nullable=True),
+        sa.Column("file_url", sa.String(), nullable=True),
+        sa.Column("is_flagged", sa.Boolean(), nullable=True),
+        sa.Column("severity_score", sa.String(), nullable=True),
+        sa.Column("is_blocked", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_messages_id", "messages", ["id"])
+
+    op.create_table(
+        "incidents",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("message_id", sa.Integer(), sa.ForeignKey("messages.id"), nullable=True),
+        sa.Column("severity", sa.Enum("LOW", "MEDIUM", "HIGH", "CRITICAL", name="severitylevel"), nullable=False),
+        sa.Column("status", sa.Enum("PENDING", "REVIEWED", "RESOLVED", "ESCALATED", name="incidentstatus"), nullable=True),
+        sa.Column("detected_content", sa.Text(), nullable=False),
+        sa.Column("content_filtered", sa.Text(), nullable=True),
+        sa.Column("context", sa.Text(), nullable=True),
+        sa.Column("screenshot_path", sa.String(), nullable=True),
+        sa.Column("evidence_path", sa.String(), nullable=True),
+        sa.Column("ai_analysis", sa.Text(), nullable=True),
+        sa.Column("detection_model", sa.String(), nullable=True),
+        sa.Column("confidence_score", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("reviewed_at", sa.DateTime(), nullable=True),
+        sa.Column("resolved_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_incidents_id", "incidents", ["id"])
+
+    op.create_table(
+        "reports",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("reporter_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("reported_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("message_id", sa.Integer(), sa.ForeignKey("messages.id"), nullable=True),
+        sa.Column(
+            "report_type",
+            sa.Enum("HARASSMENT", "CYBERBULLYING", "INAPPROPRIATE_CONTENT", "SPAM", "OTHER", name="reporttype"),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "UNDER_REVIEW", "RESOLVED", "DISMISSED", name="reportstatus"),
+            nullable=True,
+        ),
+        sa.Column("description", sa.Text(), nullable=False),
+        sa.Column("evidence_paths", sa.Text(), nullable=True),
+        sa.Column("is_urgent", sa.Boolean(), nullable=True),
+        sa.Column("admin_notes", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("reviewed_at", sa.DateTime(), nullable=True),
+        sa.Column("resolved_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_reports_id", "reports", ["id"])
+
+
+def downgrade():
+    op.drop_table("reports")
+    op.drop_table("incidents")
+    op.drop_table("messages")
+    op.drop_table("friend_requests")
+    op.drop_table("users")
+    for enum_name in (
+        "reportstatus", "reporttype", "incidentstatus", "severitylevel",
+        "friendrequeststatus", "userrole", "sensitivitylevel",
+    ):
+        sa.Enum(name=enum_name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,120 @@
+"""Conversations with per-conversation message sequence numbers, and read states
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with Base.metadata.create_all may already have parts of this schema
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if "conversations" not in tables:
+        op.create_table(
+            "conversations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_low_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("user_high_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("last_seq", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("user_low_id", "user_high_id", name="uq_conversations_pair"),
+        )
+        op.create_index("ix_conversations_id", "conversations", ["id"])
+        op.create_index("ix_conversations_user_high_id", "conversations", ["user_high_id"])
+
+    if "read_states" not in tables:
+        op.create_table(
+            "read_states",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("conversation_id", sa.Integer(), sa.ForeignKey("conversations.id"), nullable=False),
+            sa.Column("last_read_seq", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.UniqueConstraint("user_id", "conversation_id", name="uq_read_states_user_conversation"),
+        )
+        op.create_index("ix_read_states_id", "read_states", ["id"])
+
+    message_columns = {column["name"] for column in inspector.get_columns("messages")}
+    if "conversation_id" not in message_columns:
+        with op.batch_alter_table("messages") as batch:
+            batch.add_column(sa.Column("conversation_id", sa.Integer(), nullable=True))
+            batch.add_column(sa.Column("seq", sa.Integer(), nullable=True))
+            batch.create_foreign_key(
+                "fk_messages_conversation_id", "conversations", ["conversation_id"], ["id"]
+            )
+
+    message_indexes = {index["name"] for index in inspector.get_indexes("messages")}
+    if "ix_messages_conversation_seq" not in message_indexes:
+        op.create_index("ix_messages_conversation_seq", "messages", ["conversation_id", "seq"])
+
+    _backfill_sequences()
+
+
+def _pair(table):
+    """SQL expressions for the canonical (low, high) user pair of a messages row"""
+    sender, receiver = f"{table}.sender_id", f"{table}.receiver_id"
+    return (
+        f"CASE WHEN {sender} <= {receiver} THEN {sender} ELSE {receiver} END",
+        f"CASE WHEN {sender} <= {receiver} THEN {receiver} ELSE {sender} END",
+    )
+
+
+def _backfill_sequences():
+    """Attach pre-existing messages to conversations and number them by creation time"""
+    low, high = _pair("messages")
+
+    op.execute(f"""
+        INSERT INTO conversations (user_low_id, user_high_id, last_seq, created_at)
+        SELECT {low} AS user_low_id, {high} AS user_high_id, 0, MIN(created_at)
+        FROM messages
+        WHERE conversation_id IS NULL
+        GROUP BY {low}, {high}
+        HAVING NOT EXISTS (
+            SELECT 1 FROM conversations c
+            WHERE c.user_low_id = {low} AND c.user_high_id = {high}
+        )
+    """)
+    op.execute(f"""
+        UPDATE messages SET conversation_id = c.id
+        FROM conversations c
+        WHERE messages.conversation_id IS NULL
+          AND c.user_low_id = {low}
+          AND c.user_high_id = {high}
+    """)
+    op.execute("""
+        UPDATE messages SET seq = ranked.seq
+        FROM (
+            SELECT m.id,
+                   COALESCE(c.last_seq, 0)
+                   + ROW_NUMBER() OVER (PARTITION BY m.conversation_id ORDER BY m.created_at, m.id) AS seq
+            FROM messages m
+            JOIN conversations c ON c.id = m.conversation_id
+            WHERE m.seq IS NULL
+        ) AS ranked
+        WHERE messages.id = ranked.id
+    """)
+    op.execute("""
+        UPDATE conversations SET last_seq = (
+            SELECT COALESCE(MAX(m.seq), 0) FROM messages m WHERE m.conversation_id = conversations.id
+        )
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_messages_conversation_seq", table_name="messages")
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_constraint("fk_messages_conversation_id", type_="foreignkey")
+        batch.drop_column("seq")
+        batch.drop_column("conversation_id")
+    op.drop_table("read_states")
+    op.drop_table("conversations")
@@ -0,0 +1,46 @@
+"""Composite indexes for the chat, friendship and moderation query patterns
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) - kept in sync with the models' __table_args__
+INDEXES = [
+    # Friendship check per message (both directions are separate probes of this index)
+    ("ix_friend_requests_sender_receiver_status", "friend_requests", ["sender_id", "receiver_id", "status"]),
+    # Received requests and the receiver side of the friends list
+    ("ix_friend_requests_receiver_status", "friend_requests", ["receiver_id", "status"]),
+    # Conversation history ordered by time, and distinct partners of a sender
+    ("ix_messages_sender_receiver_created", "messages", ["sender_id", "receiver_id", "created_at"]),
+    # Distinct partners of a receiver
+    ("ix_messages_receiver_sender", "messages", ["receiver_id", "sender_id"]),
+    # Per-user incident counts and history
+    ("ix_incidents_user_created", "incidents", ["user_id", "created_at"]),
+    # Incident listing filtered by status / severity, newest first
+    ("ix_incidents_status_created", "incidents", ["status", "created_at"]),
+    ("ix_incidents_severity_created", "incidents", ["severity", "created_at"]),
+    # Unfiltered incident listing and date-range analytics
+    ("ix_incidents_created_at", "incidents", ["created_at"]),
+    # Report listing, optionally filtered by status
+    ("ix_reports_status_created", "reports", ["status", "created_at"]),
+    ("ix_reports_created_at", "reports", ["created_at"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
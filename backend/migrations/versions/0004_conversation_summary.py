@@ -0,0 +1,72 @@
+"""Denormalized last-message summary and per-side unread counts on conversations
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("conversations") as batch:
+        batch.add_column(sa.Column("last_message_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("last_sender_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("last_message_preview", sa.Text(), nullable=True))
+        batch.add_column(sa.Column("last_activity_at", sa.DateTime(), nullable=True))
+        batch.add_column(sa.Column("unread_low_count", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("unread_high_count", sa.Integer(), nullable=False, server_default="0"))
+
+    # The activity indexes lead with user_high_id, so they replace the single-column one
+    op.drop_index("ix_conversations_user_high_id", table_name="conversations")
+    op.create_index("ix_conversations_low_activity", "conversations", ["user_low_id", "last_activity_at"])
+    op.create_index("ix_conversations_high_activity", "conversations", ["user_high_id", "last_activity_at"])
+
+    _backfill_summaries()
+
+
+def _backfill_summaries():
+    """Fill the summary from each conversation's latest message and count unread messages per side"""
+    op.execute("""
+        UPDATE conversations SET
+            last_message_id = m.id,
+            last_sender_id = m.sender_id,
+            last_message_preview = SUBSTR(COALESCE(m.content_filtered, m.content), 1, 200),
+            last_activity_at = m.created_at
+        FROM messages m
+        WHERE m.conversation_id = conversations.id
+          AND m.seq = conversations.last_seq
+    """)
+    for side in ("low", "high"):
+        op.execute(f"""
+            UPDATE conversations SET unread_{side}_count = (
+                SELECT COUNT(*) FROM messages m
+                WHERE m.conversation_id = conversations.id
+                  AND m.sender_id != conversations.user_{side}_id
+                  AND COALESCE(m.is_blocked, FALSE) = FALSE
+                  AND m.seq > COALESCE((
+                      SELECT r.last_read_seq FROM read_states r
+                      WHERE r.conversation_id = conversations.id
+                        AND r.user_id = conversations.user_{side}_id
+                  ), 0)
+            )
+        """)
+
+
+def downgrade():
+    op.drop_index("ix_conversations_high_activity", table_name="conversations")
+    op.drop_index("ix_conversations_low_activity", table_name="conversations")
+    op.create_index("ix_conversations_user_high_id", "conversations", ["user_high_id"])
+    with op.batch_alter_table("conversations") as batch:
+        batch.drop_column("unread_high_count")
+        batch.drop_column("unread_low_count")
+        batch.drop_column("last_activity_at")
+        batch.drop_column("last_message_preview")
+        batch.drop_column("last_sender_id")
+        batch.drop_column("last_message_id")
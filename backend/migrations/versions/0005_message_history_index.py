@@ -0,0 +1,23 @@
+"""Index for keyset pagination of conversation history
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_messages_conversation_created_id", "messages", ["conversation_id", "created_at", "id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_messages_conversation_created_id", table_name="messages")
@@ -0,0 +1,21 @@
+"""Index for the admin user listing, ordered and paginated by creation time
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_users_created_at", "users", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_users_created_at", table_name="users")
@@ -0,0 +1,71 @@
+"""Canonical friendships table and one friend request per user pair
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "friendships",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_low_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("user_high_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("friend_request_id", sa.Integer(), sa.ForeignKey("friend_requests.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("user_low_id", "user_high_id", name="uq_friendships_pair"),
+    )
+    op.create_index("ix_friendships_id", "friendships", ["id"])
+    op.create_index("ix_friendships_high_low", "friendships", ["user_high_id", "user_low_id"])
+
+    with op.batch_alter_table("friend_requests") as batch:
+        batch.add_column(sa.Column("user_low_id", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("user_high_id", sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE friend_requests SET
+            user_low_id = CASE WHEN sender_id <= receiver_id THEN sender_id ELSE receiver_id END,
+            user_high_id = CASE WHEN sender_id <= receiver_id THEN receiver_id ELSE sender_id END
+    """)
+    # Requests raced in both directions: keep the accepted one, else the pending one, else the oldest
+    op.execute("""
+        DELETE FROM friend_requests WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_low_id, user_high_id
+                    ORDER BY CASE status WHEN 'ACCEPTED' THEN 0 WHEN 'PENDING' THEN 1 ELSE 2 END, id
+                ) AS pair_rank
+                FROM friend_requests
+            ) AS ranked
+            WHERE pair_rank > 1
+        )
+    """)
+
+    with op.batch_alter_table("friend_requests") as batch:
+        batch.alter_column("user_low_id", existing_type=sa.Integer(), nullable=False)
+        batch.alter_column("user_high_id", existing_type=sa.Integer(), nullable=False)
+        batch.create_unique_constraint("uq_friend_requests_pair", ["user_low_id", "user_high_id"])
+
+    op.execute("""
+        INSERT INTO friendships (user_low_id, user_high_id, friend_request_id, created_at)
+        SELECT user_low_id, user_high_id, id, COALESCE(updated_at, created_at)
+        FROM friend_requests
+        WHERE status = 'ACCEPTED'
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table("friend_requests") as batch:
+        batch.drop_constraint("uq_friend_requests_pair", type_="unique")
+        batch.drop_column("user_high_id")
+        batch.drop_column("user_low_id")
+    op.drop_table("friendships")
@@ -0,0 +1,21 @@
+"""Index for selecting messages to archive by age
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_messages_created_at", "messages", ["created_at"])
+
+
+def downgrade():
+    op.drop_index("ix_messages_created_at", table_name="messages")
@@ -0,0 +1,78 @@
+"""Full-text indexes on message and incident content
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+
+SQLite gets external-content FTS5 tables kept in sync by triggers; Postgres gets
+GIN indexes on to_tsvector('simple', ...) matching the expressions used by
+app.services.search. Only text messages are indexed (a partial index on
+Postgres). Batch migrations that recreate these tables drop the triggers and
+must create them again.
+"""
+from alembic import op
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+# (table, indexed text column, (column, value) selecting the rows to index, or None for all).
+# Image and video messages carry a base64 payload in content, so only text messages are indexed.
+SEARCHABLE = (
+    ("messages", "content", ("message_type", "text")),
+    ("incidents", "detected_content", None),
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table, column, only in SEARCHABLE:
+        condition = f"{only[0]} = '{only[1]}'" if only else None
+        if dialect == "sqlite":
+            fts = f"{table}_fts"
+            # Rows outside the condition are never in the index, so they are never deleted from it either
+            new_row = f" WHERE new.{condition}" if condition else ""
+            old_row = f" WHERE old.{condition}" if condition else ""
+            watched = f"{column}, {only[0]}" if only else column
+            op.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5("
+                f"{column}, content='{table}', content_rowid='id', prefix='2 3')"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {column}) SELECT new.id, new.{column}{new_row}; END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) SELECT 'delete', old.id, old.{column}{old_row}; END"
+            )
+            op.execute(
+                f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {watched} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) SELECT 'delete', old.id, old.{column}{old_row}; "
+                f"INSERT INTO {fts}(rowid, {column}) SELECT new.id, new.{column}{new_row}; END"
+            )
+            # Index the existing rows ('rebuild' would take every row of the table)
+            if condition:
+                op.execute(f"INSERT INTO {fts}(rowid, {column}) SELECT id, {column} FROM {table} WHERE {condition}")
+            else:
+                op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        elif dialect == "postgresql":
+            op.execute(
+                f"CREATE INDEX ix_{table}_{column}_fts ON {table} "
+                f"USING gin (to_tsvector('simple', {column}))"
+                + (f" WHERE {condition}" if condition else "")
+            )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, column, _ in SEARCHABLE:
+        if dialect == "sqlite":
+            fts = f"{table}_fts"
+            for trigger in ("insert", "delete", "update"):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{trigger}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
+        elif dialect == "postgresql":
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_fts")
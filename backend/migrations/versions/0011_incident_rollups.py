@@ -0,0 +1,64 @@
+"""Hourly, daily and all-time incident rollups
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+# Dimension -> expression over incidents; enums are stored by name, rollups use their values
+DIMENSIONS = {
+    "severity": "lower(CAST(severity AS VARCHAR))",
+    "status": "lower(CAST(status AS VARCHAR))",
+    "detector": "coalesce(detection_model, 'unknown')",
+    "user": "CAST(user_id AS VARCHAR)",
+}
+
+
+def bucket_expressions(dialect):
+    if dialect == "postgresql":
+        return {
+            "hour": "date_trunc('hour', created_at)",
+            "day": "date_trunc('day', created_at)",
+            "total": "TIMESTAMP '1970-01-01 00:00:00'",
+        }
+    # Same text format SQLAlchemy stores DateTime values in on SQLite
+    return {
+        "hour": "strftime('%Y-%m-%d %H:00:00.000000', created_at)",
+        "day": "strftime('%Y-%m-%d 00:00:00.000000', created_at)",
+        "total": "'1970-01-01 00:00:00.000000'",
+    }
+
+
+def upgrade():
+    op.create_table(
+        "incident_rollups",
+        sa.Column("period", sa.String(), nullable=False),
+        sa.Column("dimension", sa.String(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("value", sa.String(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("period", "dimension", "bucket_start", "value"),
+    )
+
+    # Backfill from the existing incidents
+    for period, bucket in bucket_expressions(op.get_bind().dialect.name).items():
+        for dimension, value in DIMENSIONS.items():
+            op.execute(f"""
+                INSERT INTO incident_rollups (period, dimension, bucket_start, value, count)
+                SELECT '{period}', '{dimension}', {bucket}, {value}, count(*)
+                FROM incidents
+                WHERE created_at IS NOT NULL
+                GROUP BY 3, 4
+            """)
+
+
+def downgrade():
+    op.drop_table("incident_rollups")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat round-trip latency while admin aggregates run
+
+Usage: python scripts/bench_chat_latency.py [--messages 50000] [--samples 100] [--workers 2]
+
+Starts the app on a throwaway SQLite database seeded with --messages rows, then
+times WebSocket "message" -> "message_sent" round trips in three phases:
+- idle: no admin load
+- async: --workers tasks run an aggregate over messages through AsyncSessionLocal,
+  as the routers do now
+- blocking: the same aggregate through the sync SessionLocal on the event loop,
+  as the routers did before the async port
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="cybershield-bench-")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/bench.db")
+os.environ.setdefault("EVIDENCE_DIR", f"{WORK_DIR}/evidence")
+os.environ.setdefault("SCREENSHOT_DIR", f"{WORK_DIR}/evidence/screenshots")
+os.environ.setdefault("LOGS_DIR", f"{WORK_DIR}/evidence/logs")
+os.environ.setdefault("ARCHIVE_DIR", f"{WORK_DIR}/archive")
+os.environ["GROQ_API_KEY"] = ""
+os.chdir(WORK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import asyncio  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+import main  # noqa: E402
+from app.core.database import AsyncSessionLocal, SessionLocal, engine  # noqa: E402
+
+ADMIN_QUERY = text(
+    "SELECT sender_id, receiver_id, count(*), max(length(content)) "
+    "FROM messages GROUP BY sender_id, receiver_id ORDER BY count(*) DESC"
+)
+
+
+def seed(count: int, sender_id: int, receiver_id: int):
+    rows = [
+        {"sender_id": sender_id, "receiver_id": receiver_id, "content": f"synthetic message number {i}", "created_at": datetime(2024, 1, 1)}
+        for i in range(count)
+    ]
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO messages (sender_id, receiver_id, content, message_type, is_flagged, is_blocked, created_at) "
+            "VALUES (:sender_id, :receiver_id, :content, 'text', 0, 0, :created_at)"
+        ), rows)
+
+
+def make_user(client: TestClient, name: str):
+    user = client.post("/api/v1/auth/signup", json={"username": name, "email": f"{name}@example.com", "password": "password"}).json()
+    token = client.post("/api/v1/auth/login", data={"username": f"{name}@example.com", "password": "password"}).json()["access_token"]
+    return user["id"], token
+
+
+async def async_admin_load(stop: threading.Event):
+    while not stop.is_set():
+        async with AsyncSessionLocal() as db:
+            (await db.execute(ADMIN_QUERY)).all()
+
+
+async def blocking_admin_load(stop: threading.Event):
+    while not stop.is_set():
+        with SessionLocal() as db:
+            db.execute(ADMIN_QUERY).all()
+        await asyncio.sleep(0)
+
+
+def percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def measure(ws, receiver_id: int, samples: int):
+    latencies = []
+    for i in range(samples):
+        started = time.perf_counter()
+        ws.send_json({"type": "message", "receiver_id": receiver_id, "content": f"ping {i}"})
+        while ws.receive_json()["type"] != "message_sent":
+            pass
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50_000, help="rows seeded into messages")
+    parser.add_argument("--samples", type=int, default=100, help="round trips per phase")
+    parser.add_argument("--workers", type=int, default=2, help="concurrent admin query loops")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        sender = make_user(client, "bench_sender")
+        receiver = make_user(client, "bench_receiver")
+        request = client.post("/api/v1/friends/request", json={"receiver_id": receiver[0]}, headers={"Authorization": f"Bearer {sender[1]}"}).json()
+        client.put(f"/api/v1/friends/request/{request['id']}", json={"status": "accepted"}, headers={"Authorization": f"Bearer {receiver[1]}"})
+        seed(args.messages, *sorted((sender[0], receiver[0])))
+
+        started = time.perf_counter()
+        with SessionLocal() as db:
+            db.execute(ADMIN_QUERY).all()
+        print(f"Seeded {args.messages:,} messages; admin aggregate takes {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        with client.websocket_connect(f"/api/v1/ws/chat/{sender[1]}") as ws:
+            measure(ws, receiver[0], 20)  # warm up
+            for phase, load in (("idle", None), ("async", async_admin_load), ("blocking", blocking_admin_load)):
+                stop = threading.Event()
+                tasks = [client.portal.start_task_soon(load, stop) for _ in range(args.workers)] if load else []
+                time.sleep(0.2)
+                latencies = measure(ws, receiver[0], args.samples)
+                stop.set()
+                for task in tasks:
+                    task.result()
+                print(f"  {phase:8} p50 {percentile(latencies, 0.5):8.1f} ms   p99 {percentile(latencies, 0.99):8.1f} ms")
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run()
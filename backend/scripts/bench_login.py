@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: login throughput and chat latency during a login burst
+
+Usage: python scripts/bench_login.py [--logins 64] [--concurrency 16] [--samples 50]
+
+Starts the app on a throwaway SQLite database and, in each phase, runs --logins
+POST /auth/login requests from --concurrency tasks on the app's event loop
+while timing WebSocket "message" -> "message_sent" round trips:
+- inline: bcrypt runs on the event loop thread, as signup and login did before
+- pool: password_hasher runs it on its bounded thread pool, as the app does now
+Logins rejected with 503 (PASSWORD_HASH_MAX_PENDING reached) are counted apart.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix="cybershield-bench-")
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{WORK_DIR}/bench.db")
+os.environ.setdefault("EVIDENCE_DIR", f"{WORK_DIR}/evidence")
+os.environ.setdefault("SCREENSHOT_DIR", f"{WORK_DIR}/evidence/screenshots")
+os.environ.setdefault("LOGS_DIR", f"{WORK_DIR}/evidence/logs")
+os.environ.setdefault("ARCHIVE_DIR", f"{WORK_DIR}/archive")
+os.environ["GROQ_API_KEY"] = ""
+os.chdir(WORK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import asyncio  # noqa: E402
+import httpx  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.security import password_hasher  # noqa: E402
+
+LOGIN = {"username": "bench_login@example.com", "password": "password"}
+
+
+def make_user(client: TestClient, name: str):
+    user = client.post("/api/v1/auth/signup", json={"username": name, "email": f"{name}@example.com", "password": "password"}).json()
+    token = client.post("/api/v1/auth/login", data={"username": f"{name}@example.com", "password": "password"}).json()["access_token"]
+    return user["id"], token
+
+
+async def inline_run(fn, *args):
+    return fn(*args)
+
+
+async def login_burst(logins: int, concurrency: int, done: threading.Event):
+    """Run the logins on the app's loop; returns (status counts, elapsed seconds)"""
+    statuses = {}
+    remaining = iter(range(logins))
+
+    async def worker(http: httpx.AsyncClient):
+        for _ in remaining:
+            response = await http.post("/api/v1/auth/login", data=LOGIN)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        await asyncio.gather(*(worker(http) for _ in range(concurrency)))
+    done.set()
+    return statuses, time.perf_counter() - started
+
+
+def percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def measure(ws, receiver_id: int, samples: int, done: threading.Event = None):
+    latencies = []
+    for i in range(samples):
+        if done is not None and done.is_set():
+            break
+        started = time.perf_counter()
+        ws.send_json({"type": "message", "receiver_id": receiver_id, "content": f"ping {i}"})
+        while ws.receive_json()["type"] != "message_sent":
+            pass
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64, help="login requests per phase")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent login tasks")
+    parser.add_argument("--samples", type=int, default=50, help="chat round trips per phase, at most")
+    args = parser.parse_args()
+
+    with TestClient(main.app) as client:
+        sender = make_user(client, "bench_sender")
+        receiver = make_user(client, "bench_receiver")
+        make_user(client, "bench_login")
+        request = client.post("/api/v1/friends/request", json={"receiver_id": receiver[0]}, headers={"Authorization": f"Bearer {sender[1]}"}).json()
+        client.put(f"/api/v1/friends/request/{request['id']}", json={"status": "accepted"}, headers={"Authorization": f"Bearer {receiver[1]}"})
+        print(f"bcrypt rounds {settings.BCRYPT_ROUNDS}, {settings.PASSWORD_HASH_WORKERS} hash workers, "
+              f"{args.logins} logins from {args.concurrency} tasks")
+
+        with client.websocket_connect(f"/api/v1/ws/chat/{sender[1]}") as ws:
+            measure(ws, receiver[0], 10)  # warm up
+            idle = measure(ws, receiver[0], args.samples)
+            print(f"  {'idle':7} chat p50 {percentile(idle, 0.5):8.1f} ms   p99 {percentile(idle, 0.99):8.1f} ms")
+
+            for phase in ("inline", "pool"):
+                if phase == "inline":
+                    password_hasher._run = inline_run
+                else:
+                    del password_hasher._run
+                done = threading.Event()
+                burst = client.portal.start_task_soon(login_burst, args.logins, args.concurrency, done)
+                latencies = measure(ws, receiver[0], args.samples, done)
+                statuses, elapsed = burst.result()
+                print(f"  {phase:7} chat p50 {percentile(latencies, 0.5):8.1f} ms   p99 {percentile(latencies, 0.99):8.1f} ms"
+                      f"   {statuses.get(200, 0) / elapsed:6.1f} logins/s   {statuses.get(503, 0)} rejected")
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    run()
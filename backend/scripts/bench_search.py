@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark: admin message search with the full-text index vs LIKE scans
+
+Usage: python scripts/bench_search.py [--messages 1000000] [--database PATH] [--repeat 5]
+
+Seeds --messages synthetic chat messages (one in ten an image with a base64
+payload) into a fresh database migrated to head, then times the admin search
+query (search_service.match, text messages only, 50 matches by rank and by
+date) against content LIKE '%word%' for a common word, a rare word, a phrase
+and a prefix.
+A 10M-message run needs several GB of disk and takes a while to seed; pass
+--database to keep the seeded file and reuse it on later runs.
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEED_CHUNK = 50000
+
+
+def vocabulary(size: int = 5000):
+    rng = random.Random(7)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = sorted({"".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(size * 2)})[:size]
+    rng.shuffle(words)
+    # Zipf-like: the first words are common, the tail is rare
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    return words, cum_weights
+
+
+def seed(path: str, count: int, words, cum_weights):
+    import sqlite3
+
+    rng = random.Random(42)
+    connection = sqlite3.connect(path)
+    existing = connection.execute("SELECT count(*) FROM messages").fetchone()[0]
+    if existing >= count:
+        connection.close()
+        return existing
+
+    started = time.perf_counter()
+    for start in range(existing, count, SEED_CHUNK):
+        rows = []
+        for i in range(start, min(start + SEED_CHUNK, count)):
+            if i % 10 == 9:
+                payload = base64.b64encode(rng.randbytes(300)).decode()
+                rows.append((i % 100 + 1, (i + 1) % 100 + 1, payload, "image", i // 100 + 1))
+            else:
+                content = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(4, 16)))
+                rows.append((i % 100 + 1, (i + 1) % 100 + 1, content, "text", i // 100 + 1))
+        connection.executemany(
+            "INSERT INTO messages (sender_id, receiver_id, content, message_type, seq, is_flagged, is_blocked, created_at) "
+            "VALUES (?, ?, ?, ?, ?, 0, 0, datetime('now'))",
+            rows
+        )
+        connection.commit()
+        print(f"\r  seeded {start + len(rows):,} / {count:,}", end="", flush=True)
+    connection.execute("ANALYZE")
+    connection.close()
+    print(f"\r  seeded {count - existing:,} messages in {time.perf_counter() - started:.0f}s")
+    return count
+
+
+async def time_queries(queries, repeat: int):
+    from sqlalchemy import select
+
+    from app.core.database import AsyncSessionLocal, async_engine
+    from app.models.message import Message
+    from app.services.search import search_service
+
+    def matched(db, q: str):
+        query = select(Message.id, Message.content).where(Message.message_type == "text")
+        return search_service.match(db, query, Message, Message.content, q)
+
+    async def ranked(db, q: str):
+        query, score = matched(db, q)
+        query = search_service.rank_filter(query, score, Message.id, None).limit(50)
+        return (await db.execute(query)).all()
+
+    async def newest(db, q: str):
+        query, _ = matched(db, q)
+        query = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(50)
+        return (await db.execute(query)).all()
+
+    async def like(db, q: str):
+        pattern = "%" + q.strip('"*') + "%"
+        query = select(Message.id, Message.content).where(Message.content.like(pattern)).order_by(
+            Message.created_at.desc()
+        ).limit(50)
+        return (await db.execute(query)).all()
+
+    async with AsyncSessionLocal() as db:
+        for label, q in queries:
+            print(f"  {label:8} {q!r}")
+            for name, method in (("rank", ranked), ("date", newest), ("like", like)):
+                timings, rows = [], []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    rows = await method(db, q)
+                    timings.append((time.perf_counter() - started) * 1000)
+                print(f"    {name:5} {statistics.median(timings):9.1f} ms  {len(rows):3} rows")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000000, help="messages to seed (10000000 for the full run)")
+    parser.add_argument("--database", help="SQLite file to seed and keep (default: a temporary file)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query (median reported)")
+    args = parser.parse_args()
+
+    directory = None
+    path = args.database
+    if path is None:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "search.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(path)}"
+
+    from app.core.migrations import run_migrations
+    run_migrations()
+
+    words, cum_weights = vocabulary()
+    count = seed(path, args.messages, words, cum_weights)
+    print(f"{count:,} messages, {os.path.getsize(path) / 2 ** 20:,.0f} MiB")
+
+    queries = [
+        ("common", words[0]),
+        ("rare", words[-1]),
+        ("phrase", f'"{words[1]} {words[2]}"'),
+        ("prefix", words[3][:3] + "*"),
+    ]
+    asyncio.run(time_queries(queries, args.repeat))
+    if directory is not None:
+        directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: stdlib json vs orjson for WebSocket fan-out frames and admin listings
+
+Usage: python scripts/bench_serialization.py [--devices 4] [--rows 1000] [--repeat 5]
+
+"before" reproduces the old paths: Starlette's send_json (json.dumps per device,
+datetimes isoformat()-ed by hand) and response_model=List[dict] (validation,
+jsonable_encoder, JSONResponse). "after" is what the app does now: one
+serialization.dumps per frame and ORJSONResponse.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.core.serialization import dumps
+
+
+def message_frame(i: int) -> dict:
+    return {
+        "type": "new_message",
+        "message": {
+            "id": i,
+            "sender_id": 2,
+            "receiver_id": 3,
+            "content": "see you at the library after class? bring the notes",
+            "content_filtered": "see you at the library after class? bring the notes",
+            "content_original": None,
+            "message_type": "text",
+            "is_flagged": False,
+            "severity_score": None,
+            "is_blocked": False,
+            "conversation_id": 1,
+            "seq": i,
+            "created_at": datetime(2024, 5, 1) + timedelta(seconds=i)
+        }
+    }
+
+
+def incident_row(i: int) -> dict:
+    return {
+        "id": i,
+        "user_id": i % 50,
+        "username": f"user{i % 50}",
+        "incident_type": "harassment",
+        "severity": "medium",
+        "status": "pending",
+        "detected_content": "you are worthless and everyone hates you",
+        "ai_confidence": 0.87,
+        "created_at": datetime(2024, 5, 1) + timedelta(minutes=i),
+        "resolved_at": None
+    }
+
+
+def fan_out_before(frame: dict, devices: int):
+    payload = dict(frame, message=dict(frame["message"], created_at=frame["message"]["created_at"].isoformat()))
+    for _ in range(devices):
+        json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def fan_out_after(frame: dict, devices: int):
+    text = dumps(frame)
+    for _ in range(devices):
+        text.encode()
+
+
+LIST_OF_DICTS = TypeAdapter(List[dict])
+
+
+def listing_before(rows: List[dict]):
+    JSONResponse(jsonable_encoder(LIST_OF_DICTS.validate_python(rows))).body
+
+
+def listing_after(rows: List[dict]):
+    ORJSONResponse(rows).body
+
+
+def best(fn, repeat: int, number: int) -> float:
+    """Best per-call time in seconds"""
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--devices", type=int, default=4, help="sockets each frame is sent to")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per admin listing")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = [message_frame(i) for i in range(1000)]
+    rows = [incident_row(i) for i in range(args.rows)]
+
+    print(f"WebSocket fan-out, {args.devices} devices per frame")
+    results = {}
+    for label, fn in (("before", fan_out_before), ("after", fan_out_after)):
+        per_batch = best(lambda: [fn(frame, args.devices) for frame in frames], args.repeat, 5)
+        results[label] = len(frames) / per_batch
+        print(f"  {label:6} {results[label]:12,.0f} frames/s")
+    print(f"  speedup {results['after'] / results['before']:.1f}x")
+
+    print(f"Admin listing, {args.rows} rows")
+    for label, fn in (("before", listing_before), ("after", listing_after)):
+        results[label] = best(lambda: fn(rows), args.repeat, 10)
+        print(f"  {label:6} {results[label] * 1000:12.2f} ms/response")
+    print(f"  speedup {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
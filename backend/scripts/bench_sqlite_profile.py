@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent SQLite writes with the default setup vs the production profile
+
+Usage: python scripts/bench_sqlite_profile.py [--tasks 20] [--writes 50]
+
+Each of --tasks concurrent tasks runs --writes transactions (one insert and
+commit, then a read) against a fresh database file:
+- default: aiosqlite with NullPool and no pragmas (rollback journal), as before
+- tuned: the pool and pragmas app.core.database applies to every SQLite engine
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.database import apply_sqlite_pragmas, engine_options, get_async_database_url
+
+
+def make_engine(profile: str, url: str):
+    if profile == "default":
+        return create_async_engine(get_async_database_url(url), connect_args={"check_same_thread": False}, poolclass=NullPool)
+    engine = create_async_engine(get_async_database_url(url), **engine_options(url, for_async=True))
+    event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+    return engine
+
+
+async def worker(engine, task: int, writes: int, errors: list):
+    for i in range(writes):
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(
+                    text("INSERT INTO chat (sender, body) VALUES (:sender, :body)"),
+                    {"sender": task, "body": f"message {i} from task {task}"}
+                )
+                await connection.commit()
+                await connection.execute(text("SELECT count(*) FROM chat WHERE sender = :sender"), {"sender": task})
+        except OperationalError as e:
+            errors.append(str(e.orig))
+
+
+async def run_profile(profile: str, tasks: int, writes: int, directory: str):
+    url = f"sqlite:///{directory}/{profile}.db"
+    engine = make_engine(profile, url)
+    async with engine.begin() as connection:
+        await connection.execute(text("CREATE TABLE chat (id INTEGER PRIMARY KEY, sender INTEGER, body TEXT)"))
+
+    errors = []
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(engine, task, writes, errors) for task in range(tasks)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    done = tasks * writes - len(errors)
+    print(f"  {profile:8} {done / elapsed:8.0f} writes/s   {len(errors)} errors"
+          + (f" (e.g. {errors[0]})" if errors else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=20, help="concurrent writers")
+    parser.add_argument("--writes", type=int, default=50, help="transactions per writer")
+    args = parser.parse_args()
+
+    print(f"{args.tasks} tasks x {args.writes} write transactions")
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in ("default", "tuned"):
+            asyncio.run(run_profile(profile, args.tasks, args.writes, directory))
+
+
+if __name__ == "__main__":
+    main()
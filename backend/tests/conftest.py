@@ -0,0 +1,114 @@
+"""
+Shared fixtures - the app runs against a throwaway SQLite database and evidence directory
+"""
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+WORK_DIR = Path(tempfile.mkdtemp(prefix="cybershield-tests-"))
+
+# Settings are read when app.core.config is imported, so configure them first
+os.environ["DATABASE_URL"] = f"sqlite:///{WORK_DIR / 'cybershield.db'}"
+os.environ["EVIDENCE_DIR"] = str(WORK_DIR / "evidence")
+os.environ["SCREENSHOT_DIR"] = str(WORK_DIR / "evidence" / "screenshots")
+os.environ["LOGS_DIR"] = str(WORK_DIR / "evidence" / "logs")
+os.environ["ARCHIVE_DIR"] = str(WORK_DIR / "archive")
+# Detection falls back to its offline rules; no model downloads
+os.environ["GROQ_API_KEY"] = ""
+os.environ["HF_HUB_OFFLINE"] = "1"
+os.chdir(WORK_DIR)
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import main  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import async_engine  # noqa: E402
+from app.services.principals import principal_service  # noqa: E402
+
+ADMIN_LOGIN = {"username": "admin@cybershield.com", "password": "admin123"}
+
+_usernames = itertools.count(1)
+
+
+def auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements the app runs inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One app (and database) for the whole run; tests create their own users"""
+    with TestClient(main.app) as client:
+        yield client
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def run(client):
+    """Run a coroutine function on the app's event loop, where its engine and services live"""
+    def run(fn, *args):
+        return client.portal.call(fn, *args)
+    return run
+
+
+@pytest.fixture(scope="session")
+def admin_token(client):
+    return client.post("/api/v1/auth/login", data=ADMIN_LOGIN).json()["access_token"]
+
+
+@pytest.fixture
+def make_user(client):
+    """Sign up a fresh user and return (user_id, token)"""
+    def make_user():
+        name = f"user{next(_usernames)}"
+        user = client.post("/api/v1/auth/signup", json={
+            "username": name,
+            "email": f"{name}@example.com",
+            "password": "password"
+        }).json()
+        token = client.post("/api/v1/auth/login", data={
+            "username": f"{name}@example.com",
+            "password": "password"
+        }).json()["access_token"]
+        return user["id"], token
+    return make_user
+
+
+@pytest.fixture
+def befriend(client):
+    """Make two users (as returned by make_user) friends"""
+    def befriend(sender, receiver):
+        request = client.post("/api/v1/friends/request", json={"receiver_id": receiver[0]}, headers=auth(sender[1])).json()
+        client.put(f"/api/v1/friends/request/{request['id']}", json={"status": "accepted"}, headers=auth(receiver[1]))
+    return befriend
+
+
+@pytest.fixture
+def cached_principals(monkeypatch):
+    """Principals cached from here on outlive the test, however slow the setup"""
+    monkeypatch.setattr(settings, "PRINCIPAL_CACHE_TTL", 3600.0)
+    monkeypatch.setattr(principal_service, "_cache", OrderedDict())
@@ -0,0 +1,66 @@
+"""
+Admin listings: filter validation and a fixed number of queries per page
+"""
+import pytest
+
+from tests.conftest import auth, count_queries
+
+
+def add_activity(client, make_user, befriend):
+    """A flagged message (with its incident) and a report from a fresh pair of users"""
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": "you stupid idiot"}, headers=auth(sender[1]))
+    client.post("/api/v1/support/report", json={
+        "reported_user_id": sender[0],
+        "reason": "harassment",
+        "description": "insults"
+    }, headers=auth(receiver[1]))
+
+
+@pytest.mark.parametrize("path", ["/api/v1/admin/incidents", "/api/v1/admin/reports", "/api/v1/admin/users"])
+def test_listing_query_count_does_not_grow_with_rows(client, admin_token, make_user, befriend, cached_principals, path):
+    add_activity(client, make_user, befriend)
+    client.get(path, headers=auth(admin_token))  # caches the admin principal
+
+    with count_queries() as few:
+        response = client.get(path, headers=auth(admin_token))
+    assert response.status_code == 200
+
+    for _ in range(3):
+        add_activity(client, make_user, befriend)
+    with count_queries() as many:
+        response = client.get(path, headers=auth(admin_token))
+    assert len(response.json()) >= 4
+
+    assert len(few) == len(many) == 1, many
+
+
+def test_incident_details_query_count(client, admin_token, make_user, befriend, cached_principals):
+    add_activity(client, make_user, befriend)
+    incident_id = client.get("/api/v1/admin/incidents", headers=auth(admin_token)).json()[0]["id"]
+    client.get(f"/api/v1/admin/incidents/{incident_id}/details", headers=auth(admin_token))
+
+    with count_queries() as statements:
+        response = client.get(f"/api/v1/admin/incidents/{incident_id}/details", headers=auth(admin_token))
+    assert response.status_code == 200
+    assert len(statements) == 1, statements
+
+
+@pytest.mark.parametrize("query", [
+    "/api/v1/admin/incidents?severity_filter=extreme",
+    "/api/v1/admin/incidents?status_filter=closed",
+    "/api/v1/admin/reports?status_filter=closed",
+    "/api/v1/admin/reports?report_type=rudeness",
+])
+def test_unknown_filter_values_are_rejected(client, admin_token, query):
+    response = client.get(query, headers=auth(admin_token))
+    assert response.status_code == 422
+
+
+def test_filters_accept_enum_values(client, admin_token, make_user, befriend):
+    add_activity(client, make_user, befriend)
+    response = client.get("/api/v1/admin/incidents?severity_filter=medium&status_filter=pending", headers=auth(admin_token))
+    assert response.status_code == 200
+    assert response.json()
+    assert {incident["severity"] for incident in response.json()} == {"medium"}
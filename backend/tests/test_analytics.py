@@ -0,0 +1,132 @@
+"""
+Incident rollups agree with GROUP BY over the incidents table
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal, engine
+from app.models.incident import Incident, SeverityLevel
+from app.services.analytics import analytics_service
+from app.services.stats import stats_service
+from tests.conftest import auth
+
+# Rollup dimensions as SQL over incidents; enums are stored by name
+DIMENSIONS = {
+    "severity": "lower(severity)",
+    "status": "lower(status)",
+    "detector": "coalesce(detection_model, 'unknown')",
+    "user": "CAST(user_id AS VARCHAR)",
+}
+BUCKETS = {
+    "hour": "strftime('%Y-%m-%d %H:00:00.000000', created_at)",
+    "day": "strftime('%Y-%m-%d 00:00:00.000000', created_at)",
+    "total": "'1970-01-01 00:00:00.000000'",
+}
+
+
+def rollups() -> Counter:
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT period, dimension, bucket_start, value, count FROM incident_rollups"))
+        return Counter({tuple(row[:4]): row[4] for row in rows})
+
+
+def grouped(user_ids) -> Counter:
+    """GROUP BY of the users' incidents into rollup keys"""
+    counts = Counter()
+    users = ", ".join(str(user_id) for user_id in user_ids)
+    with engine.connect() as connection:
+        for period, bucket in BUCKETS.items():
+            for dimension, value in DIMENSIONS.items():
+                rows = connection.execute(text(
+                    f"SELECT {bucket}, {value}, count(*) FROM incidents WHERE user_id IN ({users}) GROUP BY 1, 2"
+                ))
+                for bucket_start, row_value, count in rows:
+                    counts[(period, dimension, bucket_start, row_value)] = count
+    return counts
+
+
+def changed(before: Counter, after: Counter) -> Counter:
+    return Counter({key: after[key] - before[key] for key in after.keys() | before.keys() if after[key] != before[key]})
+
+
+def add_incident(run, user_id: int, created_at: datetime, severity: SeverityLevel, detector: str = None):
+    """An incident created at a past time, counted like the message handlers count theirs"""
+    async def add():
+        async with AsyncSessionLocal() as db:
+            incident = Incident(
+                user_id=user_id,
+                severity=severity,
+                detected_content="backdated",
+                detection_model=detector,
+                created_at=created_at
+            )
+            db.add(incident)
+            await stats_service.created(db, incident)
+            await analytics_service.incident_created(db, incident)
+            await db.commit()
+            return incident.id
+    return run(add)
+
+
+def test_rollups_match_group_by(client, run, admin_token, make_user, befriend):
+    offender, other, target = make_user(), make_user(), make_user()
+    befriend(offender, target)
+    befriend(other, target)
+    before = rollups()
+
+    for sender, content in ((offender, "you idiot"), (offender, "you stupid ugly fat loser"), (other, "loser")):
+        client.post("/api/v1/messages/send", json={"receiver_id": target[0], "content": content}, headers=auth(sender[1]))
+    start = datetime(2003, 6, 1, 22, 10)
+    for hours in (0, 1, 5, 26):
+        add_incident(run, offender[0], start + timedelta(hours=hours), SeverityLevel.LOW, "groq-llama")
+    add_incident(run, other[0], start + timedelta(hours=2), SeverityLevel.CRITICAL)
+
+    incidents = client.get(f"/api/v1/admin/incidents?user_id={offender[0]}", headers=auth(admin_token)).json()
+    for incident, new_status in zip(incidents, ("resolved", "reviewed", "escalated", "resolved")):
+        client.put(f"/api/v1/admin/incidents/{incident['id']}?status={new_status}", headers=auth(admin_token))
+    client.put(f"/api/v1/admin/incidents/{incidents[0]['id']}?status=pending", headers=auth(admin_token))
+
+    expected = grouped([offender[0], other[0]])
+    assert sum(count for (period, dimension, _, _), count in expected.items() if (period, dimension) == ("total", "user")) == 8
+    assert changed(before, rollups()) == expected
+
+
+def test_custom_range_matches_group_by(client, run, admin_token, make_user):
+    offender, other = make_user(), make_user()
+    start = datetime(2005, 3, 4, 9, 0)
+    created = [
+        (offender, start + timedelta(minutes=40), SeverityLevel.HIGH, "groq-llama"),      # before the range
+        (offender, start + timedelta(hours=1, minutes=5), SeverityLevel.HIGH, "groq-llama"),
+        (other, start + timedelta(hours=14), SeverityLevel.LOW, None),
+        (offender, start + timedelta(days=1, hours=3), SeverityLevel.MEDIUM, "hf-nsfw"),
+        (other, start + timedelta(days=1, hours=20), SeverityLevel.LOW, "groq-llama"),
+        (offender, start + timedelta(days=2, minutes=50), SeverityLevel.LOW, "hf-nsfw"),  # partial last hour
+        (other, start + timedelta(days=2, hours=2), SeverityLevel.HIGH, None),             # after the range
+    ]
+    ids = [add_incident(run, user[0], at, severity, detector) for user, at, severity, detector in created]
+    client.put(f"/api/v1/admin/incidents/{ids[3]}?status=resolved", headers=auth(admin_token))
+
+    # Ranges widen to whole hours: [10:00 on day 1, 10:00 on day 3)
+    date_from, date_to = start + timedelta(minutes=70), start + timedelta(days=2, minutes=30)
+    analytics = client.get("/api/v1/admin/analytics", params={
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat()
+    }, headers=auth(admin_token)).json()
+
+    with engine.connect() as connection:
+        def group_by(column: str) -> dict:
+            return dict(connection.execute(text(
+                f"SELECT {column}, count(*) FROM incidents "
+                "WHERE created_at >= :start AND created_at < :end GROUP BY 1"
+            ), {"start": start + timedelta(hours=1), "end": start + timedelta(days=2, hours=1)}).all())
+
+        assert {row["severity"]: row["count"] for row in analytics["severity_distribution"]} == group_by(DIMENSIONS["severity"])
+        assert {row["status"]: row["count"] for row in analytics["status_distribution"]} == group_by(DIMENSIONS["status"])
+        assert {row["detector"]: row["count"] for row in analytics["detector_distribution"]} == group_by(DIMENSIONS["detector"])
+        assert {row["id"]: row["incident_count"] for row in analytics["top_violators"]} == {
+            int(user_id): count for user_id, count in group_by(DIMENSIONS["user"]).items()
+        }
+        assert {row["date"]: row["count"] for row in analytics["daily_incidents"]} == group_by("date(created_at)")
+    assert sum(row["count"] for row in analytics["severity_distribution"]) == 5
@@ -0,0 +1,104 @@
+"""
+Readers merge hot and archived messages when evidence keeps old messages hot
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.incident import Incident, SeverityLevel
+from app.models.message import Message
+from app.services.archive import archive_service
+from app.services.stats import stats_service
+from tests.conftest import auth
+
+
+@pytest.fixture
+def interleaved(client, run, make_user, befriend, monkeypatch):
+    """23 messages: seq 1-20 a year old, 21-23 new.
+
+    Seq 1 and 10 stay hot as evidence and seq 20 as the newest row at archive
+    time; the other 17 are archived.
+    """
+    monkeypatch.setattr(settings, "ARCHIVE_AFTER_DAYS", 30)
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    for i in range(1, 21):
+        client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": f"old {i}"}, headers=auth(sender[1]))
+
+    async def age_and_archive():
+        async with AsyncSessionLocal() as db:
+            messages = (await db.scalars(select(Message).where(Message.sender_id == sender[0]).order_by(Message.seq))).all()
+            start = datetime.utcnow() - timedelta(days=365)
+            for message in messages:
+                await db.execute(update(Message).where(Message.id == message.id).values(
+                    created_at=start + timedelta(minutes=message.seq)
+                ))
+            for message in (messages[0], messages[9]):
+                incident = Incident(
+                    user_id=sender[0],
+                    message_id=message.id,
+                    severity=SeverityLevel.LOW,
+                    detected_content=message.content
+                )
+                db.add(incident)
+                await stats_service.created(db, incident)
+            await db.commit()
+            incident_id = incident.id
+        while await archive_service.archive_batch():
+            pass
+        return incident_id
+
+    incident_id = run(age_and_archive)
+    for i in range(21, 24):
+        client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": f"new {i}"}, headers=auth(sender[1]))
+
+    async def hot_seqs():
+        async with AsyncSessionLocal() as db:
+            return (await db.scalars(select(Message.seq).where(Message.sender_id == sender[0]).order_by(Message.seq))).all()
+    assert run(hot_seqs) == [1, 10, 20, 21, 22, 23]
+    return sender, receiver, incident_id
+
+
+def test_history_pages_merge_archive(client, interleaved):
+    sender, receiver, _ = interleaved
+    path = f"/api/v1/messages/conversation/{receiver[0]}/history?limit=4"
+
+    older, page = [], client.get(path, headers=auth(sender[1])).json()
+    while True:
+        older = [message["seq"] for message in page["messages"]] + older
+        if not page["has_more"]:
+            break
+        page = client.get(f"{path}&before={page['before']}", headers=auth(sender[1])).json()
+    assert older == list(range(1, 24))
+
+    # The oldest page's "before" cursor points at seq 1
+    newer, cursor = [1], page["before"]
+    while cursor:
+        page = client.get(f"{path}&after={cursor}", headers=auth(sender[1])).json()
+        newer += [message["seq"] for message in page["messages"]]
+        cursor = page["after"] if page["has_more"] else None
+    assert newer == list(range(1, 24))
+
+
+def test_legacy_conversation_and_sync_merge_archive(client, interleaved):
+    sender, receiver, _ = interleaved
+    legacy = client.get(f"/api/v1/messages/conversation/{receiver[0]}", headers=auth(sender[1])).json()
+    assert [message["seq"] for message in legacy] == list(range(1, 24))
+
+    synced = []
+    with client.websocket_connect(f"/api/v1/ws/chat/{receiver[1]}") as ws:
+        ws.send_json({"type": "sync", "cursors": {sender[0]: 0}})
+        while (frame := ws.receive_json())["type"] != "sync_complete":
+            synced += [message["seq"] for message in frame["messages"]]
+    assert synced == list(range(1, 24))
+
+
+def test_incident_context_includes_archived_neighbours(client, admin_token, interleaved):
+    _, _, incident_id = interleaved
+    details = client.get(f"/api/v1/admin/incidents/{incident_id}/details", headers=auth(admin_token)).json()
+    context = details["conversation_context"]
+    assert [message["content"] for message in context] == [f"old {i}" for i in range(5, 16)]
+    assert [message["is_incident_message"] for message in context].index(True) == 5
@@ -0,0 +1,53 @@
+"""
+Concurrent violations are all counted and escalate the user exactly once
+"""
+import asyncio
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.user import User
+from app.services.escalation import escalation_service
+from app.services.stats import stats_service
+
+VIOLATIONS = 100
+
+
+async def violation(user_id: int):
+    async with AsyncSessionLocal() as db:
+        result = await escalation_service.escalate(db, await db.get(User, user_id))
+        await db.commit()
+        return result
+
+
+async def counts():
+    async with AsyncSessionLocal() as db:
+        return await stats_service.get_counts(db), await stats_service.recount(db)
+
+
+def test_parallel_violations(run, make_user):
+    run(stats_service.reconcile)
+    user_id, _ = make_user()
+    before, _ = run(counts)
+
+    async def violate_in_parallel():
+        return await asyncio.gather(*(violation(user_id) for _ in range(VIOLATIONS)))
+
+    results = run(violate_in_parallel)
+
+    async def load():
+        async with AsyncSessionLocal() as db:
+            return await db.get(User, user_id)
+
+    user = run(load)
+    assert user.warning_count == VIOLATIONS
+    assert user.has_red_tag and user.is_blocked
+    assert sorted(result["warning_count"] for result in results) == list(range(1, VIOLATIONS + 1))
+
+    # Exactly one violation crossed each threshold
+    assert sum(result["warning_count"] == settings.WARNING_THRESHOLD for result in results) == 1
+    assert sum(result["warning_count"] == settings.BLOCK_THRESHOLD for result in results) == 1
+
+    after, recounted = run(counts)
+    assert after == recounted
+    assert after["users_red_tagged"] == before["users_red_tagged"] + 1
+    assert after["users_blocked"] == before["users_blocked"] + 1
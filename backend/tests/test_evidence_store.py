@@ -0,0 +1,84 @@
+"""
+Segmented evidence log: lookups by user and time, rotation, recovery and legacy import
+"""
+import json
+import time
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.services.evidence_store import INDEX_ENTRY, EvidenceStore
+from tests.conftest import auth
+
+START = datetime(2024, 3, 1, 12, 0, 0)
+
+
+def record(user_id: int, minutes: int, **fields) -> dict:
+    return {"timestamp": (START + timedelta(minutes=minutes)).isoformat(), "user_id": user_id, "severity": "low", **fields}
+
+
+def test_records_in_the_same_second_are_kept(tmp_path):
+    store = EvidenceStore(tmp_path)
+    store.append([record(1, 0, message_id=10), record(1, 0, message_id=11), record(2, 0, message_id=12)])
+    assert [found["message_id"] for found in store.find(user_id=1)] == [10, 11]
+
+
+def test_find_by_user_and_time_across_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EVIDENCE_SEGMENT_BYTES", 400)
+    store = EvidenceStore(tmp_path)
+    records = [record(user_id, minutes) for minutes in range(20) for user_id in (1, 2)]
+    for i in range(0, len(records), 4):
+        store.append(records[i:i + 4])
+    assert len(list(tmp_path.glob("evidence_*.jsonl"))) > 3
+
+    start = (START + timedelta(minutes=5)).timestamp()
+    end = (START + timedelta(minutes=9)).timestamp()
+    found = store.find(user_id=2, start=start, end=end)
+    assert found == [record for record in records if record["user_id"] == 2 and start <= datetime.fromisoformat(record["timestamp"]).timestamp() <= end]
+    assert store.find() == records
+
+
+def test_reopen_recovers_unindexed_records_and_drops_a_torn_line(tmp_path):
+    store = EvidenceStore(tmp_path)
+    store.append([record(1, 0), record(1, 1)])
+    data_path, index_path = store._paths(store._number)
+    # Crash after the data write, before the index write, then a torn line
+    with open(data_path, "ab") as f:
+        f.write((json.dumps(record(1, 2)) + "\n").encode())
+        f.write(b'{"timestamp": "2024-03-01T12:03:00", "user_')
+    store._data.close()
+    store._index.close()
+
+    reopened = EvidenceStore(tmp_path)
+    assert [found["timestamp"] for found in reopened.find(user_id=1)] == [record(1, minutes)["timestamp"] for minutes in range(3)]
+    assert index_path.stat().st_size == 3 * INDEX_ENTRY.size
+    assert data_path.read_bytes().endswith(b"\n")
+
+
+def test_legacy_files_are_imported_once(tmp_path):
+    for minutes in (2, 0, 1):
+        (tmp_path / f"incident_1_{minutes}.json").write_text(json.dumps(record(1, minutes), indent=2))
+
+    store = EvidenceStore(tmp_path)
+    assert [found["timestamp"] for found in store.find(user_id=1)] == [record(1, minutes)["timestamp"] for minutes in range(3)]
+    assert not list(tmp_path.glob("incident_*.json"))
+    assert len(list((tmp_path / "legacy").glob("incident_*.json"))) == 3
+
+    assert len(EvidenceStore(tmp_path).find(user_id=1)) == 3
+
+
+def test_generate_report_reads_logged_incidents(client, admin_token, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    for content in ("you idiot", "you stupid loser"):
+        client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": content}, headers=auth(sender[1]))
+
+    path = f"/api/v1/admin/reports/generate?user_id={sender[0]}"
+    deadline = time.monotonic() + 5
+    while (report := client.get(path, headers=auth(admin_token)).json())["summary"]["total_incidents"] < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert report["summary"]["by_user"] == {str(sender[0]): 2}
+    assert {incident["detected_content"] for incident in report["incidents"]} == {"you idiot", "you stupid loser"}
+
+    response = client.get(f"{path}&start_date=yesterday", headers=auth(admin_token))
+    assert response.status_code == 400
@@ -0,0 +1,67 @@
+"""
+Evidence writer shutdown and screenshot writes
+"""
+import asyncio
+import threading
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.evidence_logger import evidence_logger
+from app.services.evidence_store import EvidenceStore
+from app.services.evidence_writer import EvidenceWriter
+
+
+def record(user_id: int) -> dict:
+    return {"timestamp": "2024-03-01T12:00:00", "user_id": user_id, "severity": "low"}
+
+
+def test_stop_writes_items_of_submits_waiting_for_room(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EVIDENCE_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "EVIDENCE_QUEUE_TIMEOUT", 1.0)
+    store = EvidenceStore(tmp_path)
+    writer = EvidenceWriter(store)
+
+    # Hold the writer thread inside its first append so the queue fills up
+    release = threading.Event()
+    append = store.append
+    monkeypatch.setattr(store, "append", lambda records: (release.wait(), append(records)))
+    # and the waiting submits' puts until the thread has exited
+    late = threading.Event()
+    put = writer._queue.put
+    def held_put(item, block=True, timeout=None):
+        if item is not None and block:
+            late.wait()
+        put(item, block, timeout)
+
+    monkeypatch.setattr(writer._queue, "put", held_put)
+
+    async def scenario():
+        writer.start()
+        thread = writer._thread
+        await writer.submit(("record", record(0)))
+        while not writer._queue.empty():
+            await asyncio.sleep(0.01)
+        await writer.submit(("record", record(1)))
+        waiting = [asyncio.create_task(writer.submit(("record", record(user_id)))) for user_id in (2, 3, 4)]
+        while len(writer._puts) < 3:
+            await asyncio.sleep(0.01)
+
+        stopping = asyncio.create_task(writer.stop())
+        release.set()
+        while thread.is_alive():
+            await asyncio.sleep(0.01)
+        late.set()
+        await asyncio.gather(stopping, *waiting)
+
+    dropped = metrics.snapshot()["counters"].get("evidence_writer_dropped_total", 0)
+    asyncio.run(scenario())
+    assert sorted(found["user_id"] for found in store.find()) == [0, 1, 2, 3, 4]
+    assert writer._queue.empty()
+    assert metrics.snapshot()["counters"].get("evidence_writer_dropped_total", 0) == dropped
+
+
+def test_screenshot_exists_when_its_path_is_returned(run):
+    path = Path(run(evidence_logger.save_screenshot, b"\x89PNG screenshot", 7))
+    assert path.parent == Path(settings.SCREENSHOT_DIR)
+    assert path.read_bytes() == b"\x89PNG screenshot"
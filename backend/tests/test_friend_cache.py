@@ -0,0 +1,41 @@
+"""
+Friend set cache behind the per-message friendship check
+"""
+from app.core.pubsub import event_bus
+from app.services.friendships import FRIENDSHIP_CHANNEL, friendship_service
+from tests.conftest import auth, count_queries
+
+
+def send(client, sender, receiver, content: str = "hi"):
+    return client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": content}, headers=auth(sender[1]))
+
+
+def test_steady_state_send_skips_the_friendship_query(client, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    assert send(client, sender, receiver).status_code == 200
+
+    with count_queries() as statements:
+        assert send(client, sender, receiver).status_code == 200
+    assert not [statement for statement in statements if "friendships" in statement]
+
+
+def test_accepting_a_request_evicts_cached_friend_sets(client, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    # Caches "not friends" for the sender
+    assert send(client, sender, receiver).status_code == 403
+
+    befriend(sender, receiver)
+    assert send(client, sender, receiver).status_code == 200
+    assert send(client, receiver, sender).status_code == 200
+
+
+def test_invalidation_event_evicts_cached_friend_sets(client, run, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    send(client, sender, receiver)
+    assert sender[0] in friendship_service._cache
+
+    # What another worker publishes after answering a friend request
+    run(event_bus.publish, FRIENDSHIP_CHANNEL, {"user_ids": [sender[0]]})
+    assert sender[0] not in friendship_service._cache
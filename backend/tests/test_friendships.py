@@ -0,0 +1,75 @@
+"""
+Canonical friendship pairs and one friend request per pair
+"""
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import AsyncSessionLocal
+from app.models.friend_request import FriendRequest, FriendRequestStatus
+from app.models.friendship import Friendship
+from app.services.friendships import friendship_service
+from tests.conftest import auth
+
+
+async def pair_rows(model, low: int, high: int) -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.scalars(select(model).where(model.user_low_id == low, model.user_high_id == high))).all()
+
+
+def test_crossed_requests_are_rejected(client, make_user):
+    alice, bob = make_user(), make_user()
+    first = client.post("/api/v1/friends/request", json={"receiver_id": bob[0]}, headers=auth(alice[1]))
+    assert first.status_code == 200
+
+    crossed = client.post("/api/v1/friends/request", json={"receiver_id": alice[0]}, headers=auth(bob[1]))
+    assert crossed.status_code == 400
+    repeated = client.post("/api/v1/friends/request", json={"receiver_id": bob[0]}, headers=auth(alice[1]))
+    assert repeated.status_code == 400
+
+
+def test_accepting_stores_one_canonical_pair(client, run, make_user, befriend):
+    alice, bob = make_user(), make_user()
+    # The higher id sends, so the stored pair must be reordered
+    befriend(bob, alice)
+    low, high = sorted((alice[0], bob[0]))
+
+    friendships = run(pair_rows, Friendship, low, high)
+    assert len(friendships) == 1
+    for user, friend in ((alice, bob), (bob, alice)):
+        friends = client.get("/api/v1/friends/list", headers=auth(user[1])).json()
+        assert [entry["id"] for entry in friends] == [friend[0]]
+
+    async def add_again():
+        async with AsyncSessionLocal() as db:
+            request = await db.get(FriendRequest, friendships[0].friend_request_id)
+            await friendship_service.add_friendship(db, request)
+            await db.commit()
+            return await db.scalar(select(func.count()).select_from(Friendship).where(
+                Friendship.user_low_id == low,
+                Friendship.user_high_id == high
+            ))
+
+    assert run(add_again) == 1
+
+
+def test_pair_constraint_blocks_a_second_request(client, run, make_user):
+    alice, bob = make_user(), make_user()
+    client.post("/api/v1/friends/request", json={"receiver_id": bob[0]}, headers=auth(alice[1]))
+    low, high = sorted((alice[0], bob[0]))
+
+    async def insert_crossed_request():
+        # What a request racing past the existence check would insert
+        async with AsyncSessionLocal() as db:
+            db.add(FriendRequest(
+                sender_id=bob[0],
+                receiver_id=alice[0],
+                user_low_id=low,
+                user_high_id=high,
+                status=FriendRequestStatus.PENDING
+            ))
+            await db.commit()
+
+    with pytest.raises(IntegrityError):
+        run(insert_crossed_request)
+    assert len(run(pair_rows, FriendRequest, low, high)) == 1
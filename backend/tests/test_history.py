@@ -0,0 +1,50 @@
+"""
+Keyset-paginated conversation history
+"""
+from app.core.config import settings
+from tests.conftest import auth
+
+
+def test_pages_walk_back_and_forward_without_gaps(client, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    for i in range(7):
+        client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": f"message {i}"}, headers=auth(sender[1]))
+    path = f"/api/v1/messages/conversation/{sender[0]}/history?limit=3"
+
+    latest = client.get(path, headers=auth(receiver[1])).json()
+    assert [message["content"] for message in latest["messages"]] == ["message 4", "message 5", "message 6"]
+    assert latest["has_more"]
+
+    pages, page = [latest], latest
+    while page["has_more"]:
+        page = client.get(f"{path}&before={page['before']}", headers=auth(receiver[1])).json()
+        pages.insert(0, page)
+    assert [len(page["messages"]) for page in pages] == [1, 3, 3]
+    seqs = [message["seq"] for page in pages for message in page["messages"]]
+    assert seqs == list(range(1, 8))
+
+    forward = client.get(f"{path}&after={pages[0]['after']}", headers=auth(receiver[1])).json()
+    assert [message["seq"] for message in forward["messages"]] == [2, 3, 4]
+    assert forward["has_more"]
+
+
+def test_history_is_private_to_the_pair(client, make_user, befriend):
+    sender, receiver, stranger = make_user(), make_user(), make_user()
+    befriend(sender, receiver)
+    client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": "just us"}, headers=auth(sender[1]))
+
+    page = client.get(f"/api/v1/messages/conversation/{sender[0]}/history", headers=auth(stranger[1])).json()
+    assert page["messages"] == []
+    assert not page["has_more"]
+
+
+def test_invalid_requests_are_rejected(client, make_user):
+    user, other = make_user(), make_user()
+    path = f"/api/v1/messages/conversation/{other[0]}/history"
+    page = client.get(path, headers=auth(user[1])).json()
+    assert page == {"messages": [], "has_more": False, "before": None, "after": None}
+
+    assert client.get(f"{path}?before=bm90IGEgY3Vyc29y", headers=auth(user[1])).status_code == 400
+    assert client.get(f"{path}?before=a&after=b", headers=auth(user[1])).status_code == 400
+    assert client.get(f"{path}?limit={settings.MESSAGE_PAGE_MAX + 1}", headers=auth(user[1])).status_code == 422
@@ -0,0 +1,109 @@
+"""
+Query plans of the hot queries use the composite indexes
+"""
+import pytest
+from sqlalchemy import case, select, text
+from sqlalchemy.dialects import sqlite
+
+from app.core.database import engine
+from app.core.pagination import keyset_filter
+from app.models.conversation import Conversation
+from app.models.friend_request import FriendRequest, FriendRequestStatus
+from app.models.friendship import Friendship
+from app.models.incident import Incident, IncidentStatus, SeverityLevel
+from app.models.message import Message
+from app.models.report import Report, ReportStatus
+from app.models.user import User
+
+
+def query_plan(statement) -> str:
+    sql = statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    with engine.connect() as connection:
+        return "\n".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+
+# name: (statement, index or plan step it must use, whether the index also provides the order)
+CASES = {
+    # Messages between two users: one index probe per direction, merged and sorted
+    "messages_between": (
+        select(Message).where(
+            ((Message.sender_id == 1) & (Message.receiver_id == 2)) |
+            ((Message.sender_id == 2) & (Message.receiver_id == 1))
+        ).order_by(Message.created_at.asc()),
+        "MULTI-INDEX OR",
+        False
+    ),
+    "conversation_history": (
+        keyset_filter(select(Message.id).where(Message.conversation_id == 1), Message.created_at, Message.id, None, True).limit(50),
+        "ix_messages_conversation_created_id",
+        True
+    ),
+    "missed_messages": (
+        select(Message).where(Message.conversation_id == 1, Message.seq > 10).order_by(Message.seq.asc()).limit(100),
+        "ix_messages_conversation_seq",
+        True
+    ),
+    # Friendship check per message (friendship_service._load)
+    "friend_ids": (
+        select(case((Friendship.user_low_id == 1, Friendship.user_high_id), else_=Friendship.user_low_id)).where(
+            (Friendship.user_low_id == 1) | (Friendship.user_high_id == 1)
+        ),
+        "ix_friendships_high_low",
+        True
+    ),
+    "pending_request": (
+        select(FriendRequest).where(
+            FriendRequest.sender_id == 1,
+            FriendRequest.receiver_id == 2,
+            FriendRequest.status == FriendRequestStatus.PENDING
+        ),
+        "ix_friend_requests_sender_receiver_status",
+        True
+    ),
+    "received_requests": (
+        select(FriendRequest).where(FriendRequest.receiver_id == 1, FriendRequest.status == FriendRequestStatus.PENDING),
+        "ix_friend_requests_receiver_status",
+        True
+    ),
+    "inbox": (
+        select(Conversation).where(Conversation.user_low_id == 1).order_by(Conversation.last_activity_at.desc()),
+        "ix_conversations_low_activity",
+        True
+    ),
+    "incidents_by_status": (
+        keyset_filter(select(Incident.id).where(Incident.status == IncidentStatus.PENDING), Incident.created_at, Incident.id, None, True).limit(50),
+        "ix_incidents_status_created",
+        True
+    ),
+    "incidents_by_severity": (
+        keyset_filter(select(Incident.id).where(Incident.severity == SeverityLevel.HIGH), Incident.created_at, Incident.id, None, True).limit(50),
+        "ix_incidents_severity_created",
+        True
+    ),
+    "incidents_of_user": (
+        keyset_filter(select(Incident.id).where(Incident.user_id == 1), Incident.created_at, Incident.id, None, True).limit(50),
+        "ix_incidents_user_created",
+        True
+    ),
+    "incidents": (
+        keyset_filter(select(Incident.id, User.username).outerjoin(User, User.id == Incident.user_id), Incident.created_at, Incident.id, None, True).limit(50),
+        "ix_incidents_created_at",
+        True
+    ),
+    "reports_by_status": (
+        keyset_filter(select(Report.id).where(Report.status == ReportStatus.PENDING), Report.created_at, Report.id, None, True).limit(50),
+        "ix_reports_status_created",
+        True
+    ),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_query_uses_index(client, name):
+    statement, expected, ordered_by_index = CASES[name]
+    plan = query_plan(statement)
+    assert expected in plan, plan
+    # Full table scans show up as "SCAN <table>" without an index
+    assert not [line for line in plan.splitlines() if line.startswith("SCAN") and "INDEX" not in line], plan
+    if ordered_by_index:
+        assert "TEMP B-TREE" not in plan, plan
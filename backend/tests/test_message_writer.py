@@ -0,0 +1,34 @@
+"""
+Message writer group commit and shutdown
+"""
+import asyncio
+
+from app.core.config import settings
+from app.models.message import Message
+from app.services.message_writer import MessageWriter
+
+
+def test_stop_commits_current_batch_and_queue(run, make_user, befriend, monkeypatch):
+    monkeypatch.setattr(settings, "MESSAGE_WRITE_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "MESSAGE_WRITE_FLUSH_INTERVAL", 0.05)
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+
+    async def write_then_stop():
+        writer = MessageWriter()
+        writer.start()
+        writes = [
+            asyncio.ensure_future(writer.write(Message(sender_id=sender[0], receiver_id=receiver[0], content=f"message {i}")))
+            for i in range(25)
+        ]
+        # Let the writer take a batch off the queue before stopping it
+        for _ in range(3):
+            await asyncio.sleep(0)
+        await writer.stop()
+        return writes
+
+    writes = run(write_then_stop)
+    assert all(write.done() for write in writes)
+    messages = [write.result() for write in writes]
+    assert all(message.id is not None for message in messages)
+    assert [message.seq for message in messages] == list(range(1, 26))
@@ -0,0 +1,49 @@
+"""
+Presence: online status in the friends list and debounced presence frames
+"""
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from tests.conftest import auth
+
+
+def is_online(client, user, friend_id: int) -> bool:
+    friends = client.get("/api/v1/friends/list", headers=auth(user[1])).json()
+    return next(friend["is_online"] for friend in friends if friend["id"] == friend_id)
+
+
+def deltas() -> int:
+    return metrics.snapshot()["counters"].get("presence_deltas_total", 0)
+
+
+def test_friends_list_shows_online_status(client, make_user, befriend):
+    user, friend = make_user(), make_user()
+    befriend(user, friend)
+    assert not is_online(client, user, friend[0])
+
+    with client.websocket_connect(f"/api/v1/ws/chat/{friend[1]}"):
+        assert is_online(client, user, friend[0])
+    assert not is_online(client, user, friend[0])
+
+
+def test_presence_frames_are_debounced(client, make_user, befriend, monkeypatch):
+    monkeypatch.setattr(settings, "PRESENCE_DEBOUNCE", 0.2)
+    watcher, friend = make_user(), make_user()
+    befriend(watcher, friend)
+
+    with client.websocket_connect(f"/api/v1/ws/chat/{watcher[1]}") as ws:
+        with client.websocket_connect(f"/api/v1/ws/chat/{friend[1]}"):
+            while (frame := ws.receive_json())["type"] != "presence":
+                pass
+            assert frame == {"type": "presence", "user_id": friend[0], "online": True}
+
+        # A quick reconnect within the debounce window announces nothing
+        before = deltas()
+        with client.websocket_connect(f"/api/v1/ws/chat/{friend[1]}"):
+            time.sleep(0.5)
+            assert deltas() == before
+
+        while (frame := ws.receive_json())["type"] != "presence":
+            pass
+        assert frame == {"type": "presence", "user_id": friend[0], "online": False}
@@ -0,0 +1,81 @@
+"""
+Cached principals: hits skip the users query, admin changes evict them at once
+"""
+import pytest
+
+from app.core.metrics import metrics
+from app.core.pubsub import event_bus
+from app.services.principals import PRINCIPAL_CHANNEL, principal_service
+from tests.conftest import auth, count_queries
+
+PRINCIPAL_QUERY = "SELECT users.id, users.username, users.role, users.is_active, users.is_blocked, users.sensitivity_level"
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    """Payloads published on the principal channel during the test"""
+    published = []
+
+    async def record(payload: dict):
+        published.append(payload)
+
+    monkeypatch.setitem(event_bus._handlers, PRINCIPAL_CHANNEL, [*event_bus._handlers[PRINCIPAL_CHANNEL], record])
+    return published
+
+
+def send(client, sender, receiver, content: str = "see you later"):
+    return client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": content}, headers=auth(sender[1]))
+
+
+def test_cache_hit_skips_the_users_query(client, make_user, cached_principals):
+    user_id, token = make_user()
+    client.get("/api/v1/friends/list", headers=auth(token))
+    assert user_id in principal_service._cache
+
+    hits = metrics.snapshot()["counters"].get("principal_cache_hits_total", 0)
+    with count_queries() as statements:
+        response = client.get("/api/v1/friends/list", headers=auth(token))
+    assert response.status_code == 200
+    assert not [statement for statement in statements if statement.startswith(PRINCIPAL_QUERY)], statements
+    assert metrics.snapshot()["counters"]["principal_cache_hits_total"] == hits + 1
+
+
+def test_blocked_user_is_refused_on_the_next_request(client, admin_token, make_user, befriend, cached_principals, invalidations):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    assert send(client, sender, receiver).status_code == 200
+    assert sender[0] in principal_service._cache
+
+    response = client.put(f"/api/v1/admin/users/{sender[0]}/block", json={"is_blocked": True}, headers=auth(admin_token))
+    assert response.status_code == 200
+    assert invalidations == [{"user_ids": [sender[0]]}]
+    assert sender[0] not in principal_service._cache
+
+    refused = send(client, sender, receiver)
+    assert refused.status_code == 403
+    assert refused.json()["detail"] == "Your account is blocked"
+
+    client.put(f"/api/v1/admin/users/{sender[0]}/block", json={"is_blocked": False}, headers=auth(admin_token))
+    assert invalidations == [{"user_ids": [sender[0]]}] * 2
+    assert send(client, sender, receiver).status_code == 200
+
+
+def test_tag_update_evicts_the_principal(client, admin_token, make_user, cached_principals, invalidations):
+    user_id, token = make_user()
+    client.get("/api/v1/friends/list", headers=auth(token))
+    assert user_id in principal_service._cache
+
+    response = client.put(f"/api/v1/admin/users/{user_id}/tag", json={"has_red_tag": True}, headers=auth(admin_token))
+    assert response.status_code == 200
+    assert invalidations == [{"user_ids": [user_id]}]
+    assert user_id not in principal_service._cache
+
+
+def test_invalidation_from_another_worker_evicts(client, run, make_user, cached_principals):
+    user_id, token = make_user()
+    client.get("/api/v1/friends/list", headers=auth(token))
+    assert user_id in principal_service._cache
+
+    # What this worker receives when another worker blocks or re-tags the user
+    run(event_bus.publish, PRINCIPAL_CHANNEL, {"user_ids": [user_id]})
+    assert user_id not in principal_service._cache
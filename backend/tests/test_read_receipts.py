@@ -0,0 +1,71 @@
+"""
+Read receipts: buffered high-water marks, forwarded receipts and unread counts
+"""
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.read_state import ReadState
+from app.services.read_receipts import read_receipt_service
+from tests.conftest import auth
+
+
+def send(client, sender, receiver, count: int):
+    for i in range(count):
+        client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": f"hello {i}"}, headers=auth(sender[1]))
+
+
+def unread(client, user, partner_id: int) -> dict:
+    counts = client.get("/api/v1/messages/unread", headers=auth(user[1])).json()
+    return next(count for count in counts if count["user_id"] == partner_id)
+
+
+def test_read_frame_is_forwarded_and_counted(client, make_user, befriend):
+    sender, reader = make_user(), make_user()
+    befriend(sender, reader)
+    send(client, sender, reader, 3)
+    assert unread(client, reader, sender[0])["unread_count"] == 3
+
+    with client.websocket_connect(f"/api/v1/ws/chat/{sender[1]}") as sender_ws:
+        with client.websocket_connect(f"/api/v1/ws/chat/{reader[1]}") as reader_ws:
+            reader_ws.send_json({"type": "read", "partner_id": sender[0], "seq": 2})
+            while (frame := sender_ws.receive_json())["type"] != "read":
+                pass
+    assert frame["user_id"] == reader[0]
+    assert frame["seq"] == 2
+
+    counts = unread(client, reader, sender[0])
+    assert counts["last_read_seq"] == 2
+    assert counts["unread_count"] == 1
+    # The sender's own messages are never unread for them
+    assert unread(client, sender, reader[0])["unread_count"] == 0
+
+
+def test_read_marks_never_move_backwards(client, run, make_user, befriend):
+    sender, reader = make_user(), make_user()
+    befriend(sender, reader)
+    send(client, sender, reader, 5)
+    conversation_id = unread(client, reader, sender[0])["conversation_id"]
+
+    async def stored_mark():
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(ReadState.last_read_seq).where(
+                ReadState.user_id == reader[0],
+                ReadState.conversation_id == conversation_id
+            ))
+
+    async def mark_and_flush(*seqs):
+        # On the app's loop, so the background flusher cannot run between the marks
+        for seq in seqs:
+            read_receipt_service.mark_read(reader[0], conversation_id, seq)
+        assert read_receipt_service.has_pending(reader[0])
+        await read_receipt_service.flush()
+
+    # A stale mark buffered behind a newer one is ignored
+    run(mark_and_flush, 4, 2)
+    assert not read_receipt_service.has_pending(reader[0])
+    assert run(stored_mark) == 4
+
+    # A stale mark from a later batch does not lower the stored one
+    run(mark_and_flush, 3)
+    assert run(stored_mark) == 4
+    assert unread(client, reader, sender[0])["unread_count"] == 1
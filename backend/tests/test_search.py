@@ -0,0 +1,71 @@
+"""
+Full-text search indexes text messages only
+"""
+from alembic import command
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.core.migrations import get_alembic_config
+from tests.conftest import auth
+
+IMAGE_PAYLOAD = "aGVsbG8gd29ybGQgdGhpcyBpcyBub3QgdGV4dA"
+
+
+def indexed(token: str) -> int:
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT count(*) FROM messages_fts WHERE messages_fts MATCH :q"), {"q": token}).scalar()
+
+
+def migrate(target: str, downgrade: bool = False):
+    config = get_alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        (command.downgrade if downgrade else command.upgrade)(config, target)
+
+
+def test_image_messages_are_not_indexed(client, admin_token, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": "meet at the lighthouse"}, headers=auth(sender[1]))
+    client.post("/api/v1/messages/send", json={
+        "receiver_id": receiver[0],
+        "content": IMAGE_PAYLOAD,
+        "message_type": "image"
+    }, headers=auth(sender[1]))
+
+    results = client.get("/api/v1/admin/search?q=lighthouse", headers=auth(admin_token)).json()
+    assert [item["content"] for item in results] == ["meet at the lighthouse"]
+    assert client.get(f"/api/v1/admin/search?q={IMAGE_PAYLOAD}", headers=auth(admin_token)).json() == []
+    assert indexed(IMAGE_PAYLOAD) == 0
+
+
+def test_migration_indexes_existing_text_messages_only(client, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    payload = IMAGE_PAYLOAD[::-1]
+    client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": "harbour lantern"}, headers=auth(sender[1]))
+    client.post("/api/v1/messages/send", json={
+        "receiver_id": receiver[0],
+        "content": payload,
+        "message_type": "image"
+    }, headers=auth(sender[1]))
+
+    # Revision 0010 builds the index from the rows already in the table
+    migrate("0009", downgrade=True)
+    migrate("head")
+    assert indexed("lantern") == 1
+    assert indexed(payload) == 0
+
+
+def test_changing_message_type_updates_the_index(client, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    message = client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": "quartz meadow"}, headers=auth(sender[1])).json()
+    assert indexed("quartz") == 1
+
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE messages SET message_type = 'image' WHERE id = :id"), {"id": message["id"]})
+    assert indexed("quartz") == 0
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE messages SET message_type = 'text' WHERE id = :id"), {"id": message["id"]})
+    assert indexed("quartz") == 1
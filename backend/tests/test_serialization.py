@@ -0,0 +1,55 @@
+"""
+orjson serialization of WebSocket frames and API responses
+"""
+import json
+from datetime import datetime
+
+from app.core.serialization import dumps, loads
+from app.models.incident import SeverityLevel
+from tests.conftest import auth
+
+
+def test_dumps_matches_stdlib_json():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    payload = {"cursors": {7: 3, 12: 9}, "created_at": created_at, "severity": SeverityLevel.HIGH, "text": "héllo"}
+    assert loads(dumps(payload)) == json.loads(json.dumps({
+        "cursors": {"7": 3, "12": 9},
+        "created_at": created_at.isoformat(),
+        "severity": SeverityLevel.HIGH.value,
+        "text": "héllo"
+    }))
+
+
+def test_every_device_gets_the_same_frame(client, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+
+    def next_message(ws) -> str:
+        while True:
+            text = ws.receive_text()
+            if loads(text)["type"] == "message":
+                return text
+
+    with client.websocket_connect(f"/api/v1/ws/chat/{receiver[1]}") as phone, \
+            client.websocket_connect(f"/api/v1/ws/chat/{receiver[1]}") as laptop, \
+            client.websocket_connect(f"/api/v1/ws/chat/{sender[1]}") as ws:
+        ws.send_json({"type": "message", "receiver_id": receiver[0], "content": "see you at 5"})
+        frames = next_message(phone), next_message(laptop)
+
+    assert frames[0] == frames[1]
+    frame = loads(frames[0])
+    assert frame["sender_id"] == sender[0]
+    assert frame["content"] == "see you at 5"
+    assert datetime.fromisoformat(frame["created_at"])
+
+
+def test_listing_serializes_datetimes_and_enums(client, admin_token, make_user, befriend):
+    sender, receiver = make_user(), make_user()
+    befriend(sender, receiver)
+    client.post("/api/v1/messages/send", json={"receiver_id": receiver[0], "content": "you stupid idiot"}, headers=auth(sender[1]))
+
+    response = client.get(f"/api/v1/admin/incidents?user_id={sender[0]}", headers=auth(admin_token))
+    assert response.headers["content-type"] == "application/json"
+    incident = response.json()[0]
+    assert incident["severity"] == "medium"
+    assert datetime.fromisoformat(incident["created_at"])
@@ -0,0 +1,57 @@
+"""
+Dashboard counters stay equal to a full recount
+"""
+from app.core.database import AsyncSessionLocal
+from app.services.stats import stats_service
+from tests.conftest import auth
+
+
+async def stored_and_recounted():
+    async with AsyncSessionLocal() as db:
+        return await stats_service.get_counts(db), await stats_service.recount(db)
+
+
+def test_counters_match_recount_after_mixed_operations(client, run, admin_token, make_user, befriend):
+    run(stats_service.reconcile)
+    offender, target, bystander = make_user(), make_user(), make_user()
+    befriend(offender, target)
+    admin = auth(admin_token)
+
+    # Flagged messages over REST and WebSocket: incidents, warnings, red tag, then a block
+    for content in ("you idiot", "you stupid ugly fat loser", "loser"):
+        client.post("/api/v1/messages/send", json={"receiver_id": target[0], "content": content}, headers=auth(offender[1]))
+    with client.websocket_connect(f"/api/v1/ws/chat/{offender[1]}") as ws:
+        for content in ("go die", "i hate you"):
+            ws.send_json({"type": "message", "receiver_id": target[0], "content": content})
+            while ws.receive_json()["type"] != "message_sent":
+                pass
+    client.post("/api/v1/messages/send", json={"receiver_id": offender[0], "content": "see you tomorrow"}, headers=auth(target[1]))
+
+    blocked = client.get("/api/v1/admin/users?is_blocked=true", headers=admin).json()
+    assert offender[0] in {user["id"] for user in blocked}
+
+    incidents = client.get(f"/api/v1/admin/incidents?user_id={offender[0]}", headers=admin).json()
+    assert len(incidents) == 5
+    client.put(f"/api/v1/admin/incidents/{incidents[0]['id']}?status=resolved", headers=admin)
+    client.put(f"/api/v1/admin/incidents/{incidents[1]['id']}?status=reviewed", headers=admin)
+
+    for reporter in (target, bystander):
+        client.post("/api/v1/support/report", json={
+            "reported_user_id": offender[0],
+            "reason": "harassment",
+            "description": "insults"
+        }, headers=auth(reporter[1]))
+    report = client.get("/api/v1/admin/reports?status_filter=pending", headers=admin).json()[0]
+    client.put(f"/api/v1/admin/reports/{report['id']}?status=resolved", headers=admin)
+
+    client.put(f"/api/v1/admin/users/{offender[0]}/block", json={"is_blocked": False}, headers=admin)
+    client.put(f"/api/v1/admin/users/{bystander[0]}/tag", json={"has_red_tag": True}, headers=admin)
+    client.put(f"/api/v1/admin/users/{offender[0]}/tag", json={"has_red_tag": False}, headers=admin)
+
+    stored, recounted = run(stored_and_recounted)
+    assert stored == recounted
+
+    stats = client.get("/api/v1/admin/dashboard/stats", headers=admin).json()
+    assert stats["users"]["red_tagged"] == recounted["users_red_tagged"]
+    assert stats["incidents"]["pending"] == recounted["incidents_pending"]
+    assert stats["reports"]["pending"] == recounted["reports_pending"]
@@ -0,0 +1,62 @@
+"""
+In-memory user search behind /friends/search
+"""
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.user import User
+from tests.conftest import auth
+
+
+def signup(client, username: str, email: str) -> int:
+    return client.post("/api/v1/auth/signup", json={"username": username, "email": email, "password": "password"}).json()["id"]
+
+
+def search(client, token: str, query: str) -> list:
+    response = client.get("/api/v1/friends/search", params={"query": query}, headers=auth(token))
+    assert response.status_code == 200
+    return [user["username"] for user in response.json()]
+
+
+def test_ranking_order(client, make_user):
+    _, token = make_user()
+    for username, email in (
+        ("xkorbb", "xkorbb@mailbox.org"),
+        ("makorb", "makorb@mailbox.org"),
+        ("korbinian", "korbinian@mailbox.org"),
+        ("pelle", "korbmail@mailbox.org"),
+        ("korb", "k.o.r.b@mailbox.org"),
+    ):
+        signup(client, username, email)
+
+    # Exact username, username prefix, email prefix, then substrings by position
+    assert search(client, token, "Korb") == ["korb", "korbinian", "pelle", "xkorbb", "makorb"]
+
+
+def test_short_and_domain_queries_match_substrings(client, make_user, monkeypatch):
+    _, token = make_user()
+    signup(client, "owqen", "owqen@fjordmail.org")
+    signup(client, "brannoc", "b.r@fjordmail.org")
+
+    assert search(client, token, "wq") == ["owqen"]
+    assert sorted(search(client, token, "fjordmail.org")) == ["brannoc", "owqen"]
+    assert sorted(search(client, token, "fjordmail")) == ["brannoc", "owqen"]
+
+    # Large candidate sets return the first matches found
+    monkeypatch.setattr(settings, "USER_SEARCH_RANK_CANDIDATES", 0)
+    assert sorted(search(client, token, "fjordmail.org")) == ["brannoc", "owqen"]
+
+
+def test_signups_and_users_created_elsewhere_are_found(client, run, make_user, monkeypatch):
+    _, token = make_user()
+    signup(client, "quillon", "quillon@example.com")
+    assert search(client, token, "quillo") == ["quillon"]
+
+    async def create_elsewhere():
+        # As another worker or a script would, bypassing this worker's signup handler
+        async with AsyncSessionLocal() as db:
+            db.add(User(username="quillsby", email="quillsby@example.com", hashed_password="x"))
+            await db.commit()
+
+    run(create_elsewhere)
+    monkeypatch.setattr(settings, "USER_SEARCH_REFRESH_INTERVAL", 0)
+    assert search(client, token, "quill") == ["quillon", "quillsby"]
@@ -0,0 +1,61 @@
+"""
+WebSocket connection tracking
+"""
+import time
+
+from app.api.v1.websocket import WS_CLOSE_HEARTBEAT_TIMEOUT, manager
+from app.core.config import settings
+from app.core.metrics import metrics
+from tests.conftest import auth
+
+
+def test_frame_after_reap_does_not_track_socket_again(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "WS_PING_INTERVAL", 0.1)
+    monkeypatch.setattr(settings, "WS_PONG_TIMEOUT", 0.1)
+    user_id, token = make_user()
+
+    with client.websocket_connect(f"/api/v1/ws/chat/{token}") as ws:
+        assert ws.receive_json() == {"type": "ping"}
+        # No pong: the heartbeat reaps the socket
+        close = ws.receive()
+        assert close["code"] == WS_CLOSE_HEARTBEAT_TIMEOUT
+        assert user_id not in manager.active_connections
+
+        # A frame that was already in flight reaches the receive loop after the reap
+        ws.send_json({"type": "typing", "receiver_id": user_id, "is_typing": True})
+        time.sleep(0.2)
+
+    assert manager.last_seen == {}
+    assert manager.last_active == {}
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["ws_open_connections"] == 0
+    assert gauges["ws_online_users"] == 0
+
+
+def test_sync_caps_messages_across_conversations(client, make_user, befriend, monkeypatch):
+    monkeypatch.setattr(settings, "WS_SYNC_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "WS_SYNC_MAX_MESSAGES", 5)
+    user = make_user()
+    partners = [make_user(), make_user()]
+    for partner in partners:
+        befriend(partner, user)
+        for i in range(4):
+            client.post("/api/v1/messages/send", json={"receiver_id": user[0], "content": f"hello {i}"}, headers=auth(partner[1]))
+
+    cursors = {}
+    received = []
+    with client.websocket_connect(f"/api/v1/ws/chat/{user[1]}") as ws:
+        for expected_more in (True, False):
+            ws.send_json({"type": "sync", "cursors": cursors})
+            sent = 0
+            while True:
+                frame = ws.receive_json()
+                if frame["type"] == "sync_complete":
+                    break
+                sent += len(frame["messages"])
+                received += [(frame["partner_id"], message["seq"]) for message in frame["messages"]]
+            assert sent <= 5
+            assert bool(frame["has_more"]) == expected_more
+            cursors = frame["cursors"]
+
+    assert sorted(received) == [(partner[0], seq) for partner in sorted(partners) for seq in range(1, 5)]
@@ -78,7 +78,10 @@ export const useWebSocket = (token: string | null) => {
       try {
         const data: WebSocketMessage = JSON.parse(event.data);
 
-        if (data.type === 'message') {
+        if (data.type === 'ping') {
+          // Answer server heartbeats so the connection isn't reaped
+          ws.send(JSON.stringify({ type: 'pong' }));
+        } else if (data.type === 'message') {
           setMessages((prev) => [...prev, data]);
         } else if (data.type === 'cyberbot_warning') {
           // Handle CyberBOT warning messages